@@ -1,28 +1,53 @@
 # API.py
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import io
 import os
 import json
-import time
 import uuid
 import hmac
 import hashlib
 import base64
 import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Iterator
 from functools import wraps
 
 import flask
-from flask import Flask, request, jsonify, send_from_directory, url_for, send_file
+from flask import Flask, Blueprint, current_app, request, jsonify, send_from_directory, url_for, send_file
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, make_transient_to_detached
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 
-from fashion_analyzer import FashionAnalyzer
+from fashion_analyzer import FashionAnalyzer, coerce_json, ANALYSIS_BATCH_SIZE
+from stream_json import SuggestionStreamParser, parse_suggestions
+from wardrobe_attributes import extract_attributes, build_digest, ATTRIBUTES_VERSION, ATTRIBUTE_KINDS, DIGEST_FORMAT
+from analysis_cache import AnalysisCache
+from cache_utils import TTLCache, MISSING
+from thumbnails import get_thumbnail, delete_thumbnails, file_etag, THUMBNAIL_SIZES
+from image_hash import dhash, BKTree
+from ingestion import IngestionWorker, STATUS_PENDING, STATUS_PROCESSING, STATUS_READY, STATUS_FAILED
 from weather_client import WeatherClient, infer_season
+from metrics import (registry, span, record_span, request_spans, REQUEST_SECONDS, PROMPT_CHARS,
+                     PROMPT_CHARS_TOTAL, STAGE_DEGRADED, WARDROBE_DUPLICATES)
 
 from flask_cors import CORS
 
+if TYPE_CHECKING:
+    import numpy as np
+    from wardrobe_ranker import RankingContext
+    from visual_features import FeatureIndex
+
 # --- Structured Logging Setup
 class RequestFormatter(logging.Formatter):
     def format(self, record):
@@ -45,7 +70,7 @@ class RequestFormatter(logging.Formatter):
             'line': record.lineno
         }
 
-        for key in ['user_id', 'method', 'path', 'status_code', 'duration_ms', 'prompt']:
+        for key in ['user_id', 'method', 'path', 'status_code', 'duration_ms', 'spans', 'prompt']:
             if hasattr(record, key):
                 log_data[key] = getattr(record, key)
 
@@ -58,34 +83,78 @@ handler.setFormatter(RequestFormatter())
 logging.basicConfig(level=logging.INFO, handlers=[handler])
 logger = logging.getLogger(__name__)
 
-# --- App Setup
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
-app.config['JWT_SECRET'] = os.environ.get("JWT_SECRET", app.secret_key)
-app.config['JWT_EXPIRATION_DELTA'] = timedelta(days=7)
-
-# Configure CORS
-CORS(app, origins=['*'], supports_credentials=True)
+# --- App Setup (see create_app at the bottom of this module)
+bp = Blueprint("api", __name__, cli_group=None)
+db = SQLAlchemy()
 
 # Flask-Login setup
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'api.login'
 
 # --- Config
 WARDROBE_FOLDER = os.path.join("uploads", "wardrobe")
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
-MAX_PROMPT_WARDROBE = 60
-
-app.config["UPLOAD_FOLDER"] = WARDROBE_FOLDER
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///fashion.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-db = SQLAlchemy(app)
-os.makedirs(WARDROBE_FOLDER, exist_ok=True)
+MAX_PROMPT_WARDROBE = int(os.environ.get("MAX_PROMPT_WARDROBE", "30"))  # top-K ranked wardrobe items sent per prompt
+PROMPT_WARDROBE_CHAR_BUDGET = int(os.environ.get("PROMPT_WARDROBE_CHAR_BUDGET", "3000"))  # ~4 chars per token
+ANALYSIS_CACHE_PATH = os.environ.get("ANALYSIS_CACHE_PATH", os.path.join("instance", "analysis_cache.db"))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get("ANALYSIS_CACHE_MAX_ENTRIES", "5000"))
+ANALYSIS_CACHE_MAX_AGE = float(os.environ.get("ANALYSIS_CACHE_MAX_AGE", str(30 * 24 * 3600)))  # seconds
+ANALYSIS_CACHE_ENABLED = os.environ.get("ANALYSIS_CACHE_ENABLED", "1") != "0"
+ANALYSIS_CACHE_TOUCH_INTERVAL = float(os.environ.get("ANALYSIS_CACHE_TOUCH_INTERVAL", "600"))  # seconds between LRU touches of an entry
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", "4"))                  # fan-out pool for multi-file uploads
+ANALYSIS_MAX_CONCURRENCY = int(os.environ.get("ANALYSIS_MAX_CONCURRENCY", "8"))  # in-flight model calls per process
+IMAGE_CACHE_MAX_AGE = int(os.environ.get("IMAGE_CACHE_MAX_AGE", "86400"))  # seconds browsers may reuse an image
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "15000"))
+WARDROBE_PAGE_SIZE = int(os.environ.get("WARDROBE_PAGE_SIZE", "50"))
+WARDROBE_MAX_PAGE_SIZE = int(os.environ.get("WARDROBE_MAX_PAGE_SIZE", "200"))
+AUTH_CACHE_ENABLED = os.environ.get("AUTH_CACHE_ENABLED", "1") != "0"
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_TOKEN_CACHE_TTL = float(os.environ.get("AUTH_TOKEN_CACHE_TTL", "3600"))  # capped by each token's exp
+AUTH_USER_CACHE_TTL = float(os.environ.get("AUTH_USER_CACHE_TTL", "30"))      # seconds a user row is reused
+AUTH_USER_CACHE_SIZE = int(os.environ.get("AUTH_USER_CACHE_SIZE", "10000"))
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "2"))            # background ingestion threads per process
+INGEST_MAX_ATTEMPTS = int(os.environ.get("INGEST_MAX_ATTEMPTS", "3"))
+INGEST_STALE_AFTER = float(os.environ.get("INGEST_STALE_AFTER", "600"))  # seconds before a "processing" claim is retaken
+INGEST_SWEEP_INTERVAL = float(os.environ.get("INGEST_SWEEP_INTERVAL", "60"))  # seconds between stale-claim sweeps; 0 = startup only
+INGEST_RETRY_BACKOFF = float(os.environ.get("INGEST_RETRY_BACKOFF", "30"))    # delay before the 1st retry, doubled per attempt
+SUGGESTION_CACHE_ENABLED = os.environ.get("SUGGESTION_CACHE_ENABLED", "1") != "0"
+SUGGESTION_CACHE_SIZE = int(os.environ.get("SUGGESTION_CACHE_SIZE", "1000"))
+SUGGESTION_CACHE_TTL = float(os.environ.get("SUGGESTION_CACHE_TTL", "1800"))        # seconds
+SUGGESTION_TEMP_BAND_C = float(os.environ.get("SUGGESTION_TEMP_BAND_C", "5"))       # weather bucket width in °C
+OUTFIT_STAGE_WORKERS = int(os.environ.get("OUTFIT_STAGE_WORKERS", "8"))         # threads for the weather stage
+OUTFIT_WARDROBE_WORKERS = int(os.environ.get("OUTFIT_WARDROBE_WORKERS", "4"))   # threads for the wardrobe-load stage
+OUTFIT_WEATHER_TIMEOUT = float(os.environ.get("OUTFIT_WEATHER_TIMEOUT", "4"))     # seconds before weather is "unknown"
+OUTFIT_ANALYZE_TIMEOUT = float(os.environ.get("OUTFIT_ANALYZE_TIMEOUT", "45"))    # seconds for all outfit image analyses
+OUTFIT_WARDROBE_TIMEOUT = float(os.environ.get("OUTFIT_WARDROBE_TIMEOUT", "5"))   # seconds to load the wardrobe to rank
+DUPLICATE_DETECTION_ENABLED = os.environ.get("DUPLICATE_DETECTION_ENABLED", "1") != "0"
+DUPLICATE_MAX_DISTANCE = int(os.environ.get("DUPLICATE_MAX_DISTANCE", "6"))  # dHash bits (of 64) a near-duplicate may differ by
+DUPLICATE_INDEX_USERS = int(os.environ.get("DUPLICATE_INDEX_USERS", "1000"))  # per-user hash indexes kept in memory
+FEATURE_INDEX_USERS = int(os.environ.get("FEATURE_INDEX_USERS", "1000"))      # per-user visual feature indexes kept in memory
+SIMILAR_ITEMS_LIMIT = int(os.environ.get("SIMILAR_ITEMS_LIMIT", "10"))
+SIMILAR_ITEMS_MAX_LIMIT = int(os.environ.get("SIMILAR_ITEMS_MAX_LIMIT", "50"))
+OUTFIT_MAX_UPLOAD_BYTES = int(os.environ.get("OUTFIT_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))  # whole /outfit body
+MAX_REQUEST_BYTES = int(os.environ.get("MAX_REQUEST_BYTES", str(100 * 1024 * 1024)))  # any request body (MAX_CONTENT_LENGTH)
+AUTO_MIGRATE = os.environ.get("AUTO_MIGRATE", "1") != "0"  # create/upgrade the schema in create_app; else run `flask init-db`
+
+@event.listens_for(Engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets readers proceed while a writer commits; synchronous=NORMAL is durable in WAL mode
+    but skips an fsync per commit.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-16000")  # ~16 MB page cache per connection
+    cursor.close()
 
 # --- Request ID middleware for logging
-@app.before_request
+@bp.before_app_request
 def before_request():
     request_id = str(uuid.uuid4())[:8]
     flask.g.request_id = request_id
@@ -94,16 +163,19 @@ def before_request():
     # Associate user_id with the request context if available later
     flask.g.current_user_id = None
 
-@app.after_request
+@bp.after_app_request
 def after_request(response):
+    duration = time.time() - flask.g.start_time if hasattr(flask.g, 'start_time') else 0
+    if request.endpoint != 'api.metrics':
+        REQUEST_SECONDS.observe(duration, method=request.method, endpoint=request.endpoint or "unknown",
+                                status=response.status_code)
+
     # --- REDUCED NOISE: Exclude high-volume, low-information endpoints from logging ---
-    exclude_endpoints = ['serve_wardrobe_image', 'health', 'serve_frontend']
+    exclude_endpoints = ['api.serve_wardrobe_image', 'api.health', 'api.metrics', 'api.serve_frontend']
     if request.endpoint in exclude_endpoints:
         return response
     # ----------------------------------------------------------------------------------
 
-    duration = time.time() - flask.g.start_time if hasattr(flask.g, 'start_time') else 0
-    
     extra = {
         'method': request.method,
         'path': request.path,
@@ -111,6 +183,9 @@ def after_request(response):
         'duration_ms': round(duration * 1000, 2),
         'user_id': getattr(flask.g, 'current_user_id', None)
     }
+    spans = request_spans()
+    if spans:
+        extra['spans'] = spans
     logger.info(f"{request.method} {request.path} - {response.status_code}", extra=extra)
     return response
 
@@ -200,6 +275,7 @@ class User(UserMixin, db.Model):
     skin_tone = db.Column(db.String(50), nullable=True)  # fair, medium, olive, brown, dark
     gender = db.Column(db.String(20), nullable=True)     # male, female, non-binary, prefer-not-to-say
     created_at = db.Column(db.Float, default=lambda: time.time())
+    wardrobe_version = db.Column(db.Integer, nullable=False, default=0)  # bumped whenever suggestions could change
     
     # Relationship to wardrobe items
     wardrobe_items = db.relationship('WardrobeItem', backref='user', lazy=True, cascade='all, delete-orphan')
@@ -212,12 +288,12 @@ class User(UserMixin, db.Model):
     
     def generate_token(self):
         # create payload with exp as unix timestamp (int)
-        exp_ts = int(time.time() + app.config['JWT_EXPIRATION_DELTA'].total_seconds())
+        exp_ts = int(time.time() + current_app.config['JWT_EXPIRATION_DELTA'].total_seconds())
         payload = {
             'user_id': self.id,
             'exp': exp_ts
         }
-        return encode_jwt(payload, app.config['JWT_SECRET'], algorithm='HS256')
+        return encode_jwt(payload, current_app.config['JWT_SECRET'], algorithm='HS256')
     
     def to_dict(self):
         return {
@@ -232,71 +308,759 @@ class User(UserMixin, db.Model):
 class WardrobeItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)              # auto-increment primary key
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # owner of the item
-    filename = db.Column(db.String(256), nullable=False)      # stored as "<id>.ext"
+    filename = db.Column(db.String(256), nullable=False)      # stored as "<uuid hex>.ext" (older rows: "<id>.ext")
     description = db.Column(db.Text, nullable=True)           # AI generated description
     created_at = db.Column(db.Float, default=lambda: time.time())  # Unix timestamp
+    status = db.Column(db.String(20), nullable=False, default=STATUS_READY, index=True)  # pending, processing, ready, failed
+    error = db.Column(db.Text, nullable=True)                 # last ingestion error, if any
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    claimed_at = db.Column(db.Float, nullable=True)           # when a worker started processing the item
+    retry_at = db.Column(db.Float, nullable=True)             # a failed item is not retried before this time
+    # Structured attributes parsed from the AI analysis (see wardrobe_attributes.py)
+    item_type = db.Column(db.String(80), nullable=True, index=True)   # e.g. "denim jacket"
+    category = db.Column(db.String(40), nullable=True, index=True)    # top, bottom, one-piece, outerwear, footwear, accessory, other
+    style = db.Column(db.String(80), nullable=True)
+    digest = db.Column(db.Text, nullable=True)                        # compact keyword line used in prompts
+    attributes_version = db.Column(db.Integer, nullable=True)         # NULL / outdated -> needs backfill
+    image_hash = db.Column(db.String(16), nullable=True)              # 64-bit dHash in hex (see image_hash.py)
+    duplicate_of = db.Column(db.Integer, nullable=True)               # near-duplicate item whose analysis was reused
+    visual_features = db.deferred(db.Column(db.LargeBinary, nullable=True))  # float32 colour descriptor (see visual_features.py)
+
+    attributes = db.relationship('WardrobeAttribute', backref='item', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Serves both the per-user listing order and keyset pagination over (created_at, id)
+        db.Index('ix_wardrobe_item_user_created', 'user_id', 'created_at', 'id'),
+    )
+
+class WardrobeAttribute(db.Model):
+    """
+    One normalized (kind, value) pair per row, e.g. ("season", "winter"), for indexed filtering.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('wardrobe_item.id', ondelete='CASCADE'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)   # color, pattern, material, season, occasion
+    value = db.Column(db.String(80), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_wardrobe_attribute_lookup', 'user_id', 'kind', 'value'),
+    )
 
 # Flask-Login user loader
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+# --- Auth caches: verified token payloads and short-lived user rows
+token_cache = TTLCache(max_size=AUTH_TOKEN_CACHE_SIZE, ttl=AUTH_TOKEN_CACHE_TTL) if AUTH_CACHE_ENABLED else None
+user_cache = TTLCache(max_size=AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL) if AUTH_CACHE_ENABLED else None
+
+def verify_token(token: str) -> Dict[str, Any]:
+    """
+    decode_jwt with an LRU of already verified tokens. Entries never outlive the token's exp claim.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    if token_cache is not None:
+        payload = token_cache.get(key)
+        if payload is not MISSING:
+            return payload
+
+    payload = decode_jwt(token, current_app.config['JWT_SECRET'], algorithms=['HS256'], verify_exp=True)
+    if token_cache is not None:
+        ttl = AUTH_TOKEN_CACHE_TTL
+        if "exp" in payload:
+            ttl = min(ttl, int(payload["exp"]) + 1 - time.time())
+        if ttl > 0:
+            token_cache.set(key, payload, ttl=ttl)
+    return payload
+
+def load_request_user(user_id):
+    """
+    Return the User for this request, reusing a recently loaded row instead of querying.
+    The cache holds detached snapshots; each request gets its own session-bound copy via merge(load=False).
+    """
+    if user_cache is not None:
+        snapshot = user_cache.get(user_id)
+        if snapshot is not MISSING:
+            return db.session.merge(snapshot, load=False)
+
+    user = db.session.get(User, user_id)
+    if user is not None and user_cache is not None:
+        snapshot = User(**{c.key: getattr(user, c.key) for c in User.__table__.columns})
+        make_transient_to_detached(snapshot)
+        user_cache.set(user_id, snapshot)
+    return user
+
+def invalidate_user_cache(user_id) -> None:
+    if user_cache is not None:
+        user_cache.invalidate(user_id)
+
+def bump_wardrobe_version(user_id) -> None:
+    """
+    Invalidate the user's memoized outfit suggestions. Runs in the caller's transaction; commit afterwards.
+    The cached user row is dropped once that commit succeeds: dropping it now would let a concurrent
+    request cache the old row again before the new version is visible.
+    """
+    User.query.filter_by(id=user_id).update({User.wardrobe_version: User.wardrobe_version + 1},
+                                            synchronize_session=False)
+    db.session.info.setdefault("invalidate_users", set()).add(user_id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop("invalidate_users", ()):
+        invalidate_user_cache(user_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_users(session, previous_transaction):
+    session.info.pop("invalidate_users", None)
+
+def current_wardrobe_version(user_id) -> int:
+    # Read from the database rather than the cached user row, which may be a few seconds old
+    return db.session.query(User.wardrobe_version).filter_by(id=user_id).scalar() or 0
+
+def authenticate_request():
+    """
+    Resolve the request's bearer token to its user. Returns (user, None) or (None, 401 error response).
+    """
+    token = None
+    auth_header = request.headers.get('Authorization')
+    
+    if auth_header:
+        try:
+            token = auth_header.split(' ')[1]  # Bearer <token>
+        except IndexError:
+            return None, (jsonify({'error': 'Invalid token format'}), 401)
+    
+    if not token:
+        return None, (jsonify({'error': 'Token missing'}), 401)
+    
+    try:
+        payload = verify_token(token)
+        current_user_id = payload.get('user_id')
+        user = load_request_user(current_user_id)
+        if not user:
+            return None, (jsonify({'error': 'User not found'}), 401)
+        # Add user_id to flask.g for logging context
+        flask.g.current_user_id = user.id
+    except ExpiredSignatureError:
+        return None, (jsonify({'error': 'Token expired'}), 401)
+    except InvalidTokenError as e:
+        return None, (jsonify({'error': f'Invalid token: {str(e)}'}), 401)
+    except Exception as e:
+        return None, (jsonify({'error': 'Invalid token'}), 401)
+    return user, None
+
 # JWT token verification decorator
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        auth_header = request.headers.get('Authorization')
-        
-        if auth_header:
-            try:
-                token = auth_header.split(' ')[1]  # Bearer <token>
-            except IndexError:
-                return jsonify({'error': 'Invalid token format'}), 401
-        
-        if not token:
-            return jsonify({'error': 'Token missing'}), 401
-        
-        try:
-            payload = decode_jwt(token, app.config['JWT_SECRET'], algorithms=['HS256'], verify_exp=True)
-            current_user_id = payload.get('user_id')
-            user = User.query.get(current_user_id)
-            if not user:
-                return jsonify({'error': 'User not found'}), 401
-            # Add user_id to flask.g for logging context
-            flask.g.current_user_id = user.id
-        except ExpiredSignatureError:
-            return jsonify({'error': 'Token expired'}), 401
-        except InvalidTokenError as e:
-            return jsonify({'error': f'Invalid token: {str(e)}'}), 401
-        except Exception as e:
-            return jsonify({'error': 'Invalid token'}), 401
-        
+        user, error = authenticate_request()
+        if error is not None:
+            return error
         return f(user, *args, **kwargs)
     return decorated
 
-with app.app_context():
+def migrate_schema():
+    """
+    db.create_all() does not add columns to existing tables; add any that are missing.
+    """
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=db.engine.dialect)
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'
+                if default is not None:
+                    ddl += f" DEFAULT {default!r}" if isinstance(default, str) else f" DEFAULT {default}"
+                conn.execute(db.text(ddl))
+                logger.info(f"Added column {table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def init_db() -> None:
     db.create_all()
+    migrate_schema()
 
-analyzer = FashionAnalyzer()
-weather_client = WeatherClient()
+@bp.cli.command("init-db")
+def init_db_command():
+    """Create missing tables, columns and indexes."""
+    init_db()
+    print("Database schema is up to date")
+
+# --- External clients, created on first use so that a worker boots without touching
+# Gemini/OpenWeather (or needing their API keys) until a request actually needs them
+class ServiceNotConfigured(Exception):
+    pass
+
+_clients_lock = threading.Lock()
+analysis_cache: Optional[AnalysisCache] = None
+analyzer: Optional[FashionAnalyzer] = None
+weather_client: Optional[WeatherClient] = None
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    global analysis_cache
+    if analysis_cache is None and ANALYSIS_CACHE_ENABLED:
+        with _clients_lock:
+            if analysis_cache is None:
+                analysis_cache = AnalysisCache(ANALYSIS_CACHE_PATH, max_entries=ANALYSIS_CACHE_MAX_ENTRIES,
+                                               max_age=ANALYSIS_CACHE_MAX_AGE,
+                                               touch_interval=ANALYSIS_CACHE_TOUCH_INTERVAL)
+    return analysis_cache
+
+def get_analyzer() -> FashionAnalyzer:
+    global analyzer
+    if analyzer is None:
+        cache = get_analysis_cache()
+        with _clients_lock:
+            if analyzer is None:
+                started = time.perf_counter()
+                try:
+                    analyzer = FashionAnalyzer(cache=cache)
+                except ValueError as e:
+                    raise ServiceNotConfigured(str(e))
+                logger.info(f"Created FashionAnalyzer in {round((time.perf_counter() - started) * 1000, 1)} ms")
+    return analyzer
+
+def get_weather_client() -> WeatherClient:
+    global weather_client
+    if weather_client is None:
+        with _clients_lock:
+            if weather_client is None:
+                try:
+                    weather_client = WeatherClient()
+                except ValueError as e:
+                    raise ServiceNotConfigured(str(e))
+    return weather_client
+
+@bp.app_errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({"error": "Upload too large", "max_bytes": request.max_content_length}), 413
+
+@bp.app_errorhandler(ServiceNotConfigured)
+def service_not_configured(e):
+    logger.error(f"Service not configured: {e}")
+    return jsonify({"error": "Service unavailable", "message": str(e)}), 503
+
+suggestion_cache = (
+    TTLCache(max_size=SUGGESTION_CACHE_SIZE, ttl=SUGGESTION_CACHE_TTL) if SUGGESTION_CACHE_ENABLED else None
+)
+# (user id, outfit image hashes) of memoized suggestions, whatever the weather or wardrobe version:
+# a repeat of these images is a likely cache hit, so its image analyses wait for the lookup
+suggested_outfits = (
+    TTLCache(max_size=SUGGESTION_CACHE_SIZE, ttl=SUGGESTION_CACHE_TTL) if SUGGESTION_CACHE_ENABLED else None
+)
+
+analysis_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+analysis_slots = threading.BoundedSemaphore(ANALYSIS_MAX_CONCURRENCY)
+# Separate pools so slow OpenWeather calls cannot queue the (fast, local) wardrobe loads behind them
+weather_executor = ThreadPoolExecutor(max_workers=OUTFIT_STAGE_WORKERS, thread_name_prefix="outfit-weather")
+wardrobe_executor = ThreadPoolExecutor(max_workers=OUTFIT_WARDROBE_WORKERS, thread_name_prefix="outfit-wardrobe")
 
 # --- Helpers
 def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def wardrobe_item_to_dict(item: WardrobeItem) -> Dict[str, Any]:
-    return {
-        "id": item.id,
-        "filename": item.filename,
-        "file_url": url_for("serve_wardrobe_image", item_id=item.id, _external=False),
-        "description": item.description,
-        "created_at": item.created_at,
-        "user_id": item.user_id
-    }
+def new_wardrobe_filename(original_name: str) -> str:
+    """
+    Stored name "<uuid hex>.<ext>": known before the row is inserted, so no flush is needed to name the file.
+    """
+    return f"{uuid.uuid4().hex}.{original_name.rsplit('.', 1)[1].lower()}"
+
+def remove_wardrobe_file(filename: str) -> None:
+    path = os.path.join(WARDROBE_FOLDER, filename)
+    if filename and os.path.exists(path):
+        os.remove(path)
+
+def analyze_image(image):
+    """
+    Run analyzer.analyze (on a path or the image bytes) under the per-process concurrency cap.
+    """
+    with analysis_slots:
+        return get_analyzer().analyze(image)
+
+def analyze_images(images: list) -> list:
+    """
+    Run analyzer.analyze_batch under the per-process concurrency cap (one slot per batched call).
+    Returns, per image, (raw, parsed) or the exception its analysis raised.
+    """
+    with analysis_slots:
+        return get_analyzer().analyze_batch(images)
+
+def analysis_batches(count: int) -> List[range]:
+    """
+    Positions 0..count-1 split into ANALYSIS_BATCH_SIZE groups, each analyzed with one model call.
+    """
+    return [range(i, min(i + ANALYSIS_BATCH_SIZE, count)) for i in range(0, count, ANALYSIS_BATCH_SIZE)]
+
+def apply_attributes(item: WardrobeItem, parsed: Dict[str, Any]) -> None:
+    """
+    Store the structured fields and prompt digest of a parsed analysis on the item (replacing any previous ones).
+    """
+    extracted = extract_attributes(parsed)
+    item.item_type = extracted["item_type"]
+    item.category = extracted["category"]
+    item.style = extracted["style"]
+    item.digest = build_digest(extracted, item.description or "")
+    item.attributes = [
+        WardrobeAttribute(user_id=item.user_id, kind=kind, value=value)
+        for kind, value in extracted["attributes"]
+    ]
+    item.attributes_version = ATTRIBUTES_VERSION
+
+def backfill_wardrobe_attributes(batch_size: int = 200) -> int:
+    """
+    Re-parse stored descriptions for items whose attributes are missing or outdated. Returns rows updated.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        items = WardrobeItem.query.filter(
+            WardrobeItem.id > last_id,
+            WardrobeItem.status == STATUS_READY,
+            db.or_(WardrobeItem.attributes_version.is_(None), WardrobeItem.attributes_version < ATTRIBUTES_VERSION)
+        ).order_by(WardrobeItem.id).limit(batch_size).all()
+        if not items:
+            break
+        for item in items:
+            apply_attributes(item, coerce_json(item.description or ""))
+        for user_id in {item.user_id for item in items}:
+            bump_wardrobe_version(user_id)
+        db.session.commit()
+        updated += len(items)
+        last_id = items[-1].id
+    return updated
+
+def backfill_image_hashes(batch_size: int = 200) -> int:
+    """
+    Compute the perceptual hash of existing items that have none. Returns rows updated.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        items = WardrobeItem.query.filter(WardrobeItem.id > last_id, WardrobeItem.image_hash.is_(None)) \
+            .order_by(WardrobeItem.id).limit(batch_size).all()
+        if not items:
+            break
+        for item in items:
+            item.image_hash = compute_image_hash(os.path.join(WARDROBE_FOLDER, item.filename), item.user_id)
+        for user_id in {item.user_id for item in items}:
+            bump_wardrobe_version(user_id)
+        db.session.commit()
+        updated += sum(1 for item in items if item.image_hash)
+        last_id = items[-1].id
+    return updated
+
+def backfill_visual_features(batch_size: int = 200) -> int:
+    """
+    Extract the colour descriptor of existing items that have none. Returns rows updated.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        items = WardrobeItem.query.filter(WardrobeItem.id > last_id, WardrobeItem.visual_features.is_(None)) \
+            .order_by(WardrobeItem.id).limit(batch_size).all()
+        if not items:
+            break
+        for item in items:
+            item.visual_features = compute_visual_features(os.path.join(WARDROBE_FOLDER, item.filename), item.user_id)
+        for user_id in {item.user_id for item in items}:
+            bump_wardrobe_version(user_id)
+        db.session.commit()
+        updated += sum(1 for item in items if item.visual_features)
+        last_id = items[-1].id
+    return updated
+
+@bp.cli.command("backfill-visual-features")
+def backfill_visual_features_command():
+    """Extract colour features for existing wardrobe items (similar items, ranking)."""
+    print(f"Extracted visual features for {backfill_visual_features()} wardrobe items")
+
+@bp.cli.command("backfill-image-hashes")
+def backfill_image_hashes_command():
+    """Compute perceptual hashes for existing wardrobe items (near-duplicate detection)."""
+    print(f"Hashed {backfill_image_hashes()} wardrobe items")
+
+@bp.cli.command("backfill-attributes")
+def backfill_attributes_command():
+    """Populate structured wardrobe attributes for existing items."""
+    print(f"Backfilled attributes for {backfill_wardrobe_attributes()} wardrobe items")
+
+def temperature_celsius(weather_json: Dict[str, Any], units: str):
+    temperature = (weather_json or {}).get("main", {}).get("temp")
+    if temperature is None:
+        return None
+    if units == "imperial":
+        return (temperature - 32) * 5 / 9
+    if units == "standard":
+        return temperature - 273.15
+    return temperature
+
+def ranking_context(season: str, weather_json: Dict[str, Any], units: str,
+                    outfit_parsed: List[Dict[str, Any]], outfit_features=None) -> "RankingContext":
+    from wardrobe_ranker import RankingContext
+
+    condition = weather_json.get("weather", [{}])[0].get("main") if weather_json else None
+    context = RankingContext(season=season, temperature_c=temperature_celsius(weather_json, units), condition=condition,
+                             outfit_features=outfit_features)
+    for parsed in outfit_parsed:
+        extracted = extract_attributes(parsed)
+        context.outfit_tokens.update(extracted["attributes"])
+        if extracted["style"]:
+            context.outfit_tokens.add(("style", extracted["style"]))
+        context.outfit_categories.add(extracted["category"])
+    return context
+
+def load_wardrobe_candidates(user_id: int):
+    """
+    The plain column tuples select_prompt_wardrobe scores: (ready item rows, attribute rows).
+    Near-duplicate uploads are left out so the same garment is not listed in the prompt twice.
+    They hold no session state, so they can be loaded on another thread ahead of ranking.
+    """
+    rows = db.session.query(WardrobeItem.id, WardrobeItem.category, WardrobeItem.style, WardrobeItem.created_at) \
+        .filter_by(user_id=user_id, status=STATUS_READY, duplicate_of=None).all()
+    if not rows:
+        return [], []
+    attrs = db.session.query(WardrobeAttribute.item_id, WardrobeAttribute.kind, WardrobeAttribute.value) \
+        .filter_by(user_id=user_id).all()
+    return rows, attrs
+
+def select_prompt_wardrobe(user_id: int, context: "RankingContext", k: int = MAX_PROMPT_WARDROBE,
+                           candidates=None) -> List[WardrobeItem]:
+    """
+    Score the user's whole wardrobe locally and return only the k most relevant ready items.
+    Works on plain column tuples so thousands of items cost two queries and one NumPy pass;
+    pass candidates (from load_wardrobe_candidates) if they were loaded already.
+    """
+    import numpy as np
+    from wardrobe_ranker import score_items, select_top_k
+
+    started = time.time()
+    rows, attrs = candidates if candidates is not None else load_wardrobe_candidates(user_id)
+    if not rows:
+        return []
+    row_index = {r.id: i for i, r in enumerate(rows)}
+
+    vocab: Dict[Any, int] = {}
+    attr_rows, attr_token_ids = [], []
+    tokens = [(r.id, "style", r.style) for r in rows if r.style] + [(a.item_id, a.kind, a.value) for a in attrs]
+    for item_id, kind, value in tokens:
+        row = row_index.get(item_id)
+        if row is None:  # attribute of an item that is not ready
+            continue
+        attr_rows.append(row)
+        attr_token_ids.append(vocab.setdefault((kind, value), len(vocab)))
+
+    # Colour similarity to the outfit from the precomputed visual features; NaN for items without any
+    visual_similarity = None
+    if context.outfit_features is not None:
+        index = wardrobe_feature_index(user_id)
+        if len(index):
+            similarity = dict(zip(index.ids.tolist(), index.similarities(context.outfit_features).tolist()))
+            visual_similarity = np.array([similarity.get(r.id, np.nan) for r in rows])
+
+    categories = [r.category or "other" for r in rows]
+    scores = score_items(
+        categories,
+        np.array([r.created_at or 0.0 for r in rows]),
+        np.array(attr_rows, dtype=np.int64),
+        np.array(attr_token_ids, dtype=np.int64),
+        list(vocab),
+        context,
+        visual_similarity,
+    )
+    chosen_ids = [rows[i].id for i in select_top_k(categories, scores, k)]
+
+    items_by_id = {i.id: i for i in WardrobeItem.query.filter(WardrobeItem.id.in_(chosen_ids)).all()}
+    logger.info(
+        f"Ranked {len(rows)} wardrobe items, selected {len(chosen_ids)} in {round((time.time() - started) * 1000, 2)} ms",
+        extra={'user_id': user_id}
+    )
+    return [items_by_id[i] for i in chosen_ids if i in items_by_id]
+
+def build_wardrobe_section(items: List[WardrobeItem], budget_chars: int = PROMPT_WARDROBE_CHAR_BUDGET) -> List[str]:
+    """
+    Digest lines for the prompt, best-ranked first, stopping once the character budget is spent.
+    """
+    lines = []
+    used = 0
+    for item in items:
+        line = f"[{item.id}] {item.digest or ' '.join((item.description or '').split())[:160]}"
+        if used + len(line) + 1 > budget_chars:
+            break
+        lines.append(line)
+        used += len(line) + 1
+    if len(lines) < len(items):
+        logger.info(f"Wardrobe section budget ({budget_chars} chars) reached: kept {len(lines)} of {len(items)} items")
+    return lines
+
+def attributes_to_dict(item: WardrobeItem) -> Dict[str, Any]:
+    grouped = {f"{kind}s": [] for kind in ATTRIBUTE_KINDS}
+    for attr in item.attributes:
+        grouped[f"{attr.kind}s"].append(attr.value)
+    return {"type": item.item_type, "category": item.category, "style": item.style, **grouped}
+
+# Serializers for each field of wardrobe_item_to_dict, so sparse responses only touch what they need
+WARDROBE_ITEM_FIELDS = {
+    "id": lambda item: item.id,
+    "filename": lambda item: item.filename,
+    "file_url": lambda item: url_for("api.serve_wardrobe_image", item_id=item.id, _external=False),
+    "description": lambda item: item.description,
+    "digest": lambda item: item.digest,
+    "created_at": lambda item: item.created_at,
+    "user_id": lambda item: item.user_id,
+    "status": lambda item: item.status,
+    "error": lambda item: item.error,
+    "duplicate_of": lambda item: item.duplicate_of,
+    "attributes": attributes_to_dict,
+}
+
+def wardrobe_item_to_dict(item: WardrobeItem, fields=None) -> Dict[str, Any]:
+    return {name: WARDROBE_ITEM_FIELDS[name](item) for name in (fields or WARDROBE_ITEM_FIELDS)}
+
+def encode_cursor(item: WardrobeItem) -> str:
+    return _b64url_encode(json.dumps([item.created_at, item.id], separators=(',', ':')).encode("utf-8"))
+
+def decode_cursor(cursor: str):
+    created_at, item_id = json.loads(_b64url_decode(cursor))
+    return float(created_at), int(item_id)
+
+# --- Near-duplicate detection: a dHash per item and a per-user BK-tree over them
+duplicate_indexes = TTLCache(max_size=DUPLICATE_INDEX_USERS, ttl=3600)
+
+def compute_image_hash(source, user_id=None) -> Optional[str]:
+    try:
+        return dhash(source)
+    except Exception as e:
+        logger.warning(f"Could not hash image: {e}", extra={'user_id': user_id})
+        return None
+
+def wardrobe_hash_index(user_id: int) -> BKTree:
+    """
+    BK-tree of the user's hashed, ready items (hash -> item id). Cached per user and rebuilt once their
+    wardrobe_version moves on, so items added or deleted by any worker are picked up.
+    """
+    version = current_wardrobe_version(user_id)
+    cached = duplicate_indexes.get(user_id)
+    if cached is not MISSING and cached[0] == version:
+        return cached[1]
+
+    tree = BKTree()
+    rows = db.session.query(WardrobeItem.id, WardrobeItem.image_hash).filter(
+        WardrobeItem.user_id == user_id, WardrobeItem.status == STATUS_READY, WardrobeItem.image_hash.isnot(None)
+    ).order_by(WardrobeItem.id).all()
+    for item_id, image_hash in rows:
+        tree.add(image_hash, item_id)
+    duplicate_indexes.set(user_id, (version, tree))
+    return tree
+
+def find_duplicate(user_id: int, image_hash: Optional[str], exclude_id=None):
+    """
+    The user's nearest ready item within DUPLICATE_MAX_DISTANCE of image_hash, as (item, distance), or None.
+    """
+    if not (DUPLICATE_DETECTION_ENABLED and image_hash):
+        return None
+    for distance, item_id in wardrobe_hash_index(user_id).search(image_hash, DUPLICATE_MAX_DISTANCE):
+        if item_id == exclude_id:
+            continue
+        item = db.session.get(WardrobeItem, item_id)
+        if item is not None and item.status == STATUS_READY and item.description:
+            return item, distance
+    return None
+
+# --- Visual features: a colour descriptor per item and a per-user array-backed cosine index
+feature_indexes = TTLCache(max_size=FEATURE_INDEX_USERS, ttl=3600)
+
+def compute_visual_features(source, user_id=None) -> Optional[bytes]:
+    from visual_features import extract_features, to_bytes
+    try:
+        return to_bytes(extract_features(source))
+    except Exception as e:
+        logger.warning(f"Could not extract visual features: {e}", extra={'user_id': user_id})
+        return None
+
+def wardrobe_feature_index(user_id: int) -> "FeatureIndex":
+    """
+    FeatureIndex of the user's ready items. Cached per user and rebuilt once their wardrobe_version moves on.
+    """
+    from visual_features import FeatureIndex, from_bytes
+
+    version = current_wardrobe_version(user_id)
+    cached = feature_indexes.get(user_id)
+    if cached is not MISSING and cached[0] == version:
+        return cached[1]
+
+    ids, vectors = [], []
+    rows = db.session.query(WardrobeItem.id, WardrobeItem.visual_features).filter(
+        WardrobeItem.user_id == user_id, WardrobeItem.status == STATUS_READY, WardrobeItem.visual_features.isnot(None)
+    ).all()
+    for item_id, data in rows:
+        vector = from_bytes(data)
+        if vector is not None:
+            ids.append(item_id)
+            vectors.append(vector)
+    index = FeatureIndex(ids, vectors)
+    feature_indexes.set(user_id, (version, index))
+    return index
+
+def outfit_visual_features(images: List[tuple]) -> Optional["np.ndarray"]:
+    """
+    Mean colour descriptor of the outfit images ((index, filename, bytes) tuples), or None.
+    """
+    from visual_features import extract_features, mean_features
+
+    vectors = []
+    for _, filename, data in images:
+        try:
+            vectors.append(extract_features(data))
+        except Exception as e:
+            logger.warning(f"Could not extract visual features of {filename}: {e}")
+    return mean_features(vectors)
+
+@dataclass
+class UploadMatch:
+    """
+    Near-duplicate check (and visual features) of one saved upload.
+    """
+    image_hash: Optional[str]
+    visual_features: Optional[bytes] = None
+    duplicate_of: Optional[int] = None  # existing item whose analysis is reused
+    same_as: Optional[int] = None       # earlier position in this upload showing the same garment
+    reused: Optional[tuple] = None      # (raw, parsed) of duplicate_of
+
+    @property
+    def needs_analysis(self) -> bool:
+        return self.reused is None and self.same_as is None
+
+def match_wardrobe_uploads(user_id: int, paths: List[str]) -> List[UploadMatch]:
+    """
+    Hash each saved upload and look for a near-duplicate in the user's wardrobe, or else earlier in this upload.
+    Also extracts each upload's visual features.
+    """
+    matches = []
+    batch = BKTree()  # positions in this upload that will be analyzed
+    for position, path in enumerate(paths):
+        match = UploadMatch(compute_image_hash(path, user_id), compute_visual_features(path, user_id))
+        found = find_duplicate(user_id, match.image_hash)
+        if found:
+            item, distance = found
+            match.duplicate_of = item.id
+            match.reused = (item.description, coerce_json(item.description))
+            WARDROBE_DUPLICATES.inc(source="wardrobe")
+            logger.info(f"Upload {position} is a near-duplicate of item {item.id} (distance {distance}); "
+                        f"reusing its analysis", extra={'user_id': user_id})
+        elif match.image_hash and DUPLICATE_DETECTION_ENABLED:
+            nearest = batch.search(match.image_hash, DUPLICATE_MAX_DISTANCE)
+            if nearest:
+                match.same_as = nearest[0][1]
+                WARDROBE_DUPLICATES.inc(source="upload")
+            else:
+                batch.add(match.image_hash, position)
+        matches.append(match)
+    return matches
+
+def merge_upload_analyses(matches: List[UploadMatch], analyzed: Dict[int, Any]) -> list:
+    """
+    Per-upload results for store_wardrobe_uploads: the new analyses (by position) plus the reused ones.
+    """
+    results = []
+    for position, match in enumerate(matches):
+        if match.reused is not None:
+            results.append(match.reused)
+        elif match.same_as is not None:
+            results.append(analyzed[match.same_as])
+        else:
+            results.append(analyzed[position])
+    return results
+
+# --- Background ingestion
+def ingest_wardrobe_item(item_id: int) -> None:
+    """
+    Background job: claim a pending item, describe it with the analyzer and store the result.
+    The claim is a conditional UPDATE so that only one worker (in any process) runs a given item.
+    """
+    now = time.time()
+    claimed = WardrobeItem.query.filter(
+        WardrobeItem.id == item_id,
+        WardrobeItem.attempts < INGEST_MAX_ATTEMPTS,
+        unfinished_filter(now)
+    ).update({"status": STATUS_PROCESSING, "claimed_at": now, "attempts": WardrobeItem.attempts + 1},
+             synchronize_session=False)
+    if not claimed:
+        # The worker holding the last allowed attempt died mid-job: give up instead of retaking it forever
+        WardrobeItem.query.filter(
+            WardrobeItem.id == item_id,
+            WardrobeItem.attempts >= INGEST_MAX_ATTEMPTS,
+            unfinished_filter(now)
+        ).update({"status": STATUS_FAILED, "error": "Ingestion stopped before finishing"}, synchronize_session=False)
+        db.session.commit()
+        return
+    db.session.commit()
+
+    item = db.session.get(WardrobeItem, item_id)
+    if item is None:
+        return
+    path = os.path.join(WARDROBE_FOLDER, item.filename)
+    if item.image_hash is None:
+        item.image_hash = compute_image_hash(path, item.user_id)
+    if item.visual_features is None:
+        item.visual_features = compute_visual_features(path, item.user_id)
+    found = find_duplicate(item.user_id, item.image_hash, exclude_id=item.id)
+    try:
+        if found:
+            duplicate, distance = found
+            item.duplicate_of = duplicate.id
+            raw_description, parsed = duplicate.description, coerce_json(duplicate.description)
+            WARDROBE_DUPLICATES.inc(source="wardrobe")
+            logger.info(f"Wardrobe item {item_id} is a near-duplicate of item {duplicate.id} (distance {distance}); "
+                        f"reusing its analysis", extra={'user_id': item.user_id})
+        else:
+            raw_description, parsed = analyze_image(path)
+    except Exception as e:
+        logger.error(f"Analysis failed for wardrobe item {item_id} (attempt {item.attempts}): {e}",
+                     extra={'user_id': item.user_id})
+        retry = item.attempts < INGEST_MAX_ATTEMPTS
+        delay = INGEST_RETRY_BACKOFF * 2 ** (item.attempts - 1)
+        item.status = STATUS_PENDING if retry else STATUS_FAILED
+        item.retry_at = time.time() + delay if retry else None
+        item.error = str(e)
+        db.session.commit()
+        if retry:
+            get_ingestion_worker().submit(item_id, delay=delay)
+        return
+
+    item.description = raw_description
+    apply_attributes(item, parsed)
+    item.status = STATUS_READY
+    item.error = None
+    item.retry_at = None
+    bump_wardrobe_version(item.user_id)
+    db.session.commit()
+
+def unfinished_filter(now: float):
+    """
+    Items a worker may take: pending ones whose retry backoff has passed, and stale "processing" claims.
+    """
+    return db.or_(
+        db.and_(WardrobeItem.status == STATUS_PENDING,
+                db.or_(WardrobeItem.retry_at.is_(None), WardrobeItem.retry_at <= now)),
+        db.and_(WardrobeItem.status == STATUS_PROCESSING, WardrobeItem.claimed_at < now - INGEST_STALE_AFTER))
+
+def unfinished_wardrobe_item_ids():
+    rows = db.session.query(WardrobeItem.id).filter(unfinished_filter(time.time())).order_by(WardrobeItem.id).all()
+    return [r.id for r in rows]
+
+def get_ingestion_worker() -> IngestionWorker:
+    return current_app.extensions["ingestion_worker"]
 
 # --- Authentication Endpoints
-@app.route("/auth/register", methods=["POST"])
+@bp.route("/auth/register", methods=["POST"])
 def register():
     data = request.get_json()
     
@@ -326,7 +1090,7 @@ def register():
         'user': user.to_dict()
     }), 201
 
-@app.route("/auth/login", methods=["POST"])
+@bp.route("/auth/login", methods=["POST"])
 def login():
     data = request.get_json()
     
@@ -346,12 +1110,12 @@ def login():
         'user': user.to_dict()
     }), 200
 
-@app.route("/auth/profile", methods=["GET"])
+@bp.route("/auth/profile", methods=["GET"])
 @token_required
 def get_profile(current_user):
     return jsonify({'user': current_user.to_dict()}), 200
 
-@app.route("/auth/profile", methods=["PUT"])
+@bp.route("/auth/profile", methods=["PUT"])
 @token_required
 def update_profile(current_user):
     data = request.get_json() or {}
@@ -363,6 +1127,7 @@ def update_profile(current_user):
     if 'gender' in data:
         current_user.gender = data['gender']
     
+    bump_wardrobe_version(current_user.id)
     db.session.commit()
     
     return jsonify({
@@ -372,84 +1137,661 @@ def update_profile(current_user):
 
 # --- Wardrobe Endpoints
 
-@app.route("/wardrobe", methods=["POST"])
-@token_required
-def upload_wardrobe(current_user):
+def wardrobe_upload_files():
     files = request.files.getlist("files")
     if not files:
         single = request.files.get("file")
         if single:
             files = [single]
+    return files
+
+
+def wants_async_ingest() -> bool:
+    return (request.args.get("async") or request.form.get("async") or "").lower() in ("1", "true", "yes")
+
+
+def save_wardrobe_uploads(files):
+    """
+    Save every accepted file under its final, ID-independent name.
+    Returns (pending [(index, original filename, stored filename)], failed).
+    """
+    pending = []
+    failed = []
+    for idx, file in enumerate(files):
+        if not (file and allowed_file(file.filename)):
+            failed.append({"index": idx, "filename": file.filename if file else None, "error": "File type not allowed"})
+            continue
+        stored_name = new_wardrobe_filename(file.filename)
+        file.save(os.path.join(WARDROBE_FOLDER, stored_name))
+        pending.append((idx, file.filename, stored_name))
+    return pending, failed
+
+
+def store_wardrobe_uploads(current_user, pending, results, failed, matches=None):
+    """
+    Turn the analyses of the saved uploads into wardrobe rows in one short write transaction.
+    results holds, per pending entry, (raw, parsed) or the exception its analysis raised;
+    matches (from match_wardrobe_uploads) adds each row's hash and the near-duplicate it repeats.
+    """
+    matches = matches or [UploadMatch(None)] * len(pending)
+    records = []  # in input order
+    by_position = {}
+    for position, ((idx, original_name, stored_name), result, match) in enumerate(zip(pending, results, matches)):
+        if isinstance(result, BaseException):
+            logger.error(f"Analysis failed for {original_name}: {result}", extra={'user_id': current_user.id})
+            failed.append({"index": idx, "filename": original_name, "error": "Analysis failed"})
+            remove_wardrobe_file(stored_name)
+            continue
+        raw_description, parsed = result
+        record = WardrobeItem(filename=stored_name, description=raw_description, user_id=current_user.id,
+                              image_hash=match.image_hash, duplicate_of=match.duplicate_of,
+                              visual_features=match.visual_features)
+        apply_attributes(record, parsed)
+        records.append(record)
+        by_position[position] = record
+
+    try:
+        with span("db_write"):
+            db.session.add_all(records)
+            if any(match.same_as is not None for match in matches):
+                db.session.flush()  # ids of the first copies, for the repeats within this upload
+                for position, record in by_position.items():
+                    if matches[position].same_as in by_position:
+                        record.duplicate_of = by_position[matches[position].same_as].id
+            if records:
+                bump_wardrobe_version(current_user.id)
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        for record in records:
+            remove_wardrobe_file(record.filename)
+        raise
+
+    failed.sort(key=lambda f: f["index"])
+    results = [wardrobe_item_to_dict(r) for r in records]
+    if not results and failed:
+        return jsonify({"error": "No files could be processed", "uploaded": [], "failed": failed}), 400
+    return jsonify({"uploaded": results, "failed": failed}), 201
+
+
+@bp.route("/wardrobe", methods=["POST"])
+@token_required
+def upload_wardrobe(current_user):
+    files = wardrobe_upload_files()
     if not files:
         return jsonify({"error": "No files uploaded"}), 400
 
-    results = []
-    for file in files:
+    if wants_async_ingest():
+        return enqueue_wardrobe_uploads(current_user, files)
+
+    # Step 1: save every accepted file
+    with span("save_files"):
+        pending, failed = save_wardrobe_uploads(files)
+
+    # Step 2: near-duplicates of existing items (or of each other) reuse an analysis instead of a model call
+    paths = [os.path.join(WARDROBE_FOLDER, stored_name) for _, _, stored_name in pending]
+    with span("dedupe"):
+        matches = match_wardrobe_uploads(current_user.id, paths)
+    todo = [position for position, match in enumerate(matches) if match.needs_analysis]
+
+    # Step 3: one model call per batch of images, the batches fanned out over the worker pool
+    batches = analysis_batches(len(todo))
+    futures = [analysis_executor.submit(analyze_images, [paths[todo[i]] for i in batch]) for batch in batches]
+    analyzed = []
+    for batch, future in zip(batches, futures):
+        try:
+            with span("analyze"):
+                analyzed.extend(future.result())
+        except Exception as e:
+            analyzed.extend([e] * len(batch))
+    results = merge_upload_analyses(matches, dict(zip(todo, analyzed)))
+
+    # Step 4: one short write transaction for the whole request
+    return store_wardrobe_uploads(current_user, pending, results, failed, matches)
+
+
+def enqueue_wardrobe_uploads(current_user, files):
+    """
+    Async ingestion mode: store the files as pending items and let the ingestion worker describe them.
+    """
+    failed = []
+    accepted = []  # (index, file, ext)
+    for idx, file in enumerate(files):
         if not (file and allowed_file(file.filename)):
+            failed.append({"index": idx, "filename": file.filename if file else None, "error": "File type not allowed"})
             continue
+        accepted.append((idx, file, file.filename.rsplit(".", 1)[1].lower()))
 
-        # Step 1: create a blank DB record to get the ID first
-        temp_record = WardrobeItem(filename="", description="", user_id=current_user.id)
-        db.session.add(temp_record)
-        db.session.flush()  # generate ID without commit
+    if not accepted:
+        return jsonify({"error": "No files could be processed", "pending": [], "failed": failed}), 400
 
-        # Step 2: rename file to <id>.<ext>
-        ext = file.filename.rsplit(".", 1)[1].lower()
-        new_filename = f"{temp_record.id}.{ext}"
-        filepath = os.path.join(WARDROBE_FOLDER, new_filename)
-        file.save(filepath)
+    records = []
+    try:
+        for _, file, _ in accepted:
+            stored_name = new_wardrobe_filename(file.filename)
+            path = os.path.join(WARDROBE_FOLDER, stored_name)
+            file.save(path)
+            records.append(WardrobeItem(filename=stored_name, description="", user_id=current_user.id,
+                                        status=STATUS_PENDING, image_hash=compute_image_hash(path, current_user.id),
+                                        visual_features=compute_visual_features(path, current_user.id)))
+        db.session.add_all(records)
+        bump_wardrobe_version(current_user.id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        for record in records:
+            remove_wardrobe_file(record.filename)
+        raise
 
-        # Step 3: get description from AI
-        raw_description, _ = analyzer.analyze(filepath)
+    for record in records:
+        get_ingestion_worker().submit(record.id)
 
-        # Step 4: update record with proper data
-        temp_record.filename = new_filename
-        temp_record.description = raw_description
-        db.session.commit()
+    return jsonify({
+        "pending": [wardrobe_item_to_dict(r) for r in records],
+        "failed": failed,
+        "status_url": url_for("api.wardrobe_status", ids=",".join(str(r.id) for r in records), _external=False)
+    }), 202
 
-        results.append(wardrobe_item_to_dict(temp_record))
 
-    return jsonify({"uploaded": results}), 201
+@bp.route("/wardrobe/status", methods=["GET"])
+@token_required
+def wardrobe_status(current_user):
+    query = WardrobeItem.query.filter_by(user_id=current_user.id)
+    ids = request.args.get("ids")
+    if ids:
+        try:
+            id_list = [int(i) for i in ids.split(",") if i.strip()]
+        except ValueError:
+            return jsonify({"error": "ids must be a comma-separated list of integers"}), 400
+        query = query.filter(WardrobeItem.id.in_(id_list))
+    else:
+        query = query.filter(WardrobeItem.status != STATUS_READY)
+
+    items = query.order_by(WardrobeItem.id).all()
+    counts = {}
+    for item in items:
+        counts[item.status] = counts.get(item.status, 0) + 1
+    return jsonify({
+        "items": [{"id": i.id, "status": i.status, "error": i.error, "attempts": i.attempts,
+                   "retry_at": i.retry_at} for i in items],
+        "counts": counts,
+        "done": all(i.status in (STATUS_READY, STATUS_FAILED) for i in items)
+    })
 
 
-@app.route("/wardrobe", methods=["GET"])
+@bp.route("/wardrobe", methods=["GET"])
 @token_required
 def list_wardrobe(current_user):
-    items = WardrobeItem.query.filter_by(user_id=current_user.id).order_by(WardrobeItem.created_at.desc()).all()
-    return jsonify([wardrobe_item_to_dict(i) for i in items])
+    query = WardrobeItem.query.filter_by(user_id=current_user.id)
+
+    # Structured filters, e.g. ?category=outerwear&season=winter
+    if request.args.get("category"):
+        query = query.filter(WardrobeItem.category == request.args["category"].lower())
+    if request.args.get("type"):
+        query = query.filter(WardrobeItem.item_type == request.args["type"].lower())
+    for kind in ATTRIBUTE_KINDS:
+        value = request.args.get(kind)
+        if value:
+            query = query.filter(WardrobeItem.id.in_(
+                db.select(WardrobeAttribute.item_id).where(
+                    WardrobeAttribute.user_id == current_user.id,
+                    WardrobeAttribute.kind == kind,
+                    WardrobeAttribute.value == value.lower()
+                )
+            ))
+
+    fields = None
+    if request.args.get("fields"):
+        fields = [f.strip() for f in request.args["fields"].split(",") if f.strip()]
+        unknown = [f for f in fields if f not in WARDROBE_ITEM_FIELDS]
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+        if "id" not in fields:
+            fields.insert(0, "id")
+    if fields is None or "attributes" in fields:
+        query = query.options(db.selectinload(WardrobeItem.attributes))
+    if fields is not None:
+        # Skip loading the large text columns when the caller did not ask for them
+        for name, column in (("description", WardrobeItem.description), ("error", WardrobeItem.error)):
+            if name not in fields:
+                query = query.options(db.defer(column))
+
+    query = query.order_by(WardrobeItem.created_at.desc(), WardrobeItem.id.desc())
+    paginated = "limit" in request.args or "cursor" in request.args
+    if not paginated:
+        # Deprecated bare-list response for clients that predate pagination. It is capped like any
+        # page (newest WARDROBE_MAX_PAGE_SIZE items); the cursor for the rest is in X-Next-Cursor.
+        items = query.limit(WARDROBE_MAX_PAGE_SIZE + 1).all()
+        response = jsonify([wardrobe_item_to_dict(i, fields) for i in items[:WARDROBE_MAX_PAGE_SIZE]])
+        response.headers["Deprecation"] = "true"
+        if len(items) > WARDROBE_MAX_PAGE_SIZE:
+            response.headers["X-Next-Cursor"] = encode_cursor(items[WARDROBE_MAX_PAGE_SIZE - 1])
+        return response
+
+    try:
+        limit = min(max(int(request.args.get("limit", WARDROBE_PAGE_SIZE)), 1), WARDROBE_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if request.args.get("cursor"):
+        try:
+            created_at, item_id = decode_cursor(request.args["cursor"])
+        except Exception:
+            return jsonify({"error": "Invalid cursor"}), 400
+        # Keyset condition: strictly after the last item of the previous page in (created_at, id) order
+        query = query.filter(db.tuple_(WardrobeItem.created_at, WardrobeItem.id) < (created_at, item_id))
 
+    items = query.limit(limit + 1).all()
+    has_more = len(items) > limit
+    items = items[:limit]
+    return jsonify({
+        "items": [wardrobe_item_to_dict(i, fields) for i in items],
+        "next_cursor": encode_cursor(items[-1]) if has_more else None
+    })
 
-@app.route("/wardrobe/<int:item_id>", methods=["GET"])
+
+@bp.route("/wardrobe/<int:item_id>", methods=["GET"])
 @token_required
 def get_wardrobe_item(current_user, item_id):
     item = WardrobeItem.query.filter_by(id=item_id, user_id=current_user.id).first_or_404()
     return jsonify(wardrobe_item_to_dict(item))
 
 
-@app.route("/wardrobe/<int:item_id>", methods=["DELETE"])
+@bp.route("/wardrobe/<int:item_id>/similar", methods=["GET"])
+@token_required
+def similar_wardrobe_items(current_user, item_id):
+    """
+    The user's items whose colours are closest to this one, by cosine similarity of their visual features.
+    """
+    started = time.perf_counter()
+    item = WardrobeItem.query.filter_by(id=item_id, user_id=current_user.id).first_or_404()
+    try:
+        limit = min(max(int(request.args.get("limit", SIMILAR_ITEMS_LIMIT)), 1), SIMILAR_ITEMS_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    from visual_features import from_bytes
+
+    index = wardrobe_feature_index(current_user.id)
+    query = index.vector(item.id)
+    if query is None and item.visual_features:
+        query = from_bytes(item.visual_features)  # e.g. an item still being ingested
+    if query is None:
+        return jsonify({"error": "No visual features for this item yet", "id": item_id}), 409
+
+    matches = index.nearest(query, limit, exclude={item.id})
+    items_by_id = {i.id: i for i in WardrobeItem.query.filter(WardrobeItem.id.in_([m for m, _ in matches]))
+                   .options(db.selectinload(WardrobeItem.attributes)).all()}
+    return jsonify({
+        "id": item_id,
+        "similar": [{"score": round(score, 4), "item": wardrobe_item_to_dict(items_by_id[m])}
+                    for m, score in matches if m in items_by_id],
+        "searched": len(index),
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    })
+
+
+@bp.route("/wardrobe/<int:item_id>", methods=["DELETE"])
 @token_required
 def delete_wardrobe_item(current_user, item_id):
     item = WardrobeItem.query.filter_by(id=item_id, user_id=current_user.id).first_or_404()
     path = os.path.join(WARDROBE_FOLDER, item.filename)
     if os.path.exists(path):
         os.remove(path)
+    delete_thumbnails(item.filename)
+    # The oldest copy of this garment becomes the original (and goes back into the prompt wardrobe);
+    # any other copies now repeat it
+    copies = db.session.query(WardrobeItem.id).filter_by(user_id=current_user.id, duplicate_of=item.id) \
+        .order_by(WardrobeItem.created_at, WardrobeItem.id).all()
+    if copies:
+        promoted = copies[0].id
+        WardrobeItem.query.filter_by(id=promoted).update({WardrobeItem.duplicate_of: None}, synchronize_session=False)
+        WardrobeItem.query.filter_by(user_id=current_user.id, duplicate_of=item.id) \
+            .update({WardrobeItem.duplicate_of: promoted}, synchronize_session=False)
     db.session.delete(item)
+    bump_wardrobe_version(current_user.id)
     db.session.commit()
     return jsonify({"message": "Deleted", "id": item_id})
 
 
-@app.route("/wardrobe/<int:item_id>/file", methods=["GET"])
+@bp.route("/wardrobe/<int:item_id>/file", methods=["GET"])
 @token_required
 def serve_wardrobe_image(current_user, item_id):
     item = WardrobeItem.query.filter_by(id=item_id, user_id=current_user.id).first_or_404()
-    return send_from_directory(WARDROBE_FOLDER, item.filename)
+    size = request.args.get("size")
+    if size and size not in THUMBNAIL_SIZES:
+        return jsonify({"error": f"Unknown size, expected one of: {', '.join(THUMBNAIL_SIZES)}"}), 400
+
+    path = os.path.join(WARDROBE_FOLDER, item.filename)
+    if not os.path.exists(path):
+        return jsonify({"error": "File not found"}), 404
+    if size:
+        path = get_thumbnail(path, size)
+
+    # Strong ETag + Last-Modified let the browser revalidate with a 304 instead of re-downloading
+    response = send_file(
+        os.path.abspath(path),
+        conditional=True,
+        etag=file_etag(path),
+        last_modified=os.path.getmtime(path),
+        max_age=IMAGE_CACHE_MAX_AGE,
+    )
+    # Images are behind auth: only the user's own browser may cache them
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.vary.add("Authorization")
+    return response
 
 
 # --- Outfit Suggestion Endpoint
 
-@app.route("/outfit", methods=["POST"])
-@token_required
-def upload_outfit_and_suggest(current_user):
+def summarize_weather(weather_json: Optional[Dict[str, Any]], units: str) -> str:
+    if not weather_json:
+        return "unknown"
+    main = weather_json.get("weather", [{}])[0].get("main")
+    desc = weather_json.get("weather", [{}])[0].get("description")
+    temp = weather_json.get("main", {}).get("temp")
+    return f"{main} ({desc}), temp={temp} {('°C' if units=='metric' else '°F')}"
+
+
+def resolve_weather(city, lat, lon, units: str, user_id=None):
+    """
+    Current weather for a city or lat/lon pair. Returns (weather_json or None, one-line summary).
+    """
+    weather_json = None
+    if city:
+        weather_json = get_weather_client().current_by_city(city=city, units=units)
+    elif lat and lon:
+        try:
+            weather_json = get_weather_client().current_by_coords(lat=float(lat), lon=float(lon), units=units)
+        except Exception as e:
+            logger.error(f"Failed to get weather by coordinates: {e}", extra={'user_id': user_id})
+            weather_json = None
+    return weather_json, summarize_weather(weather_json, units)
+
+
+# Static stylist instructions, sent as the model's system instruction; only the context below is built per request
+STYLIST_INSTRUCTIONS = (
+    "You are a professional AI personal stylist and fashion consultant. "
+    "Analyze the wardrobe and current outfit to provide styling recommendations that are practical, fashionable, and cohesive. "
+    "Your goal is to always suggest a COMPLETE OUTFIT from head to toe, including:\n"
+    "- Top (shirt, t-shirt, blouse, kurta, kurti, sherwani, etc.) — pick according to style, season, and occasion.\n"
+    "- Bottom (pants, jeans, trousers, skirts, palazzos, churidar, dhoti pants, salwar, lungi, etc.) — suggest what best fits the look.\n"
+    "- One-piece options (dress, saree, lehenga, anarkali, jumpsuit, etc.) if suitable for the event.\n"
+    "- Footwear (shoes, sneakers, boots, heels, sandals, juttis, kolhapuris, mojaris, etc.) — match the vibe of the outfit.\n"
+    "- Outerwear (jacket, coat, shrug, dupatta, stole, shawl — use when appropriate for season/weather).\n"
+    "- Accessories (watch, belt, hat, sunglasses, jewelry, bangles, bindi, kada, earrings, bags, clutches — keep tasteful and minimal).\n"
+    "- Optional Layering (scarf, cardigan, overshirt, ethnic vest/nehru jacket — only when weather or style calls for it).\n\n"
+    "STRICT INSTRUCTIONS:\n"
+    "- Return ONLY a properly formatted JSON response with this exact structure:\n"
+    "{\n"
+    '  \"recommendations\": [\n'
+    '    {\n'
+    '      \"wardrobe_id\": 123,\n'
+    '      \"reason\": \"Clear reason why this item complements the outfit\",\n'
+    '      \"fallback_text\": null\n'
+    '    },\n'
+    '    {\n'
+    '      \"wardrobe_id\": null,\n'
+    '      \"reason\": \"Reason for this suggestion\",\n'
+    '      \"fallback_text\": \"Specific item suggestion if not in wardrobe\"\n'
+    '    }\n'
+    '  ],\n'
+    '  \"notes\": \"Brief overall styling advice (color matching, fit, occasion suitability)\",\n'
+    '  \"weather_considerations\": \"How weather affects the recommendations (e.g., layering, breathable fabrics, waterproof shoes)\"\n'
+    "}\n\n"
+    "The request gives the CONTEXT (date, season, weather, profile), the AVAILABLE WARDROBE ITEMS and the CURRENT OUTFIT TO STYLE.\n\n"
+    "GUIDELINES:\n"
+    "- Prioritize using the current outfit over everything else. Suggest alternatives only if the current outfit is inappropriate for the occasion, season, or does not match well with other items.\n"
+    "- Prioritize using available wardrobe items (use wardrobe_id) to complete the outfit.\n"
+    "- Suggest buying new items (wardrobe_id=null + fallback_text) ONLY if that category is missing.\n"
+    "- Avoid recommending duplicate items of the same type if one is already in the outfit.\n"
+    "- Ensure outfit is appropriate for season, occasion, cultural setting, and weather.\n"
+    "- Mix colors, fabrics, and styles tastefully (avoid clashing colors unless intentional).\n"
+    "- For Indian outfits, match dupattas/shawls with the set, coordinate jewelry (simple for casual, heavier for festive events).\n"
+    "- Accessories should enhance the look but not overpower it.\n"
+    "- Keep suggestions inclusive, gender-neutral, and adaptable to any style preference.\n\n"
+    "Return ONLY the JSON object with no additional formatting or text."
+)
+
+
+def build_outfit_prompt(when: datetime, season: str, weather_summary: str, gender, skin_tone,
+                        wardrobe_digest_lines: List[str], outfit_descriptions: List[Dict[str, Any]]) -> str:
+    """
+    The per-request part of the stylist prompt; the static instructions are STYLIST_INSTRUCTIONS.
+    """
+    # --- Outfit description block (images whose analysis failed are left out) ---
+    outfit_digest_lines = [
+        f"Image {od['image_index']}: {od['description']}" for od in outfit_descriptions if od.get("description")
+    ]
+
+    # Handle case with no uploaded files - provide general suggestions
+    if not outfit_digest_lines:
+        outfit_digest_lines = ["No specific outfit uploaded. Provide general style suggestions based on weather and current wardrobe."]
+
+    # --- Context with multiple outfit images clearly labeled ---
+    return (
+        "CONTEXT:\n"
+        f"Date: {when.date().isoformat()}\n"
+        f"Season: {season}\n"
+        f"Weather: {weather_summary}\n"
+        + (f"Gender: {gender}\n" if gender else "")
+        + (f"Skin Tone: {skin_tone}\n" if skin_tone else "")
+        + "\n"
+        f"AVAILABLE WARDROBE ITEMS (use the ID numbers; format: {DIGEST_FORMAT}):\n"
+        + "\n".join(wardrobe_digest_lines) + "\n\n"
+        "CURRENT OUTFIT TO STYLE:\n"
+        + "\n".join(outfit_digest_lines)
+    )
+
+
+def parse_suggestion_text(suggestion_text: str, user_id=None) -> Dict[str, Any]:
+    suggestion_json = parse_suggestions(suggestion_text)
+    if suggestion_json is None:
+        suggestion_json = coerce_json(suggestion_text)
+    if not isinstance(suggestion_json, dict):
+        logger.error("JSON parsing failed for stylist reply", extra={'user_id': user_id})
+        suggestion_json = {"recommendations": [], "notes": suggestion_text}
+    return suggestion_json
+
+
+def resolve_recommendation(rec: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+    wid = rec.get("wardrobe_id")
+    resolved = {"wardrobe_id": wid, "reason": rec.get("reason"), "fallback_text": rec.get("fallback_text")}
+    if wid is not None:
+        try:
+            item = WardrobeItem.query.filter_by(id=int(wid), user_id=user_id).first()
+        except (TypeError, ValueError):
+            item = None
+        resolved["item"] = wardrobe_item_to_dict(item) if item else None
+    return resolved
+
+
+def weather_bucket(weather_json: Dict[str, Any], units: str) -> str:
+    """
+    Coarse weather key, e.g. "rain:5" (condition + SUGGESTION_TEMP_BAND_C-wide °C band), so that
+    small temperature changes between requests still hit the suggestion cache.
+    """
+    if not weather_json:
+        return "unknown"
+    condition = (weather_json.get("weather", [{}])[0].get("main") or "unknown").lower()
+    temperature = temperature_celsius(weather_json, units)
+    band = int(temperature // SUGGESTION_TEMP_BAND_C) if temperature is not None else "?"
+    return f"{condition}:{band}"
+
+
+def outfit_image_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def outfit_image_hashes(outfit: "OutfitRequest") -> tuple:
+    if outfit.image_hashes is None:
+        outfit.image_hashes = tuple(outfit_image_hash(data) for _, _, data in outfit.images)
+    return outfit.image_hashes
+
+
+def likely_cached_outfit(outfit: "OutfitRequest") -> bool:
+    """
+    Whether suggestions for these outfit images were memoized recently. Only a hint: the cached entry
+    may be for other weather or an older wardrobe, which cached_outfit_response checks once weather is known.
+    """
+    if suggested_outfits is None or bypass_suggestion_cache():
+        return False
+    return suggested_outfits.get((outfit.user_id, outfit_image_hashes(outfit))) is not MISSING
+
+
+def bypass_suggestion_cache() -> bool:
+    flag = request.args.get("no_cache") or request.form.get("no_cache") or ""
+    return flag.lower() in ("1", "true", "yes") or "no-cache" in (request.headers.get("Cache-Control") or "")
+
+
+def sse_event(name: str, data: Any) -> str:
+    return f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def wants_event_stream() -> bool:
+    flag = request.args.get("stream") or request.form.get("stream")
+    if flag is not None:
+        return flag.lower() in ("1", "true", "yes")
+    return "text/event-stream" in (request.headers.get("Accept") or "")
+
+
+@dataclass
+class OutfitRequest:
+    """
+    A validated /outfit request with its images read into memory; shared by the route below and async_api.
+    """
+    user_id: int
+    gender: str
+    skin_tone: str
+    city: Optional[str]
+    lat: Optional[str]
+    lon: Optional[str]
+    units: str
+    when: datetime
+    season: str
+    stream: bool
+    images: List[tuple]  # (image index, uploaded filename, image bytes)
+    image_hashes: Optional[tuple] = None  # see outfit_image_hashes
+    cache_key: Optional[tuple] = None
+    cache_status: str = "disabled"
+
+
+def degrade_stage(name: str, reason: str, user_id=None, error: Optional[BaseException] = None) -> None:
+    STAGE_DEGRADED.inc(stage=name, reason=reason)
+    what = "timed out" if reason == "timeout" else f"failed ({error})"
+    logger.warning(f"Outfit stage {name} {what}; continuing without it", extra={'user_id': user_id})
+
+
+def submit_stage(executor: ThreadPoolExecutor, name: str, fn, *args) -> Future:
+    """
+    Run fn(*args) on executor as a stage of the current request. It gets its own app context, and so
+    its own DB session rather than sharing the request's; its duration is added to the request's spans.
+    """
+    app = current_app._get_current_object()
+    spans = request_spans(create=True)
+
+    def run():
+        started = time.perf_counter()
+        try:
+            with app.app_context():
+                return fn(*args)
+        finally:
+            record_span(name, time.perf_counter() - started, spans)
+    return executor.submit(run)
+
+
+def stage_result(future: Future, name: str, deadline: float, default, user_id=None):
+    """
+    The stage's result, or default if it raised or is still running at deadline (a time.monotonic() value).
+    A timed-out stage is not interrupted: its thread finishes in the background and the result is dropped.
+    """
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except TimeoutError:
+        degrade_stage(name, "timeout", user_id)
+    except Exception as e:
+        degrade_stage(name, "error", user_id, e)
+    return default
+
+
+class OutfitStages:
+    """
+    The /outfit stages that do not depend on each other, started together: the weather lookup, the
+    outfit image analyses (one model call per batch of images) and loading the wardrobe to rank. Only the prompt needs all of them.
+    Each has its own timeout, and a stage that fails or times out degrades (weather "unknown", image
+    left out of the prompt, nothing to rank) instead of failing the request.
+    With analyze=False the analyses wait for start_analyses(), e.g. until a suggestion-cache lookup has missed.
+    """
+
+    def __init__(self, outfit: OutfitRequest, analyze: bool = True):
+        started = time.monotonic()
+        self.outfit = outfit
+        self.weather_deadline = started + OUTFIT_WEATHER_TIMEOUT
+        self.analyze_deadline = started + OUTFIT_ANALYZE_TIMEOUT
+        self.wardrobe_deadline = started + OUTFIT_WARDROBE_TIMEOUT
+        self.analyses: List[Optional[tuple]] = [None] * len(outfit.images)  # (raw, parsed) or None
+
+        self._weather = submit_stage(weather_executor, "weather", resolve_weather,
+                                     outfit.city, outfit.lat, outfit.lon, outfit.units, outfit.user_id)
+        self._wardrobe = submit_stage(wardrobe_executor, "wardrobe_load", load_wardrobe_candidates, outfit.user_id)
+        self._batches = analysis_batches(len(outfit.images))
+        self._analyses: List[Future] = []
+        if analyze:
+            self.start_analyses()
+
+    def start_analyses(self) -> None:
+        if self._analyses or not self._batches:
+            return
+        self.analyze_deadline = time.monotonic() + OUTFIT_ANALYZE_TIMEOUT
+        self._analyses = [submit_stage(analysis_executor, "analyze", analyze_images,
+                                       [self.outfit.images[i][2] for i in batch]) for batch in self._batches]
+
+    def weather(self):
+        return stage_result(self._weather, "weather", self.weather_deadline, (None, "unknown"), self.outfit.user_id)
+
+    def wardrobe(self):
+        return stage_result(self._wardrobe, "wardrobe_load", self.wardrobe_deadline, ([], []), self.outfit.user_id)
+
+    def analyzed(self) -> Iterator[int]:
+        """
+        Yield each image's position as its analysis finishes, fails or times out; results go into self.analyses.
+        """
+        self.start_analyses()
+        batches = dict(zip(self._analyses, self._batches))
+        pending = set(self._analyses)
+        try:
+            for future in as_completed(self._analyses, timeout=max(0.0, self.analyze_deadline - time.monotonic())):
+                pending.discard(future)
+                results = stage_result(future, "analyze", self.analyze_deadline, None, self.outfit.user_id)
+                for position, result in zip(batches[future], results or [None] * len(batches[future])):
+                    if isinstance(result, BaseException):
+                        degrade_stage("analyze", "error", self.outfit.user_id, result)
+                        result = None
+                    self.analyses[position] = result
+                    yield position
+        except TimeoutError:
+            for future in sorted(pending, key=lambda f: batches[f].start):
+                for position in batches[future]:
+                    degrade_stage("analyze", "timeout", self.outfit.user_id)
+                    yield position
+
+    def cancel(self) -> None:
+        # Only stages still queued are cancelled; running ones finish and are ignored
+        for future in [self._weather, self._wardrobe, *self._analyses]:
+            future.cancel()
+
+
+def read_outfit_request(current_user):
+    """
+    Check the profile, read the uploaded outfit images and work out date and season.
+    Returns (OutfitRequest, None) or (None, error response).
+    """
+    # Checked before the form is parsed, so an oversized upload is never read. The lower per-request
+    # limit also stops a chunked body (no Content-Length) while it is being parsed.
+    if (request.content_length or 0) > OUTFIT_MAX_UPLOAD_BYTES:
+        return None, (jsonify({"error": "Upload too large", "max_bytes": OUTFIT_MAX_UPLOAD_BYTES}), 413)
+    request.max_content_length = OUTFIT_MAX_UPLOAD_BYTES
+
     city = request.form.get("city")
     hemisphere = (request.form.get("hemisphere") or "north").lower()
     units = (request.form.get("units") or "metric").lower()
@@ -468,11 +1810,11 @@ def upload_outfit_and_suggest(current_user):
         
         logger.warning("User has incomplete profile", extra={'user_id': current_user.id})
         
-        return jsonify({
+        return None, (jsonify({
             "error": "Profile incomplete",
             "message": f"Please complete your profile by adding: {', '.join(missing_fields)}. Visit your profile page to update this information.",
             "missing_fields": missing_fields
-        }), 400
+        }), 400)
 
     # --- Handle multiple files ---
     files = request.files.getlist("files")
@@ -484,200 +1826,326 @@ def upload_outfit_and_suggest(current_user):
     # Filter out empty files
     files = [f for f in files if f and f.filename and f.filename != '']
 
-    # Create temporary folder for outfit analysis (separate from wardrobe)
-    OUTFIT_TEMP_FOLDER = os.path.join("uploads", "outfit_temp")
-    os.makedirs(OUTFIT_TEMP_FOLDER, exist_ok=True)
+    # Read the images up front: the request stream is gone once a streamed response starts.
+    # Outfit images are throwaway, so they are analyzed from memory and never written to disk.
+    images = []
+    with span("read_files"):
+        for idx, file in enumerate(files):
+            if not (file and allowed_file(file.filename)):
+                continue
+            if isinstance(file.stream, io.BytesIO):
+                # InMemoryUploadRequest: getvalue() hands over the stream's own buffer, where read()
+                # would copy it. It stays bytes, which the BytesIO wrappers downstream share as well
+                # (wrapping getbuffer()'s memoryview would copy once per consumer instead).
+                data = file.stream.getvalue()
+            else:
+                data = file.read()  # spooled to a temporary file
+            images.append((idx, secure_filename(file.filename), data))
 
-    # --- Analyze each uploaded outfit image ---
-    outfit_descriptions: List[Dict[str, Any]] = []
-    temp_files_to_cleanup = []
-    
-    try:
-        # Only analyze files if they were uploaded
-        if files:
-            for idx, file in enumerate(files):
-                if not (file and allowed_file(file.filename)):
-                    continue
-                
-                # Generate unique filename to avoid collisions
-                ext = file.filename.rsplit(".", 1)[1].lower() if "." in file.filename else "jpg"
-                unique_filename = f"outfit_{uuid.uuid4().hex[:8]}.{ext}"
-                filepath = os.path.join(OUTFIT_TEMP_FOLDER, unique_filename)
-                
-                file.save(filepath)
-                temp_files_to_cleanup.append(filepath)
-                
-                raw, _ = analyzer.analyze(filepath)
-                outfit_descriptions.append({
-                    "filename": unique_filename,
-                    "description": raw,
-                    "image_index": idx + 1
-                })
-
-        # --- Handle date / season ---
-        if date_str:
-            try:
-                when = datetime.fromisoformat(date_str)
-            except Exception:
-                when = datetime.utcnow()
-        else:
+    # --- Handle date / season ---
+    if date_str:
+        try:
+            when = datetime.fromisoformat(date_str)
+        except Exception:
             when = datetime.utcnow()
+    else:
+        when = datetime.utcnow()
 
-        season = infer_season(when, hemisphere=hemisphere)
+    return OutfitRequest(
+        user_id=current_user.id, gender=gender, skin_tone=skin_tone, city=city, lat=lat, lon=lon, units=units,
+        when=when, season=infer_season(when, hemisphere=hemisphere), stream=wants_event_stream(),
+        images=images,
+    ), None
 
-        # --- Get weather data (city OR lat/lon) ---
-        weather_json = None
-        if city:
-            weather_json = weather_client.current_by_city(city=city, units=units)
-        elif lat and lon:
-            try:
-                weather_json = weather_client.current_by_coords(lat=float(lat), lon=float(lon), units=units)
-            except Exception as e:
-                logger.error(f"Failed to get weather by coordinates: {e}", extra={'user_id': current_user.id})
-                weather_json = None
-
-        weather_summary = "unknown"
-        if weather_json:
-            main = weather_json.get("weather", [{}])[0].get("main")
-            desc = weather_json.get("weather", [{}])[0].get("description")
-            temp = weather_json.get("main", {}).get("temp")
-            weather_summary = f"{main} ({desc}), temp={temp} {('°C' if units=='metric' else '°F')}"
-
-        # --- Wardrobe summary for prompt ---
-        wardrobe_items = WardrobeItem.query.filter_by(user_id=current_user.id).order_by(WardrobeItem.created_at.desc()).limit(MAX_PROMPT_WARDROBE).all()
-        wardrobe_digest_lines = [f"[{wi.id}] {wi.description}" for wi in wardrobe_items]
-
-        # --- Outfit description block ---
-        outfit_digest_lines = [
-            f"Image {od['image_index']}: {od['description']}" for od in outfit_descriptions
-        ]
-        
-        # Handle case with no uploaded files - provide general suggestions
-        if not outfit_descriptions:
-            outfit_digest_lines = ["No specific outfit uploaded. Provide general style suggestions based on weather and current wardrobe."]
-
-        # --- Build prompt with multiple outfit images clearly labeled ---
-        prompt = (
-            "You are a professional AI personal stylist and fashion consultant. "
-            "Analyze the wardrobe and current outfit to provide styling recommendations that are practical, fashionable, and cohesive. "
-            "Your goal is to always suggest a COMPLETE OUTFIT from head to toe, including:\n"
-            "- Top (shirt, t-shirt, blouse, kurta, kurti, sherwani, etc.) — pick according to style, season, and occasion.\n"
-            "- Bottom (pants, jeans, trousers, skirts, palazzos, churidar, dhoti pants, salwar, lungi, etc.) — suggest what best fits the look.\n"
-            "- One-piece options (dress, saree, lehenga, anarkali, jumpsuit, etc.) if suitable for the event.\n"
-            "- Footwear (shoes, sneakers, boots, heels, sandals, juttis, kolhapuris, mojaris, etc.) — match the vibe of the outfit.\n"
-            "- Outerwear (jacket, coat, shrug, dupatta, stole, shawl — use when appropriate for season/weather).\n"
-            "- Accessories (watch, belt, hat, sunglasses, jewelry, bangles, bindi, kada, earrings, bags, clutches — keep tasteful and minimal).\n"
-            "- Optional Layering (scarf, cardigan, overshirt, ethnic vest/nehru jacket — only when weather or style calls for it).\n\n"
-            "STRICT INSTRUCTIONS:\n"
-            "- Return ONLY a properly formatted JSON response with this exact structure:\n"
-            "{\n"
-            '  \"recommendations\": [\n'
-            '    {\n'
-            '      \"wardrobe_id\": 123,\n'
-            '      \"reason\": \"Clear reason why this item complements the outfit\",\n'
-            '      \"fallback_text\": null\n'
-            '    },\n'
-            '    {\n'
-            '      \"wardrobe_id\": null,\n'
-            '      \"reason\": \"Reason for this suggestion\",\n'
-            '      \"fallback_text\": \"Specific item suggestion if not in wardrobe\"\n'
-            '    }\n'
-            '  ],\n'
-            '  \"notes\": \"Brief overall styling advice (color matching, fit, occasion suitability)\",\n'
-            '  \"weather_considerations\": \"How weather affects the recommendations (e.g., layering, breathable fabrics, waterproof shoes)\"\n'
-            "}\n\n"
-            "CONTEXT:\n"
-            f"Date: {when.date().isoformat()}\n"
-            f"Season: {season}\n"
-            f"Weather: {weather_summary}\n"
-            + (f"Gender: {gender}\n" if gender else "")
-            + (f"Skin Tone: {skin_tone}\n" if skin_tone else "")
-            + "\n"
-            "AVAILABLE WARDROBE ITEMS (use the ID numbers):\n"
-            + "\n".join(wardrobe_digest_lines) + "\n\n"
-            "CURRENT OUTFIT TO STYLE:\n"
-            + "\n".join(outfit_digest_lines) + "\n\n"
-            "GUIDELINES:\n"
-            "- Prioritize using the current outfit over everything else. Suggest alternatives only if the current outfit is inappropriate for the occasion, season, or does not match well with other items.\n"
-            "- Prioritize using available wardrobe items (use wardrobe_id) to complete the outfit.\n"
-            "- Suggest buying new items (wardrobe_id=null + fallback_text) ONLY if that category is missing.\n"
-            "- Avoid recommending duplicate items of the same type if one is already in the outfit.\n"
-            "- Ensure outfit is appropriate for season, occasion, cultural setting, and weather.\n"
-            "- Mix colors, fabrics, and styles tastefully (avoid clashing colors unless intentional).\n"
-            "- For Indian outfits, match dupattas/shawls with the set, coordinate jewelry (simple for casual, heavier for festive events).\n"
-            "- Accessories should enhance the look but not overpower it.\n"
-            "- Keep suggestions inclusive, gender-neutral, and adaptable to any style preference.\n\n"
-            "Return ONLY the JSON object with no additional formatting or text."
+
+def event_stream_response(body, cache_status: Optional[str] = None) -> flask.Response:
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if cache_status:
+        headers["X-Suggestion-Cache"] = cache_status
+    return flask.Response(body, mimetype="text/event-stream", headers=headers)
+
+
+def cached_outfit_response(outfit: OutfitRequest, weather_json: Optional[Dict[str, Any]]) -> Optional[flask.Response]:
+    """
+    Memoized suggestions: same wardrobe/profile version, outfit images, season and weather bucket.
+    Sets outfit.cache_key/cache_status; returns the response to send on a hit, else None.
+    """
+    if suggestion_cache is None:
+        return None
+    with span("suggestion_cache"):
+        outfit.cache_key = (
+            outfit.user_id,
+            current_wardrobe_version(outfit.user_id),
+            outfit_image_hashes(outfit),
+            outfit.season,
+            weather_bucket(weather_json, outfit.units),
         )
+        outfit.cache_status = "bypass" if bypass_suggestion_cache() else "miss"
+        cached = suggestion_cache.get(outfit.cache_key) if outfit.cache_status == "miss" else MISSING
+    if cached is MISSING:
+        return None
+
+    logger.info("Outfit suggestions served from cache", extra={'user_id': outfit.user_id})
+    payload = dict(cached, season=outfit.season, weather=weather_json)
+    if outfit.stream:
+        def replay():
+            for rec in payload["suggestions"]:
+                yield sse_event("recommendation", rec)
+            done = {k: v for k, v in payload.items() if k != "suggestions"}
+            yield sse_event("done", dict(done, cached=True))
+        response = event_stream_response(replay())
+    else:
+        response = jsonify(payload)
+    response.headers["X-Suggestion-Cache"] = "hit"
+    return response
 
-        # --- Get AI suggestions ---
-        
-        # --- DEV ONLY: Print the full prompt to the console for easy debugging ---
-        if app.debug:
-            print("\n" + "="*50)
-            print(f"PROMPT FOR REQUEST: {flask.g.request_id}")
-            print("="*50)
-            print(prompt)
-            print("="*50 + "\n")
-        # -----------------------------------------------------------------------
-        
-        logger.info(f"Sending prompt to AI analyzer (length: {len(prompt)} chars)", extra={'user_id': current_user.id})
-        suggestion_text = analyzer.suggest(prompt)
-        
-        try:
-            # Handle markdown code blocks and clean the JSON
-            clean_text = suggestion_text.strip()
-            if clean_text.startswith("```json"):
-                clean_text = clean_text[7:]  # Remove ```json
-            if clean_text.startswith("```"):
-                clean_text = clean_text[3:]   # Remove ```
-            if clean_text.endswith("```"):
-                clean_text = clean_text[:-3]  # Remove ```
-            clean_text = clean_text.strip()
-            
-            suggestion_json = json.loads(clean_text)
-        except Exception as e:
-            logger.error(f"JSON parsing failed: {e}", extra={'user_id': current_user.id})
-            suggestion_json = {"recommendations": [], "notes": suggestion_text}
-
-        out_recs = []
-        for rec in suggestion_json.get("recommendations", []):
-            wid = rec.get("wardrobe_id")
-            reason = rec.get("reason")
-            fallback = rec.get("fallback_text")
-            resolved = {"wardrobe_id": wid, "reason": reason, "fallback_text": fallback}
-            if wid is not None:
-                item = WardrobeItem.query.get(wid)
-                resolved["item"] = wardrobe_item_to_dict(item) if item else None
-            out_recs.append(resolved)
-        
-        return jsonify({
-            "outfit_descriptions": outfit_descriptions,
-            "season": season,
-            "weather": weather_json,
+
+def remember_suggestions(outfit: OutfitRequest, outfit_descriptions, suggestion_text, suggestion_json, out_recs):
+    # Unparseable replies are not cached so the next request gets a fresh attempt
+    if outfit.cache_key is None or not out_recs:
+        return
+    suggestion_cache.set(outfit.cache_key, {
+        "outfit_descriptions": outfit_descriptions,
+        "suggestions_raw": suggestion_text,
+        "suggestions": out_recs,
+        "notes": suggestion_json.get("notes"),
+        "weather_considerations": suggestion_json.get("weather_considerations"),
+    })
+    suggested_outfits.set((outfit.user_id, outfit_image_hashes(outfit)), True)
+
+
+def build_outfit_context(outfit: OutfitRequest, weather_json, weather_summary: str, analyses: List[Optional[tuple]],
+                         candidates=None):
+    """
+    Rank the wardrobe against the analyzed outfit and build the stylist prompt. analyses holds
+    (raw, parsed) per saved image, None where the analysis failed; candidates is the wardrobe from
+    load_wardrobe_candidates (loaded here if not given).
+    Returns (prompt, outfit_descriptions, wardrobe item count).
+    """
+    outfit_descriptions = []
+    for (idx, filename, _), analysis in zip(outfit.images, analyses):
+        entry = {"filename": filename, "description": analysis[0] if analysis else None, "image_index": idx + 1}
+        if analysis is None:
+            entry["error"] = "Analysis unavailable"
+        outfit_descriptions.append(entry)
+    outfit_parsed = [analysis[1] for analysis in analyses if analysis and analysis[1]]
+
+    # --- Wardrobe summary for prompt ---
+    with span("visual_features"):
+        outfit_features = outfit_visual_features(outfit.images)
+    with span("wardrobe_rank"):
+        context = ranking_context(outfit.season, weather_json, outfit.units, outfit_parsed, outfit_features)
+        wardrobe_items = select_prompt_wardrobe(outfit.user_id, context, candidates=candidates)
+    with span("prompt_build"):
+        wardrobe_digest_lines = build_wardrobe_section(wardrobe_items)
+        prompt = build_outfit_prompt(outfit.when, outfit.season, weather_summary, outfit.gender, outfit.skin_tone,
+                                     wardrobe_digest_lines, outfit_descriptions)
+
+    # --- DEV ONLY: Print the full prompt to the console for easy debugging ---
+    if current_app.debug:
+        print("\n" + "="*50)
+        print(f"PROMPT FOR REQUEST: {flask.g.request_id}")
+        print("="*50)
+        print(prompt)
+        print("="*50 + "\n")
+    # -----------------------------------------------------------------------
+
+    wardrobe_chars = sum(len(line) + 1 for line in wardrobe_digest_lines)
+    PROMPT_CHARS.observe(len(prompt))
+    PROMPT_CHARS_TOTAL.inc(len(prompt))
+    logger.info(
+        f"Sending prompt to AI analyzer (length: {len(prompt)} chars, ~{len(prompt) // 4} tokens; "
+        f"wardrobe: {len(wardrobe_digest_lines)} items, {wardrobe_chars} chars)",
+        extra={'user_id': outfit.user_id}
+    )
+    return prompt, outfit_descriptions, len(wardrobe_digest_lines)
+
+
+def suggestion_response(outfit: OutfitRequest, weather_json, outfit_descriptions, suggestion_text: str) -> flask.Response:
+    with span("parse"):
+        suggestion_json = parse_suggestion_text(suggestion_text, outfit.user_id)
+    with span("resolve_items"):
+        out_recs = [resolve_recommendation(rec, outfit.user_id) for rec in suggestion_json.get("recommendations", [])]
+    remember_suggestions(outfit, outfit_descriptions, suggestion_text, suggestion_json, out_recs)
+
+    response = jsonify({
+        "outfit_descriptions": outfit_descriptions,
+        "season": outfit.season,
+        "weather": weather_json,
+        "suggestions_raw": suggestion_text,
+        "suggestions": out_recs,
+        "notes": suggestion_json.get("notes")
+    })
+    response.headers["X-Suggestion-Cache"] = outfit.cache_status
+    return response
+
+
+class SuggestionEvents:
+    """
+    Turns streamed stylist text into SSE events: a "recommendation" as soon as each one is complete,
+    then "done". feed() and finish() look wardrobe ids up in the database.
+    """
+
+    def __init__(self, outfit: OutfitRequest, weather_json, outfit_descriptions, started: float):
+        self.outfit = outfit
+        self.weather_json = weather_json
+        self.outfit_descriptions = outfit_descriptions
+        self.started = started
+        self.parser = SuggestionStreamParser()
+        self.chunks: List[str] = []
+        self.out_recs: List[Dict[str, Any]] = []
+        self.first_rec_ms = None
+
+    def _recommendation(self, rec: Dict[str, Any]) -> str:
+        if self.first_rec_ms is None:
+            self.first_rec_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        self.out_recs.append(resolve_recommendation(rec, self.outfit.user_id))
+        return sse_event("recommendation", self.out_recs[-1])
+
+    def feed(self, chunk: str) -> List[str]:
+        self.chunks.append(chunk)
+        return [self._recommendation(rec) for rec in self.parser.feed(chunk)]
+
+    def finish(self) -> List[str]:
+        user_id = self.outfit.user_id
+        suggestion_text = "".join(self.chunks)
+        suggestion_json = self.parser.result() or parse_suggestion_text(suggestion_text, user_id)
+        events = []
+        if not self.parser.items:
+            # Nothing could be parsed incrementally (e.g. malformed JSON); send what we have
+            events = [self._recommendation(rec) for rec in suggestion_json.get("recommendations", [])]
+        remember_suggestions(self.outfit, self.outfit_descriptions, suggestion_text, suggestion_json, self.out_recs)
+        logger.info(
+            f"Streamed outfit suggestions: first recommendation after {self.first_rec_ms} ms, "
+            f"done after {round((time.perf_counter() - self.started) * 1000, 1)} ms",
+            extra={'user_id': user_id, 'spans': request_spans()}
+        )
+        events.append(sse_event("done", {
+            "outfit_descriptions": self.outfit_descriptions,
+            "season": self.outfit.season,
+            "weather": self.weather_json,
             "suggestions_raw": suggestion_text,
-            "suggestions": out_recs,
-            "notes": suggestion_json.get("notes")
-        })
+            "notes": suggestion_json.get("notes"),
+            "weather_considerations": suggestion_json.get("weather_considerations"),
+            "cached": False,
+        }))
+        return events
 
-    finally:
-        # Cleanup temporary outfit files after analysis
-        for temp_file in temp_files_to_cleanup:
+
+@bp.route("/outfit", methods=["POST"])
+@token_required
+def upload_outfit_and_suggest(current_user):
+    outfit, error = read_outfit_request(current_user)
+    if error is not None:
+        return error
+    user_id = outfit.user_id
+
+    # Weather, the image analyses and the wardrobe load run concurrently, each with its own timeout.
+    # Images suggested for recently are a likely cache hit: their analyses only start once the lookup
+    # misses, so a hit does not pay for a model call already in flight.
+    stages = OutfitStages(outfit, analyze=not likely_cached_outfit(outfit))
+    weather_json, weather_summary = stages.weather()
+
+    cached = cached_outfit_response(outfit, weather_json)
+    if cached is not None:
+        stages.cancel()
+        return cached
+    stages.start_analyses()
+
+    def prepare():
+        """
+        Wait for the outfit stages, yielding (name, payload) progress pairs;
+        the final pair is ("prompt", (prompt, outfit_descriptions)).
+        """
+        yield "weather", {"season": outfit.season, "summary": weather_summary, "weather": weather_json}
+
+        for analyzed, position in enumerate(stages.analyzed(), start=1):
+            yield "image_analyzed", {"image_index": outfit.images[position][0] + 1, "analyzed": analyzed,
+                                     "total": len(outfit.images), "failed": stages.analyses[position] is None}
+
+        prompt, outfit_descriptions, wardrobe_count = build_outfit_context(
+            outfit, weather_json, weather_summary, stages.analyses, stages.wardrobe())
+        yield "wardrobe_selected", {"items": wardrobe_count}
+        yield "prompt", (prompt, outfit_descriptions)
+
+    if outfit.stream:
+        def generate():
+            started = time.perf_counter()
             try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
+                for name, payload in prepare():
+                    if name == "prompt":
+                        prompt, outfit_descriptions = payload
+                    else:
+                        yield sse_event(name, payload)
+
+                events = SuggestionEvents(outfit, weather_json, outfit_descriptions, started)
+                with span("suggest"):
+                    for chunk in get_analyzer().suggest_stream(prompt, STYLIST_INSTRUCTIONS):
+                        yield from events.feed(chunk)
+                yield from events.finish()
             except Exception as e:
-                logger.warning(f"Could not cleanup temp file {temp_file}: {e}", extra={'user_id': current_user.id})
+                logger.error(f"Streaming outfit suggestion failed: {e}", extra={'user_id': user_id})
+                yield sse_event("error", {"error": "Suggestion failed", "message": str(e)})
+
+        return event_stream_response(flask.stream_with_context(generate()), outfit.cache_status)
+
+    for name, payload in prepare():
+        if name == "prompt":
+            prompt, outfit_descriptions = payload
 
+    # --- Get AI suggestions ---
+    with span("suggest"):
+        suggestion_text = get_analyzer().suggest(prompt, STYLIST_INSTRUCTIONS)
+    return suggestion_response(outfit, weather_json, outfit_descriptions, suggestion_text)
+
+
+# --- Metrics
+
+def _cache_samples():
+    caches = {
+        "analysis": analysis_cache,
+        "suggestion": suggestion_cache,
+        "weather": getattr(weather_client, "cache", None),
+        "auth_token": token_cache,
+        "auth_user": user_cache,
+    }
+    for name, cache in caches.items():
+        if cache is not None:
+            stats = cache.stats()
+            yield "cache_requests_total", {"cache": name, "result": "hit"}, stats["hits"]
+            yield "cache_requests_total", {"cache": name, "result": "miss"}, stats["misses"]
+
+def _cache_entry_samples():
+    for name, cache in (("analysis", analysis_cache), ("suggestion", suggestion_cache),
+                        ("weather", getattr(weather_client, "cache", None))):
+        if cache is not None:
+            yield "cache_entries", {"cache": name}, cache.stats()["entries"]
+
+registry.register_collector("cache_requests_total", "counter", "Cache lookups by result.", _cache_samples)
+registry.register_collector("cache_entries", "gauge", "Entries currently cached.", _cache_entry_samples)
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    return flask.Response(registry.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
 
 # --- Health Check
-@app.route("/api/health", methods=["GET"])
+@bp.route("/api/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok", "time": datetime.utcnow().isoformat()})
+    return jsonify({
+        "status": "ok",
+        "time": datetime.utcnow().isoformat(),
+        "analysis_cache": analysis_cache.stats() if analysis_cache else None,
+        "suggestion_cache": suggestion_cache.stats() if suggestion_cache else None,
+        "startup": current_app.extensions.get("startup_timing"),
+        "configured": {
+            "gemini": bool(os.environ.get("GEMINI_API_KEY")),
+            "openweather": bool(os.environ.get("OPENWEATHER_API_KEY")),
+        }
+    })
 
 # --- Frontend Static Files (for production deployment)
-@app.route("/", defaults={"path": ""})
-@app.route("/<path:path>")
+@bp.route("/", defaults={"path": ""})
+@bp.route("/<path:path>")
 def serve_frontend(path):
     """Serve the React frontend static files"""
     static_dir = os.path.join(os.path.dirname(__file__), "static")
@@ -693,8 +2161,83 @@ def serve_frontend(path):
         # Development mode - return health check
         return jsonify({"status": "ok", "time": datetime.utcnow().isoformat(), "mode": "development"})
 
+# --- App factory
+class InMemoryUploadRequest(flask.Request):
+    """
+    Keeps /outfit uploads up to OUTFIT_MAX_UPLOAD_BYTES in memory; werkzeug spools anything over
+    500 KB to a temporary file, which every outfit photo would otherwise hit. Other routes (e.g.
+    multi-file wardrobe uploads, which are written to disk anyway) keep werkzeug's default.
+    """
+
+    in_memory_endpoints = {"api.upload_outfit_and_suggest"}
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if (self.endpoint in self.in_memory_endpoints and total_content_length is not None
+                and total_content_length <= OUTFIT_MAX_UPLOAD_BYTES):
+            return io.BytesIO()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
+IMPORT_MS = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
+
+def create_app(config: Optional[Dict[str, Any]] = None) -> Flask:
+    """
+    Build the Flask app. Only cheap setup happens here: the Gemini and OpenWeather clients, the
+    analysis cache and the heavy libraries behind them (google.generativeai, PIL, NumPy) load on
+    first use. The schema is created/upgraded here when AUTO_MIGRATE is on, otherwise via `flask init-db`.
+    """
+    started = time.perf_counter()
+    app = Flask(__name__)
+    app.request_class = InMemoryUploadRequest
+    app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
+    app.config['JWT_SECRET'] = os.environ.get("JWT_SECRET", app.secret_key)
+    app.config['JWT_EXPIRATION_DELTA'] = timedelta(days=7)
+    app.config["UPLOAD_FOLDER"] = WARDROBE_FOLDER
+    app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///fashion.db")
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["AUTO_MIGRATE"] = AUTO_MIGRATE
+    app.config["INGEST_RESUME"] = True
+    if config:
+        app.config.update(config)
+
+    if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        # Wait for the write lock instead of failing immediately with "database is locked"
+        app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {"connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}})
+
+    # Configure CORS
+    CORS(app, origins=['*'], supports_credentials=True)
+    db.init_app(app)
+    login_manager.init_app(app)
+    app.register_blueprint(bp)
+    os.makedirs(WARDROBE_FOLDER, exist_ok=True)
+
+    migrate_ms = None
+    if app.config["AUTO_MIGRATE"]:
+        migrate_started = time.perf_counter()
+        with app.app_context():
+            init_db()
+        migrate_ms = round((time.perf_counter() - migrate_started) * 1000, 1)
+
+    worker = IngestionWorker(app, ingest_wardrobe_item, unfinished_wardrobe_item_ids, workers=INGEST_WORKERS,
+                             sweep_interval=INGEST_SWEEP_INTERVAL)
+    app.extensions["ingestion_worker"] = worker
+    if app.config["INGEST_RESUME"]:
+        try:
+            worker.resume()
+        except Exception as e:  # e.g. AUTO_MIGRATE=0 and `flask init-db` has not been run yet
+            logger.warning(f"Could not resume ingestion jobs: {e}")
+        worker.start_sweeping()
+
+    timing = {"import_ms": IMPORT_MS, "migrate_ms": migrate_ms,
+              "create_app_ms": round((time.perf_counter() - started) * 1000, 1)}
+    app.extensions["startup_timing"] = timing
+    logger.info(f"App ready: import {timing['import_ms']} ms, create_app {timing['create_app_ms']} ms "
+                f"(schema {migrate_ms} ms)")
+    return app
+
 if __name__ == "__main__":
     # Always use port 8080 for backend in development to avoid conflict with frontend
     port = 8080
     debug_mode = True  # Enable debug mode for development
-    app.run(host="127.0.0.1", port=port, debug=debug_mode)
\ No newline at end of file
+    create_app().run(host="127.0.0.1", port=port, debug=debug_mode)
\ No newline at end of file
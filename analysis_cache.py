@@ -0,0 +1,146 @@
+# analysis_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional, Tuple, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+def image_fingerprint(img) -> str:
+    """
+    Content hash of a decoded PIL image.
+    Hashes mode, dimensions and pixel data so that the same picture re-encoded
+    or re-uploaded under another filename maps to the same key.
+    """
+    h = hashlib.sha256()
+    h.update(f"{img.mode}:{img.width}x{img.height}:".encode("utf-8"))
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+class AnalysisCache:
+    """
+    Persistent cache of FashionAnalyzer.analyze results, stored in a small SQLite file.
+
+    Entries are keyed by image fingerprint + model name + prompt version and hold both
+    the raw model text and the parsed JSON. Eviction is age based (max_age seconds since
+    the entry was written) and size based (least recently used beyond max_entries).
+
+    Reads stay reads: a hit only rewrites accessed_at once it is touch_interval seconds old, which
+    is precise enough for LRU eviction. Eviction runs when the tracked row count passes max_entries
+    (trimming to 90% of it, so it does not rerun on every insert) or every evict_every writes,
+    which also picks up rows other processes added to the same file.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, max_age: float = 30 * 24 * 3600,
+                 touch_interval: float = 600.0, evict_every: int = 100):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.touch_interval = touch_interval
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_cache ("
+            " key TEXT PRIMARY KEY,"
+            " raw TEXT NOT NULL,"
+            " parsed TEXT,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_analysis_cache_accessed ON analysis_cache (accessed_at)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        self._writes = 0  # sets since the last eviction pass
+
+    @staticmethod
+    def make_key(fingerprint: str, model: str, prompt_version: str) -> str:
+        return hashlib.sha256(f"{model}|{prompt_version}|{fingerprint}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT raw, parsed, created_at, accessed_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.max_age and now - row[2] > self.max_age):
+                if row is not None:
+                    self._conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self.evictions += 1
+                    self._count -= 1
+                self.misses += 1
+                return None
+            if now - row[3] >= self.touch_interval:
+                self._conn.execute("UPDATE analysis_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            self.hits += 1
+        raw, parsed_text, _, _ = row
+        return raw, (json.loads(parsed_text) if parsed_text else None)
+
+    def set(self, key: str, raw: str, parsed: Optional[Dict[str, Any]]) -> None:
+        now = time.time()
+        parsed_text = json.dumps(parsed) if parsed is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, raw, parsed, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, raw, parsed_text, now, now),
+            )
+            self._count += 1  # over-counts replaced keys until the next eviction pass recounts
+            self._writes += 1
+            if (self.max_entries and self._count > self.max_entries) or self._writes >= self.evict_every:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        # Caller holds the lock and commits
+        removed = 0
+        if self.max_age:
+            removed += self._conn.execute(
+                "DELETE FROM analysis_cache WHERE created_at < ?", (now - self.max_age,)
+            ).rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        if self.max_entries and count > self.max_entries:
+            keep = int(self.max_entries * 0.9)
+            trimmed = self._conn.execute(
+                "DELETE FROM analysis_cache WHERE key IN ("
+                " SELECT key FROM analysis_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (count - keep,),
+            ).rowcount
+            removed += trimmed
+            count -= trimmed
+        self._count = count
+        self._writes = 0
+        if removed:
+            self.evictions += removed
+            logger.debug(f"Evicted {removed} analysis cache entries")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_cache")
+            self._conn.commit()
+            self._count = 0
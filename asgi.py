@@ -0,0 +1,5 @@
+from API import create_app
+from async_api import AsyncApp
+
+# ASGI entry point (POST /wardrobe and /outfit served as coroutines), e.g. `uvicorn asgi:app`
+app = AsyncApp(create_app())
@@ -0,0 +1,428 @@
+# async_api.py
+import io
+import os
+import json
+import sys
+import time
+import asyncio
+import logging
+from functools import wraps
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import flask
+from flask import Flask, jsonify
+from werkzeug.exceptions import HTTPException
+
+from API import (
+    OutfitRequest, SuggestionEvents, ANALYSIS_MAX_CONCURRENCY, MAX_REQUEST_BYTES, OUTFIT_ANALYZE_TIMEOUT, OUTFIT_WARDROBE_TIMEOUT,
+    OUTFIT_WEATHER_TIMEOUT, STYLIST_INSTRUCTIONS, analysis_batches, degrade_stage, load_wardrobe_candidates,
+    WARDROBE_FOLDER, authenticate_request,
+    build_outfit_context, cached_outfit_response, likely_cached_outfit, event_stream_response, get_analyzer, get_weather_client,
+    match_wardrobe_uploads, merge_upload_analyses, read_outfit_request, save_wardrobe_uploads, sse_event, store_wardrobe_uploads,
+    suggestion_response, summarize_weather, wants_async_ingest, wardrobe_upload_files, enqueue_wardrobe_uploads,
+)
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Same per-process cap on in-flight analyze calls as the threaded path (API.analysis_slots)
+analysis_slots = asyncio.Semaphore(ANALYSIS_MAX_CONCURRENCY)
+
+
+async def in_thread(fn: Callable, *args, **kwargs):
+    """
+    Run blocking work (SQLite, file writes, PIL) on a worker thread. asyncio.to_thread copies the
+    request's context, so flask.request works as usual; like API.submit_stage, each call also gets its
+    own app context, and so its own db.session, since stages of one request run on several threads at
+    once and a Session is not thread-safe. flask.g is shared with the request. The session is removed
+    when the context pops: holding a pooled connection across an awaited model call would cap the
+    number of in-flight requests at the pool size.
+    """
+    app = flask.current_app._get_current_object()
+    g = flask.g._get_current_object()
+
+    def run():
+        ctx = app.app_context()
+        ctx.g = g
+        with ctx:
+            return fn(*args, **kwargs)
+    return await asyncio.to_thread(run)
+
+
+async def analyze_images_async(images: list) -> list:
+    async with analysis_slots:
+        return await get_analyzer().analyze_batch_async(images)
+
+
+async def resolve_weather_async(city, lat, lon, units: str, user_id=None):
+    """
+    Async variant of API.resolve_weather.
+    """
+    weather_json = None
+    if city:
+        weather_json = await get_weather_client().current_by_city_async(city=city, units=units)
+    elif lat and lon:
+        try:
+            weather_json = await get_weather_client().current_by_coords_async(lat=float(lat), lon=float(lon), units=units)
+        except Exception as e:
+            logger.error(f"Failed to get weather by coordinates: {e}", extra={'user_id': user_id})
+            weather_json = None
+    return weather_json, summarize_weather(weather_json, units)
+
+
+class AsyncOutfitStages:
+    """
+    API.OutfitStages on the event loop: the same stages, timeouts and degradation, as tasks.
+    """
+
+    def __init__(self, outfit: OutfitRequest, analyze: bool = True):
+        started = time.monotonic()
+        self.outfit = outfit
+        self.weather_deadline = started + OUTFIT_WEATHER_TIMEOUT
+        self.analyze_deadline = started + OUTFIT_ANALYZE_TIMEOUT
+        self.wardrobe_deadline = started + OUTFIT_WARDROBE_TIMEOUT
+        self.analyses: List[Optional[tuple]] = [None] * len(outfit.images)
+
+        self._weather = self._start("weather", resolve_weather_async(outfit.city, outfit.lat, outfit.lon,
+                                                                     outfit.units, outfit.user_id))
+        self._wardrobe = self._start("wardrobe_load", in_thread(load_wardrobe_candidates, outfit.user_id))
+        self._batches = analysis_batches(len(outfit.images))
+        self._analyses: List[asyncio.Task] = []
+        if analyze:
+            self.start_analyses()
+
+    def start_analyses(self) -> None:
+        if self._analyses or not self._batches:
+            return
+        self.analyze_deadline = time.monotonic() + OUTFIT_ANALYZE_TIMEOUT
+        self._analyses = [self._start("analyze", analyze_images_async([self.outfit.images[i][2] for i in batch]))
+                          for batch in self._batches]
+
+    @staticmethod
+    def _start(name: str, coro) -> asyncio.Task:
+        async def timed():
+            with span(name):
+                return await coro
+        return asyncio.create_task(timed())
+
+    async def _result(self, task: asyncio.Task, name: str, deadline: float, default):
+        try:
+            return await asyncio.wait_for(task, timeout=max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            degrade_stage(name, "timeout", self.outfit.user_id)
+        except Exception as e:
+            degrade_stage(name, "error", self.outfit.user_id, e)
+        return default
+
+    async def weather(self):
+        return await self._result(self._weather, "weather", self.weather_deadline, (None, "unknown"))
+
+    async def wardrobe(self):
+        return await self._result(self._wardrobe, "wardrobe_load", self.wardrobe_deadline, ([], []))
+
+    async def analyzed(self) -> AsyncIterator[int]:
+        self.start_analyses()
+        batches = dict(zip(self._analyses, self._batches))
+        pending = set(self._analyses)
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0.0, self.analyze_deadline - time.monotonic()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                for task in sorted(pending, key=lambda t: batches[t].start):
+                    task.cancel()
+                    for position in batches[task]:
+                        degrade_stage("analyze", "timeout", self.outfit.user_id)
+                        yield position
+                return
+            for task in sorted(done, key=lambda t: batches[t].start):
+                results = await self._result(task, "analyze", self.analyze_deadline, None)
+                for position, result in zip(batches[task], results or [None] * len(batches[task])):
+                    if isinstance(result, BaseException):
+                        degrade_stage("analyze", "error", self.outfit.user_id, result)
+                        result = None
+                    self.analyses[position] = result
+                    yield position
+
+    def cancel(self) -> None:
+        for task in [self._weather, self._wardrobe, *self._analyses]:
+            task.cancel()
+
+
+def token_required_async(f):
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        user, error = await in_thread(authenticate_request)
+        if error is not None:
+            return error
+        return await f(user, *args, **kwargs)
+    return decorated
+
+
+# --- Views
+
+@token_required_async
+async def upload_wardrobe(current_user):
+    files = wardrobe_upload_files()
+    if not files:
+        return jsonify({"error": "No files uploaded"}), 400
+
+    if wants_async_ingest():
+        return await in_thread(enqueue_wardrobe_uploads, current_user, files)
+
+    with span("save_files"):
+        pending, failed = await in_thread(save_wardrobe_uploads, files)
+
+    paths = [os.path.join(WARDROBE_FOLDER, stored_name) for _, _, stored_name in pending]
+    with span("dedupe"):
+        matches = await in_thread(match_wardrobe_uploads, current_user.id, paths)
+    todo = [position for position, match in enumerate(matches) if match.needs_analysis]
+
+    batches = analysis_batches(len(todo))
+    with span("analyze"):
+        outcomes = await asyncio.gather(*(analyze_images_async([paths[todo[i]] for i in batch]) for batch in batches),
+                                        return_exceptions=True)
+    analyzed = []
+    for batch, outcome in zip(batches, outcomes):
+        analyzed.extend([outcome] * len(batch) if isinstance(outcome, BaseException) else outcome)
+    results = merge_upload_analyses(matches, dict(zip(todo, analyzed)))
+
+    return await in_thread(store_wardrobe_uploads, current_user, pending, results, failed, matches)
+
+
+@token_required_async
+async def upload_outfit_and_suggest(current_user):
+    outfit, error = await in_thread(read_outfit_request, current_user)
+    if error is not None:
+        return error
+    user_id = outfit.user_id
+
+    # Weather, the image analyses and the wardrobe load run concurrently, each with its own timeout;
+    # as in API.upload_outfit_and_suggest, a likely cache hit starts its analyses only after a miss
+    stages = AsyncOutfitStages(outfit, analyze=not await in_thread(likely_cached_outfit, outfit))
+    weather_json, weather_summary = await stages.weather()
+
+    cached = await in_thread(cached_outfit_response, outfit, weather_json)
+    if cached is not None:
+        stages.cancel()
+        return cached
+    stages.start_analyses()
+
+    async def prepare():
+        """
+        Async counterpart of prepare() in API.upload_outfit_and_suggest.
+        """
+        yield "weather", {"season": outfit.season, "summary": weather_summary, "weather": weather_json}
+
+        analyzed = 0
+        async for position in stages.analyzed():
+            analyzed += 1
+            yield "image_analyzed", {"image_index": outfit.images[position][0] + 1, "analyzed": analyzed,
+                                     "total": len(outfit.images), "failed": stages.analyses[position] is None}
+
+        candidates = await stages.wardrobe()
+        prompt, outfit_descriptions, wardrobe_count = await in_thread(
+            build_outfit_context, outfit, weather_json, weather_summary, stages.analyses, candidates)
+        yield "wardrobe_selected", {"items": wardrobe_count}
+        yield "prompt", (prompt, outfit_descriptions)
+
+    if outfit.stream:
+        async def generate():
+            started = time.perf_counter()
+            try:
+                async for name, payload in prepare():
+                    if name == "prompt":
+                        prompt, outfit_descriptions = payload
+                    else:
+                        yield sse_event(name, payload)
+
+                events = SuggestionEvents(outfit, weather_json, outfit_descriptions, started)
+                with span("suggest"):
+                    async for chunk in get_analyzer().suggest_stream_async(prompt, STYLIST_INSTRUCTIONS):
+                        for message in await in_thread(events.feed, chunk):
+                            yield message
+                for message in await in_thread(events.finish):
+                    yield message
+            except Exception as e:
+                logger.error(f"Streaming outfit suggestion failed: {e}", extra={'user_id': user_id})
+                yield sse_event("error", {"error": "Suggestion failed", "message": str(e)})
+
+        return event_stream_response(generate(), outfit.cache_status)
+
+    async for name, payload in prepare():
+        if name == "prompt":
+            prompt, outfit_descriptions = payload
+
+    with span("suggest"):
+        suggestion_text = await get_analyzer().suggest_async(prompt, STYLIST_INSTRUCTIONS)
+    return await in_thread(suggestion_response, outfit, weather_json, outfit_descriptions, suggestion_text)
+
+
+# Flask endpoint -> async view served natively; every other endpoint goes to the WSGI app
+ASYNC_VIEWS: Dict[str, Callable[..., Awaitable[Any]]] = {
+    "api.upload_wardrobe": upload_wardrobe,
+    "api.upload_outfit_and_suggest": upload_outfit_and_suggest,
+}
+
+
+# --- ASGI adapter
+
+TOO_LARGE = object()  # _read_body result for a body over the limit
+
+def wsgi_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """
+    WSGI environ for an ASGI HTTP scope whose body has already been read.
+    """
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_LENGTH":
+            continue
+        key = name if name == "CONTENT_TYPE" else f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsyncApp:
+    """
+    ASGI application for the I/O-bound endpoints. POST /wardrobe and POST /outfit run as coroutines
+    on the event loop: while Gemini or OpenWeather is working they hold no thread, so a single
+    process can keep hundreds of them in flight. Every other request is handed to the unchanged
+    Flask app through asgiref's WSGI adapter.
+
+        uvicorn asgi:app --workers 2
+    """
+
+    def __init__(self, app: Flask, views: Optional[Dict[str, Callable[..., Awaitable[Any]]]] = None):
+        self.app = app
+        self.views = ASYNC_VIEWS if views is None else views
+        self._url_adapter = app.url_map.bind("localhost")
+        self._wsgi = None
+
+    @property
+    def wsgi(self):
+        if self._wsgi is None:
+            # asgiref is only needed once a request falls through to the WSGI app
+            from asgiref.wsgi import WsgiToAsgi
+            self._wsgi = WsgiToAsgi(self.app)
+        return self._wsgi
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        view = self._match(scope) if scope["type"] == "http" else None
+        if view is None:
+            return await self.wsgi(scope, receive, send)
+        await self._handle(view, scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _match(self, scope):
+        try:
+            endpoint, _ = self._url_adapter.match(scope["path"], method=scope["method"])
+        except HTTPException:
+            return None
+        return self.views.get(endpoint)
+
+    @property
+    def body_limit(self) -> int:
+        # The whole body is buffered before the view runs, so there is always a cap
+        return self.app.config.get("MAX_CONTENT_LENGTH") or MAX_REQUEST_BYTES
+
+    async def _read_body(self, scope, receive):
+        """
+        The request body; TOO_LARGE once it exceeds body_limit (by Content-Length, or while reading
+        a chunked body), or None if the client disconnected first.
+        """
+        limit = self.body_limit
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                return TOO_LARGE
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limit:
+                return TOO_LARGE
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def _handle(self, view, scope, receive, send):
+        body = await self._read_body(scope, receive)
+        if body is None:
+            return
+        if body is TOO_LARGE:
+            payload = json.dumps({"error": "Upload too large", "max_bytes": self.body_limit})
+            await self._send(send, self.app.response_class(payload, status=413, mimetype="application/json"))
+            return
+
+        ctx = self.app.request_context(wsgi_environ(scope, body))
+        ctx.push()
+        try:
+            # Mirrors Flask.full_dispatch_request / wsgi_app: before/after_request hooks and error handlers apply
+            try:
+                try:
+                    rv = self.app.preprocess_request()
+                    if rv is None:
+                        rule = flask.request.url_rule
+                        if flask.request.method == "OPTIONS" and getattr(rule, "provide_automatic_options", False):
+                            # CORS preflight: answered like Flask.dispatch_request does, without auth
+                            rv = self.app.make_default_options_response()
+                        else:
+                            rv = await view()
+                except Exception as e:
+                    rv = self.app.handle_user_exception(e)
+                response = self.app.finalize_request(rv)
+            except Exception as e:
+                response = self.app.handle_exception(e)
+            await self._send(send, response)
+        finally:
+            ctx.pop()
+
+    async def _send(self, send, response: flask.Response):
+        headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.items()]
+        await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+        body = response.response
+        if hasattr(body, "__aiter__"):
+            # Streamed (SSE) body produced on the event loop
+            try:
+                async for chunk in body:
+                    await send({"type": "http.response.body", "more_body": True,
+                                "body": chunk.encode("utf-8") if isinstance(chunk, str) else chunk})
+            finally:
+                await body.aclose()
+        else:
+            for chunk in response.iter_encoded():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            response.close()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,180 @@
+"""
+Concurrency benchmark: threaded Flask workers vs the ASGI app (async_api.AsyncApp) for POST /outfit.
+
+Both modes run in-process against a throwaway SQLite database, with Gemini and OpenWeather replaced
+by the latency-injected fakes in benchmarks/fakes.py. The threaded mode serves the burst with a fixed
+pool of --workers request threads (like a sync server's worker count); the async mode starts every
+request at once on one event loop. Reports wall time, throughput, p50/p95 latency and the peak
+number of threads.
+
+    python benchmarks/async_outfit.py --requests 200 --workers 8 --llm-latency fixed:1.0
+"""
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+PHOTOS: list = []  # generated in main(), outside the timed requests
+
+
+def _form(seed: int) -> dict:
+    return {"city": "london", "file": (io.BytesIO(PHOTOS[seed % len(PHOTOS)]), f"outfit{seed}.jpg")}
+
+
+class ThreadPeak:
+    """
+    Samples threading.active_count() in the background and keeps the maximum.
+    """
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+async def asgi_post(app, path: str, headers: dict, data: dict) -> int:
+    """
+    Minimal in-process ASGI client: one POST with a multipart body, returns the status code.
+    """
+    from werkzeug.test import EnvironBuilder
+
+    environ = EnvironBuilder(path=path, method="POST", data=data).get_environ()
+    body = environ["wsgi.input"].read()
+    raw_headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+    raw_headers.append((b"content-type", environ["CONTENT_TYPE"].encode("latin-1")))
+    scope = {"type": "http", "method": "POST", "path": path, "query_string": b"", "headers": raw_headers,
+             "http_version": "1.1", "scheme": "http", "server": ("localhost", 80)}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = {}
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()  # never disconnects
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app(scope, receive, send)
+    return status["code"]
+
+
+def summarize(mode: str, latencies_ms, errors: int, wall_s: float, peak_threads: int) -> dict:
+    latencies_ms = sorted(latencies_ms)
+    pick = lambda q: round(latencies_ms[min(len(latencies_ms) - 1, int(q * len(latencies_ms)))], 1) if latencies_ms else 0.0
+    return {
+        "mode": mode,
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "wall_s": round(wall_s, 2),
+        "throughput_rps": round(len(latencies_ms) / wall_s, 1) if wall_s else 0.0,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "peak_threads": peak_threads,
+    }
+
+
+def run_threaded(app, headers: dict, requests: int, workers: int) -> dict:
+    def one(seed: int):
+        started = time.perf_counter()
+        status = app.test_client().post("/outfit", headers=headers, data=_form(seed),
+                                        content_type="multipart/form-data").status_code
+        return (time.perf_counter() - started) * 1000, status
+
+    with ThreadPeak() as peak:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(one, range(requests)))
+        wall = time.perf_counter() - started
+    return summarize(f"threaded ({workers} workers)", [ms for ms, _ in results],
+                     sum(1 for _, status in results if status != 200), wall, peak.peak)
+
+
+def run_async(app, headers: dict, requests: int) -> dict:
+    from async_api import AsyncApp
+
+    asgi_app = AsyncApp(app)
+
+    async def one(seed: int):
+        started = time.perf_counter()
+        status = await asgi_post(asgi_app, "/outfit", headers, _form(seed))
+        return (time.perf_counter() - started) * 1000, status
+
+    async def burst():
+        return await asyncio.gather(*(one(seed) for seed in range(requests)))
+
+    with ThreadPeak() as peak:
+        started = time.perf_counter()
+        results = asyncio.run(burst())
+        wall = time.perf_counter() - started
+    return summarize("asgi", [ms for ms, _ in results], sum(1 for _, status in results if status != 200),
+                     wall, peak.peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8, help="request threads in the threaded mode")
+    parser.add_argument("--llm-latency", default="fixed:1.0", help="fake Gemini latency (see fakes.Latency)")
+    parser.add_argument("--weather-latency", default="fixed:0.1")
+    parser.add_argument("--modes", default="threaded,async")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="async-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["ANALYSIS_CACHE_ENABLED"] = "0"
+    os.environ["SUGGESTION_CACHE_ENABLED"] = "0"
+    os.environ.setdefault("ANALYSIS_MAX_CONCURRENCY", str(args.requests))  # measure serving, not the quota cap
+    os.chdir(workdir)  # uploads/ is relative to the working directory
+
+    import logging
+    from benchmarks.fakes import FakeFashionAnalyzer, FakeWeatherClient, Latency, install, photo
+    import API
+
+    app = API.create_app({"INGEST_RESUME": False})
+    PHOTOS.extend(photo(seed, 256) for seed in range(args.requests))
+    logging.getLogger().setLevel(logging.WARNING)
+    # Weather is looked up once per city; disable its cache so every request pays the latency
+    install(API, FakeFashionAnalyzer(latency=Latency.parse(args.llm_latency)),
+            FakeWeatherClient(latency=Latency.parse(args.weather_latency), cache_ttl=0))
+
+    client = app.test_client()
+    client.post("/auth/register", json={"email": "bench@example.com", "password": "benchmark-pw", "name": "Bench",
+                                        "gender": "female", "skin_tone": "medium"})
+    token = client.post("/auth/login", json={"email": "bench@example.com", "password": "benchmark-pw"}).json["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    report = []
+    if "threaded" in modes:
+        report.append(run_threaded(app, headers, args.requests, args.workers))
+    if "async" in modes:
+        report.append(run_async(app, headers, args.requests))
+    print(json.dumps({"llm_latency": args.llm_latency, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Microbenchmark for the token_required auth path.
+
+Measures, per authenticated request, the time spent verifying the JWT and loading the user row,
+with the verified-token / user-row caches disabled and enabled, plus the end-to-end latency of
+GET /auth/profile. Runs against a throwaway SQLite database; no external services are called.
+
+    python benchmarks/auth_overhead.py [--requests 5000]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="auth-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+os.environ["ANALYSIS_CACHE_ENABLED"] = "0"
+
+import logging  # noqa: E402
+import API  # noqa: E402
+
+logging.getLogger("API").setLevel(logging.WARNING)
+app = API.create_app()
+
+
+def _time_auth(token: str, n: int) -> list:
+    samples = []
+    with app.app_context():
+        for _ in range(n):
+            started = time.perf_counter()
+            payload = API.verify_token(token)
+            API.load_request_user(payload["user_id"])
+            samples.append((time.perf_counter() - started) * 1e6)
+            API.db.session.remove()
+    return samples
+
+
+def _time_requests(client, headers: dict, n: int) -> list:
+    samples = []
+    for _ in range(n):
+        started = time.perf_counter()
+        client.get("/auth/profile", headers=headers)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+def _summary(samples: list) -> str:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    return f"mean {statistics.mean(samples):8.1f} us   p50 {statistics.median(samples):8.1f} us   p95 {p95:8.1f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    resp = client.post("/auth/register", json={"email": "bench@example.com", "password": "pw", "name": "Bench"})
+    token = resp.get_json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    token_cache, user_cache = API.token_cache, API.user_cache
+    results = {}
+    for label, enabled in (("uncached", False), ("cached", True)):
+        API.token_cache = token_cache if enabled else None
+        API.user_cache = user_cache if enabled else None
+        if enabled:
+            token_cache.clear()
+            user_cache.clear()
+        _time_auth(token, 100)  # warm up
+        results[label] = (_time_auth(token, args.requests), _time_requests(client, headers, args.requests))
+
+    print(f"auth overhead per request ({args.requests} iterations)")
+    for label, (auth, full) in results.items():
+        print(f"  {label:9s} verify+load  {_summary(auth)}")
+        print(f"  {label:9s} GET profile  {_summary(full)}")
+    speedup = statistics.mean(results["uncached"][0]) / statistics.mean(results["cached"][0])
+    print(f"auth path speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
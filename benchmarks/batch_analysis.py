@@ -0,0 +1,57 @@
+"""
+Benchmark for batched image analysis (FashionAnalyzer.analyze_batch) against one analyze() call per image.
+
+For each image count, both modes analyze the same distinct images through FakeFashionAnalyzer (the
+real preprocessing and parsing, with a latency-injected fake Gemini and the analysis cache off).
+The per-image mode fans the calls out over a thread pool, as /outfit and POST /wardrobe did.
+Reports model round trips, prompt text characters sent and wall time.
+
+    python benchmarks/batch_analysis.py --images 2,4,8 --llm-latency fixed:1.0
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeFashionAnalyzer, Latency, photo  # noqa: E402
+
+
+def run(mode: str, images, latency: str) -> dict:
+    analyzer = FakeFashionAnalyzer(latency=Latency.parse(latency), batch_size=len(images))
+    started = time.perf_counter()
+    if mode == "batched":
+        results = analyzer.analyze_batch(images)
+    else:
+        with ThreadPoolExecutor(max_workers=len(images)) as pool:
+            results = list(pool.map(analyzer.analyze, images))
+    wall = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "images": len(images),
+        "model_calls": analyzer.calls,
+        "prompt_chars": analyzer.client.prompt_chars,
+        "parsed": sum(1 for r in results if not isinstance(r, Exception) and r[1] is not None),
+        "wall_s": round(wall, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default="2,4,8", help="comma-separated image counts")
+    parser.add_argument("--llm-latency", default="fixed:1.0", help="fake Gemini latency (see fakes.Latency)")
+    args = parser.parse_args()
+
+    report = []
+    for count in [int(n) for n in args.images.split(",") if n.strip()]:
+        images = [photo(seed) for seed in range(count)]
+        for mode in ("per-image", "batched"):
+            report.append(run(mode, images, args.llm_latency))
+    print(json.dumps({"llm_latency": args.llm_latency, "cache": "off", "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Drop-in fakes for the two external services, for load tests and benchmarks that must not spend
+Gemini or OpenWeather quota.
+
+Only the network edge is replaced: FakeFashionAnalyzer is a real FashionAnalyzer (image
+preprocessing, analysis cache, JSON parsing all run) whose genai module is swapped for a fake
+model, and FakeWeatherClient is a real WeatherClient (cache, single-flight, retries, circuit
+breaker) whose HTTP session is swapped for a fake one. Both take a Latency distribution and a
+failure rate.
+
+    from benchmarks.fakes import FakeFashionAnalyzer, FakeWeatherClient, Latency, install
+    install(API, FakeFashionAnalyzer(latency=Latency.parse("lognormal:1.2:0.4")),
+            FakeWeatherClient(latency=Latency.parse("uniform:0.05:0.3"), failure_rate=0.02))
+"""
+import os
+import re
+import json
+import math
+import asyncio
+import time
+import random
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+
+from fashion_analyzer import FashionAnalyzer  # noqa: E402
+from weather_client import WeatherClient  # noqa: E402
+
+ANALYSIS_RESPONSES = [
+    {"items": [{"type": "denim jacket", "style": "casual", "colors": ["blue"], "patterns": ["solid"],
+                "materials": ["denim"], "details": ["button front"]}],
+     "accessories": [], "overall": {"dominant_colors": ["blue"], "style": "casual",
+                                    "seasons": ["spring", "autumn"], "occasions": ["casual"]},
+     "description": "A mid-wash blue denim jacket with a button front."},
+    {"items": [{"type": "white cotton shirt", "style": "formal", "colors": ["white"], "patterns": ["solid"],
+                "materials": ["cotton"], "details": ["collar"]}],
+     "accessories": [], "overall": {"dominant_colors": ["white"], "style": "formal",
+                                    "seasons": ["all seasons"], "occasions": ["work", "formal"]},
+     "description": "A crisp white cotton shirt with a classic collar."},
+    {"items": [{"type": "black chino pants", "style": "smart casual", "colors": ["black"], "patterns": ["solid"],
+                "materials": ["cotton"], "details": ["slim fit"]}],
+     "accessories": [], "overall": {"dominant_colors": ["black"], "style": "smart casual",
+                                    "seasons": ["all seasons"], "occasions": ["work", "casual"]},
+     "description": "Slim black chinos."},
+    {"items": [{"type": "leather ankle boot", "style": "casual", "colors": ["brown"], "patterns": ["solid"],
+                "materials": ["leather"], "details": ["chelsea"]}],
+     "accessories": [], "overall": {"dominant_colors": ["brown"], "style": "casual",
+                                    "seasons": ["autumn", "winter"], "occasions": ["casual"]},
+     "description": "Brown leather chelsea ankle boots."},
+]
+
+CONDITIONS = [("Clear", "clear sky"), ("Clouds", "broken clouds"), ("Rain", "light rain"), ("Snow", "light snow")]
+
+
+def photo(seed: int, size: int = 512) -> bytes:
+    """
+    Synthetic garment photo as JPEG bytes: a textured background, a patterned garment-shaped block in
+    its own colour and some sensor noise. Every seed gives a different image, so uploads exercise the
+    near-duplicate hash (flat images have no gradients to hash) and get distinct colour features.
+    """
+    import io
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size] / size
+    background = rng.integers(120, 256, 3) + 25 * np.sin(x[..., None] * rng.uniform(5, 20) + y[..., None] * 3)
+    garment = rng.integers(0, 256, 3) + 35 * np.sign(np.sin((x + y)[..., None] * rng.uniform(20, 60)))
+    left, top = rng.uniform(0.1, 0.3, 2)
+    right, bottom = rng.uniform(0.7, 0.9, 2)
+    inside = ((x > left) & (x < right) & (y > top) & (y < bottom))[..., None]
+    pixels = np.where(inside, garment, background) + rng.normal(0, 6, (size, size, 3))
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+class InjectedFailure(RuntimeError):
+    pass
+
+
+class Latency:
+    """
+    Latency distribution in seconds:
+      fixed:MEAN, uniform:LOW:HIGH, lognormal:MEDIAN:SIGMA (heavy right tail, like LLM calls).
+    """
+
+    def __init__(self, kind: str = "fixed", a: float = 0.0, b: float = 0.0, seed: Optional[int] = None):
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind, self.a, self.b = kind, a, b
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> "Latency":
+        parts = spec.split(":")
+        kind = parts[0].lower()
+        values = [float(p) for p in parts[1:]] + [0.0, 0.0]
+        return cls(kind, values[0], values[1], seed=seed)
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "uniform":
+                return self._rng.uniform(self.a, self.b)
+            if self.kind == "lognormal":
+                return self._rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+            return self.a
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{self.a:g}" + (f":{self.b:g}" if self.kind != "fixed" else "")
+
+
+def _maybe_fail(rng: random.Random, failure_rate: float, what: str) -> None:
+    if failure_rate and rng.random() < failure_rate:
+        raise InjectedFailure(f"Injected {what} failure")
+
+
+# --- Gemini
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    def __init__(self, backend: "FakeGenAI", model_name: str, **kwargs):
+        self.backend = backend
+        self.model_name = model_name
+        self.kwargs = kwargs
+
+    def _reply(self, contents):
+        parts = contents if isinstance(contents, list) else [contents]
+        prompt = " ".join(p for p in parts if isinstance(p, str))
+        prompt += " " + str(self.kwargs.get("system_instruction") or "")
+        self.backend.calls += 1
+        self.backend.prompt_chars += sum(len(p) for p in parts if isinstance(p, str)) + len(
+            str(self.kwargs.get("system_instruction") or ""))
+        delay = self.backend.latency.sample()
+        images = sum(1 for p in parts if isinstance(p, dict))
+        if "stylist" in prompt:
+            text = self.backend.stylist_reply(prompt)
+        elif images > 1:
+            text = json.dumps({"images": [dict(self.backend.rng.choice(ANALYSIS_RESPONSES), image=n)
+                                          for n in range(1, images + 1)]})
+        else:
+            text = json.dumps(self.backend.rng.choice(ANALYSIS_RESPONSES))
+        return text, delay
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        text, delay = self._reply(contents)
+        if stream:
+            return self._stream(text, delay)
+        time.sleep(delay)
+        _maybe_fail(self.backend.rng, self.backend.failure_rate, "Gemini")
+        return _Response(text)
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        text, delay = self._reply(contents)
+        if stream:
+            return self._stream_async(text, delay)
+        await asyncio.sleep(delay)
+        _maybe_fail(self.backend.rng, self.backend.failure_rate, "Gemini")
+        return _Response(text)
+
+    @staticmethod
+    def _chunks(text: str) -> List[str]:
+        return [text[i:i + 40] for i in range(0, len(text), 40)] or [""]
+
+    def _stream(self, text: str, delay: float) -> Iterator[_Response]:
+        # Time to first token is a fraction of the total; the rest is spread over the chunks
+        chunks = self._chunks(text)
+        time.sleep(delay * 0.2)
+        _maybe_fail(self.backend.rng, self.backend.failure_rate, "Gemini")
+        for chunk in chunks:
+            time.sleep(delay * 0.8 / len(chunks))
+            yield _Response(chunk)
+
+    async def _stream_async(self, text: str, delay: float) -> AsyncIterator[_Response]:
+        chunks = self._chunks(text)
+        await asyncio.sleep(delay * 0.2)
+        _maybe_fail(self.backend.rng, self.backend.failure_rate, "Gemini")
+        for chunk in chunks:
+            await asyncio.sleep(delay * 0.8 / len(chunks))
+            yield _Response(chunk)
+
+
+class FakeGenAI:
+    """
+    Stand-in for the google.generativeai module as used by FashionAnalyzer.
+    """
+
+    def __init__(self, latency: Latency, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.prompt_chars = 0  # text sent, including any system instruction
+
+    def configure(self, **kwargs) -> None:
+        pass
+
+    def GenerativeModel(self, model_name: str, **kwargs) -> FakeGenerativeModel:  # noqa: N802 (mirrors genai)
+        return FakeGenerativeModel(self, model_name, **kwargs)
+
+    def stylist_reply(self, prompt: str) -> str:
+        ids = [int(i) for i in re.findall(r"^\[(\d+)\]", prompt, flags=re.MULTILINE)]
+        recs: List[Dict[str, Any]] = [
+            {"wardrobe_id": wid, "reason": "Pairs well with the outfit.", "fallback_text": None}
+            for wid in ids[:4]
+        ]
+        recs.append({"wardrobe_id": None, "reason": "Completes the look.", "fallback_text": "Tan leather belt"})
+        return "```json\n" + json.dumps({
+            "recommendations": recs,
+            "notes": "Keep the palette neutral.",
+            "weather_considerations": "Layer up if it gets colder.",
+        }) + "\n```"
+
+
+class FakeFashionAnalyzer(FashionAnalyzer):
+    def __init__(self, latency: Optional[Latency] = None, failure_rate: float = 0.0, seed: Optional[int] = None,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.client = FakeGenAI(latency or Latency("fixed", 0.0), failure_rate, seed)
+
+    @property
+    def calls(self) -> int:
+        return self.client.calls
+
+
+# --- OpenWeather
+
+class _HTTPResponse:
+    def __init__(self, status_code: int, payload: Optional[Dict[str, Any]] = None):
+        self.status_code = status_code
+        self.ok = 200 <= status_code < 300
+        self._payload = payload
+
+    def json(self) -> Dict[str, Any]:
+        return self._payload
+
+
+class FakeWeatherSession:
+    """
+    Answers WeatherClient's session.get() with synthetic current-weather payloads; injected
+    failures come back as HTTP 503 so the client's retry and breaker paths are exercised.
+    """
+
+    def __init__(self, latency: Latency, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout=None) -> _HTTPResponse:
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            return _HTTPResponse(503)
+        params = params or {}
+        key = str(params.get("q") or (params.get("lat"), params.get("lon")))
+        local = random.Random(key)  # stable weather per location
+        main, description = local.choice(CONDITIONS)
+        temp_c = local.uniform(-5, 35)
+        temp = {"imperial": temp_c * 9 / 5 + 32, "standard": temp_c + 273.15}.get(params.get("units"), temp_c)
+        return _HTTPResponse(200, {
+            "weather": [{"main": main, "description": description}],
+            "main": {"temp": round(temp, 1), "humidity": local.randint(20, 95)},
+            "name": params.get("q") or "",
+        })
+
+
+class FakeWeatherClient(WeatherClient):
+    def __init__(self, latency: Optional[Latency] = None, failure_rate: float = 0.0, seed: Optional[int] = None,
+                 **kwargs):
+        kwargs.setdefault("session", FakeWeatherSession(latency or Latency("fixed", 0.0), failure_rate, seed))
+        super().__init__(**kwargs)
+
+    @property
+    def calls(self) -> int:
+        return self.session.calls
+
+
+def install(api_module, analyzer: Optional[FashionAnalyzer] = None, weather: Optional[WeatherClient] = None) -> None:
+    """
+    Point an imported API module at the fakes.
+    """
+    if analyzer is not None:
+        api_module.analyzer = analyzer
+    if weather is not None:
+        api_module.weather_client = weather
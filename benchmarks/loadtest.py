@@ -0,0 +1,289 @@
+"""
+Offline load test for the main API endpoints.
+
+Starts the API on a local threaded server backed by a throwaway SQLite database, swaps Gemini and
+OpenWeather for the latency-injected fakes in benchmarks/fakes.py, seeds a few users with wardrobe
+items and then drives each scenario at every requested concurrency level. Reports throughput,
+p50/p95/p99 latency and error counts, writes them as JSON, and can compare against a previous run.
+
+    python benchmarks/loadtest.py --concurrency 1,8,32 --requests 200
+    python benchmarks/loadtest.py --scenarios outfit --llm-latency lognormal:1.5:0.5 --llm-failure-rate 0.02
+    python benchmarks/loadtest.py --baseline benchmarks/results/main.json   # exit 1 on regressions
+
+Scenarios: login, wardrobe_upload, wardrobe_list, wardrobe_file, outfit.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = ("login", "wardrobe_upload", "wardrobe_list", "wardrobe_file", "outfit")
+CITIES = ["london", "paris", "mumbai", "delhi", "new york", "tokyo", "sydney", "toronto", "berlin", "madrid",
+          "chennai", "bangalore", "singapore", "dubai", "cairo", "lagos", "lima", "oslo", "seoul", "rome"]
+PASSWORD = "benchmark-pw"
+
+
+def _prepare_env(args) -> str:
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["ANALYSIS_CACHE_ENABLED"] = "1" if args.analysis_cache else "0"
+    os.environ["SUGGESTION_CACHE_ENABLED"] = "1" if args.suggestion_cache else "0"
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+    os.chdir(workdir)  # uploads/ is relative to the working directory
+    return workdir
+
+
+def percentile(sorted_values, q: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), int(round(q / 100 * len(sorted_values) + 0.5))))
+    return sorted_values[rank - 1]
+
+
+def summarize(scenario: str, concurrency: int, latencies_ms, errors: int, wall_s: float) -> dict:
+    latencies_ms = sorted(latencies_ms)
+    n = len(latencies_ms)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": n,
+        "errors": errors,
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round((n - errors) / wall_s, 2) if wall_s else 0.0,
+        "mean_ms": round(sum(latencies_ms) / n, 1) if n else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 1),
+        "p95_ms": round(percentile(latencies_ms, 95), 1),
+        "p99_ms": round(percentile(latencies_ms, 99), 1),
+        "max_ms": round(latencies_ms[-1], 1) if n else 0.0,
+    }
+
+
+class Harness:
+    def __init__(self, base: str, users, item_ids, images):
+        self.base = base
+        self.users = users          # [(email, token)]
+        self.item_ids = item_ids    # {token: [wardrobe item ids]}
+        self.images = images
+
+    def request(self, scenario: str, session, i: int):
+        email, token = self.users[i % len(self.users)]
+        auth = {"Authorization": f"Bearer {token}"}
+        image = self.images[i % len(self.images)]
+        if scenario == "login":
+            r = session.post(f"{self.base}/auth/login", json={"email": email, "password": PASSWORD})
+            return r, 200
+        if scenario == "wardrobe_upload":
+            r = session.post(f"{self.base}/wardrobe", headers=auth, files=[("files", (f"{i}.jpg", image, "image/jpeg"))])
+            return r, 201
+        if scenario == "wardrobe_list":
+            r = session.get(f"{self.base}/wardrobe", headers=auth, params={"limit": 50})
+            return r, 200
+        if scenario == "wardrobe_file":
+            item_id = self.item_ids[token][i % len(self.item_ids[token])]
+            r = session.get(f"{self.base}/wardrobe/{item_id}/file", headers=auth, params={"size": "md"})
+            return r, 200
+        if scenario == "outfit":
+            r = session.post(f"{self.base}/outfit", headers=auth,
+                             data={"city": CITIES[i % len(CITIES)]},
+                             files=[("files", ("outfit.jpg", image, "image/jpeg"))])
+            return r, 200
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+    def run(self, scenario: str, concurrency: int, total: int) -> dict:
+        import requests
+
+        counter = iter(range(total))
+        counter_lock = threading.Lock()
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def worker():
+            session = requests.Session()
+            while True:
+                with counter_lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    r, expected = self.request(scenario, session, i)
+                    ok = r.status_code == expected
+                except requests.RequestException:
+                    ok = False
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    if not ok:
+                        errors.append(i)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return summarize(scenario, concurrency, latencies, len(errors), time.perf_counter() - started)
+
+
+def setup(args):
+    import logging
+    import requests
+    from werkzeug.serving import make_server
+    import API
+    from benchmarks.fakes import FakeFashionAnalyzer, FakeWeatherClient, Latency, install, photo
+
+    logging.getLogger().setLevel(logging.WARNING)  # request/preprocess INFO logs would dominate the run
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    server = make_server("127.0.0.1", 0, API.create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    # Seed quickly, then switch to the configured latencies for the measured runs
+    install(API, FakeFashionAnalyzer(cache=API.get_analysis_cache(), seed=args.seed),
+            FakeWeatherClient(seed=args.seed))
+    # Distinct textured photos: seeding gives each user different items, and the measured uploads and
+    # outfits run the dHash/BK-tree check and colour-feature extraction on realistic input
+    images = [photo(args.seed * 100_000 + i, args.image_size) for i in range(args.image_variants)]
+    users, item_ids = [], {}
+    session = requests.Session()
+    for u in range(args.users):
+        email = f"loadtest{u}@example.com"
+        r = session.post(f"{base}/auth/register", json={
+            "email": email, "password": PASSWORD, "name": f"Load Test {u}", "gender": "female", "skin_tone": "medium"})
+        token = r.json()["token"]
+        users.append((email, token))
+        files = [("files", (f"seed{i}.jpg", images[(u * args.seed_items + i) % len(images)], "image/jpeg"))
+                 for i in range(args.seed_items)]
+        r = session.post(f"{base}/wardrobe", headers={"Authorization": f"Bearer {token}"}, files=files)
+        item_ids[token] = [item["id"] for item in r.json()["uploaded"]]
+
+    analyzer = FakeFashionAnalyzer(cache=API.get_analysis_cache(), latency=Latency.parse(args.llm_latency, args.seed),
+                                   failure_rate=args.llm_failure_rate, seed=args.seed)
+    weather = FakeWeatherClient(latency=Latency.parse(args.weather_latency, args.seed),
+                                failure_rate=args.weather_failure_rate, seed=args.seed,
+                                cache_ttl=args.weather_cache_ttl)
+    install(API, analyzer, weather)
+    return server, Harness(base, users, item_ids, images), analyzer, weather
+
+
+def compare(results, baseline, tolerance: float):
+    """
+    Regressions against a previous results file: p95 latency up or throughput down by more than tolerance.
+    """
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        base = previous.get((r["scenario"], r["concurrency"]))
+        if not base:
+            continue
+        if base["p95_ms"] and r["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{r['scenario']}@{r['concurrency']}: p95 {base['p95_ms']} -> {r['p95_ms']} ms")
+        if base["throughput_rps"] and r["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{r['scenario']}@{r['concurrency']}: throughput {base['throughput_rps']} -> {r['throughput_rps']} rps")
+        if r["errors"] > base["errors"] and r["errors"] / max(r["requests"], 1) > tolerance / 10:
+            regressions.append(f"{r['scenario']}@{r['concurrency']}: errors {base['errors']} -> {r['errors']}")
+    return regressions
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--seed-items", type=int, default=20, help="wardrobe items uploaded per user before the run")
+    parser.add_argument("--image-size", type=int, default=512, help="edge of the generated test JPEGs in px")
+    parser.add_argument("--image-variants", type=int, default=64, help="distinct generated photos to upload")
+    parser.add_argument("--llm-latency", default="lognormal:0.8:0.4", help="fixed:S, uniform:LO:HI or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--weather-latency", default="uniform:0.05:0.25")
+    parser.add_argument("--weather-failure-rate", type=float, default=0.0)
+    parser.add_argument("--weather-cache-ttl", type=float, default=600)
+    parser.add_argument("--analysis-cache", action="store_true", help="keep the persistent analysis cache enabled")
+    parser.add_argument("--suggestion-cache", action="store_true", help="keep the /outfit suggestion cache enabled")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/loadtest-<timestamp>.json)")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+    output = os.path.abspath(args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    random.seed(args.seed)
+    _prepare_env(args)
+    server, harness, analyzer, weather = setup(args)
+
+    results = []
+    print(f"{'scenario':<16}{'conc':>5}{'reqs':>6}{'err':>5}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    try:
+        for scenario in scenarios:
+            for level in levels:
+                r = harness.run(scenario, level, args.requests)
+                results.append(r)
+                print(f"{r['scenario']:<16}{r['concurrency']:>5}{r['requests']:>6}{r['errors']:>5}"
+                      f"{r['throughput_rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+    finally:
+        server.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+            "backend_calls": {"llm": analyzer.calls, "weather": weather.calls},
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
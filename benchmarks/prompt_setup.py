@@ -0,0 +1,71 @@
+"""
+Microbenchmark for the per-call setup of the stylist model call.
+
+Compares the old per-call work -- a new GenerativeModel for every call and the full ~3 KB stylist prompt
+concatenated into the contents -- with a reused handle carrying STYLIST_INSTRUCTIONS as its system
+instruction plus only the per-request context. Uses the real google.generativeai package but makes no
+network calls: it times handle creation and reports the prompt text assembled per request.
+
+    python benchmarks/prompt_setup.py [--calls 2000] [--wardrobe-items 40]
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="prompt-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+
+import API  # noqa: E402
+from fashion_analyzer import FashionAnalyzer  # noqa: E402
+
+
+def _per_call_us(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return round((time.perf_counter() - started) / calls * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--wardrobe-items", type=int, default=40)
+    args = parser.parse_args()
+
+    wardrobe = [f"[{i}] shirt [top] casual | blue | solid | cotton | summer | casual" for i in range(args.wardrobe_items)]
+    outfit = [{"image_index": 1, "description": "navy wool jacket, casual, winter"}]
+
+    def context():
+        return API.build_outfit_prompt(datetime(2025, 1, 15), "winter", "Clear, 4°C", "female", "medium",
+                                       wardrobe, outfit)
+
+    analyzer = FashionAnalyzer()
+    genai = analyzer.client
+    analyzer._model(API.STYLIST_INSTRUCTIONS)  # warm the shared handle
+
+    old_model = _per_call_us(lambda: genai.GenerativeModel(analyzer.model), args.calls)
+    old_model_with_instruction = _per_call_us(
+        lambda: genai.GenerativeModel(analyzer.model, system_instruction=API.STYLIST_INSTRUCTIONS), args.calls)
+    reused_model = _per_call_us(lambda: analyzer._model(API.STYLIST_INSTRUCTIONS), args.calls)
+
+    print(json.dumps({
+        "calls": args.calls,
+        "wardrobe_items": args.wardrobe_items,
+        "model_handle_us": {"new_per_call": old_model, "new_per_call_with_system_instruction": old_model_with_instruction,
+                            "reused": reused_model},
+        "chars_assembled_per_request": {"full_prompt": len(API.STYLIST_INSTRUCTIONS) + len(context()),
+                                        "context_only": len(context())},
+        "static_system_instruction_chars": len(API.STYLIST_INSTRUCTIONS),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Microbenchmark for the local visual-feature index behind GET /wardrobe/<id>/similar and the ranker's
+colour signal.
+
+Extracts features from a few generated garment photos (the per-upload cost), then builds a FeatureIndex
+of --items random unit vectors (one user's wardrobe) and times index construction, the nearest-neighbour
+query the endpoint runs, and the full similarity pass select_prompt_wardrobe uses. No database or network.
+
+    python benchmarks/similar_items.py [--items 5000] [--queries 500]
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from visual_features import FEATURE_DIM, FeatureIndex, extract_features  # noqa: E402
+
+
+def _photo(seed: int) -> bytes:
+    from PIL import Image, ImageDraw
+    rng = np.random.default_rng(seed)
+    img = Image.new("RGB", (800, 1000), tuple(int(c) for c in rng.integers(150, 255, 3)))
+    ImageDraw.Draw(img).rectangle((200, 150, 600, 850), fill=tuple(int(c) for c in rng.integers(0, 255, 3)))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _ms(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - started) * 1000 / repeat, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5000, help="wardrobe size")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    photos = [_photo(seed) for seed in range(10)]
+    extract_ms = _ms(lambda: [extract_features(p) for p in photos], 3) / len(photos)
+
+    rng = np.random.default_rng(0)
+    vectors = np.abs(rng.standard_normal((args.items, FEATURE_DIM))).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = list(range(1, args.items + 1))
+    build_ms = _ms(lambda: FeatureIndex(ids, vectors), 5)
+    index = FeatureIndex(ids, vectors)
+
+    queries = [(int(i), index.vector(int(i))) for i in rng.integers(1, args.items + 1, args.queries)]
+    started = time.perf_counter()
+    for item_id, query in queries:
+        index.nearest(query, args.limit, exclude={item_id})
+    nearest_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    similarities_ms = _ms(lambda: index.similarities(queries[0][1]), args.queries)
+
+    print(json.dumps({
+        "items": args.items,
+        "feature_bytes": FEATURE_DIM * 4,
+        "extract_ms_per_image": round(extract_ms, 2),
+        "index_build_ms": build_ms,
+        "nearest_ms": round(nearest_ms, 3),
+        "similarities_ms": similarities_ms,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Cold-start benchmark: how long a fresh worker process takes to become ready.
+
+Each run is a new Python process that times `import API`, `create_app()` (including schema
+creation unless --no-migrate) and the first request, then reports which heavy libraries were
+loaded along the way. Medians over all runs are printed as JSON.
+
+    python benchmarks/startup.py [--runs 10] [--no-migrate]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("google.generativeai", "PIL.Image", "numpy", "requests")
+
+CHILD = r"""
+import os, sys, json, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import API
+imported = time.perf_counter()
+app = API.create_app()
+created = time.perf_counter()
+app.test_client().get("/api/health")
+served = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (served - created) * 1000,
+    "ready_ms": (served - started) * 1000,
+    "loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_once(workdir: str, migrate: bool) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "AUTO_MIGRATE": "1" if migrate else "0",
+        "ANALYSIS_CACHE_PATH": os.path.join(workdir, "analysis_cache.db"),
+    })
+    # No API keys: a worker must be able to boot without them
+    env.pop("GEMINI_API_KEY", None)
+    env.pop("OPENWEATHER_API_KEY", None)
+    out = subprocess.run([sys.executable, "-c", CHILD.format(root=ROOT, heavy=HEAVY_MODULES)],
+                         cwd=workdir, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--no-migrate", action="store_true", help="start with AUTO_MIGRATE=0 (schema already in place)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="startup-bench-")
+    run_once(workdir, migrate=True)  # warm the OS file cache and create the schema once
+    runs = [run_once(workdir, migrate=not args.no_migrate) for _ in range(args.runs)]
+
+    report = {key: round(statistics.median(r[key] for r in runs), 1)
+              for key in ("import_ms", "create_app_ms", "first_request_ms", "ready_ms")}
+    report["runs"] = args.runs
+    report["heavy_modules_loaded"] = sorted({m for r in runs for m in r["loaded"]})
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Concurrency benchmark for POST /wardrobe.
+
+Starts the API on a local threaded server backed by a throwaway SQLite database, replaces the
+model call with a fixed-latency stub, and has several users upload at the same time. Reports
+upload throughput, request latency and errors (e.g. "database is locked").
+
+    python benchmarks/upload_concurrency.py --users 8 --requests 10 --files 3
+    python benchmarks/upload_concurrency.py --journal-mode both   # compare rollback journal vs WAL
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _prepare_env(journal_mode: str) -> str:
+    workdir = tempfile.mkdtemp(prefix="upload-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["SQLITE_JOURNAL_MODE"] = journal_mode
+    os.environ["ANALYSIS_CACHE_ENABLED"] = "0"
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+    return workdir
+
+
+def run(journal_mode: str, users: int, requests_per_user: int, files_per_request: int, latency: float) -> dict:
+    workdir = _prepare_env(journal_mode)
+    os.chdir(workdir)  # uploads/ is relative to the working directory
+
+    import logging
+    import requests
+    from werkzeug.serving import make_server
+    import API
+    from benchmarks.fakes import photo
+
+    logging.getLogger("API").setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    analysis = json.dumps({"items": [{"type": "shirt", "style": "casual", "colors": ["blue"]}],
+                           "overall": {"seasons": ["summer"], "occasions": ["casual"]}})
+
+    def fake_analyze(image_path):
+        time.sleep(latency)
+        return analysis, json.loads(analysis)
+
+    API.get_analyzer().analyze = fake_analyze
+
+    server = make_server("127.0.0.1", 0, API.create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    tokens = []
+    for u in range(users):
+        r = requests.post(f"{base}/auth/register",
+                          json={"email": f"user{u}@example.com", "password": "pw", "name": f"User {u}"})
+        tokens.append(r.json()["token"])
+
+    payloads = [photo(i, 256) for i in range(files_per_request)]
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def user_loop(token):
+        session = requests.Session()
+        session.headers["Authorization"] = f"Bearer {token}"
+        for _ in range(requests_per_user):
+            files = [("files", (f"{i}.jpg", data, "image/jpeg")) for i, data in enumerate(payloads)]
+            started = time.perf_counter()
+            r = session.post(f"{base}/wardrobe", files=files)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed * 1000)
+                if r.status_code != 201:
+                    errors.append(r.status_code)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user_loop, args=(t,)) for t in tokens]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    server.shutdown()
+
+    latencies.sort()
+    uploaded = (len(latencies) - len(errors)) * files_per_request
+    return {
+        "journal_mode": journal_mode,
+        "users": users,
+        "requests": len(latencies),
+        "files_uploaded": uploaded,
+        "errors": len(errors),
+        "wall_s": round(wall, 3),
+        "files_per_s": round(uploaded / wall, 1),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=10, help="uploads per user")
+    parser.add_argument("--files", type=int, default=3, help="files per upload")
+    parser.add_argument("--latency", type=float, default=0.05, help="stubbed analysis latency in seconds")
+    parser.add_argument("--journal-mode", default="WAL", help="SQLite journal mode, or 'both' to compare DELETE and WAL")
+    args = parser.parse_args()
+
+    if args.journal_mode.lower() == "both":
+        # Each mode needs a fresh process: the API module configures its engine at import time
+        for mode in ("DELETE", "WAL"):
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--users", str(args.users),
+                            "--requests", str(args.requests), "--files", str(args.files),
+                            "--latency", str(args.latency), "--journal-mode", mode], check=True)
+        return
+
+    print(json.dumps(run(args.journal_mode.upper(), args.users, args.requests, args.files, args.latency)))
+
+
+if __name__ == "__main__":
+    main()
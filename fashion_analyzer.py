@@ -1,110 +1,421 @@
 import os
 import json
-from typing import Optional, Tuple, Dict, Any
+import asyncio
+import time
+import logging
+import threading
+from typing import Optional, Tuple, Dict, Any, Iterator, AsyncIterator, BinaryIO, Union, List, Sequence
 from dotenv import load_dotenv
-from PIL import Image
-import google.generativeai as genai
+
+from analysis_cache import AnalysisCache, image_fingerprint
+from image_preprocess import prepare_image, IMAGE_MAX_EDGE
+from metrics import span, LLM_CALLS, LLM_SECONDS, ANALYSIS_BATCH_FALLBACKS
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+ImageSource = Union[str, bytes, BinaryIO]
+AnalysisResult = Tuple[str, Optional[Dict[str, Any]]]
+
+ANALYSIS_BATCH_SIZE = int(os.environ.get("ANALYSIS_BATCH_SIZE", "8"))  # images per batched model call; 1 disables batching
+
+# Bump whenever the analysis prompt changes so cached results from the old prompt are not reused
+ANALYSIS_PROMPT_VERSION = "1"
+
+ANALYSIS_SCHEMA = (
+    "{\n"
+    '  "items": [\n'
+    '    {\n'
+    '      "type": "clothing_type",\n'
+    '      "style": "style_category",\n'
+    '      "colors": ["color1", "color2"],\n'
+    '      "patterns": ["pattern1", "pattern2"],\n'
+    '      "materials": ["material1", "material2"],\n'
+    '      "details": ["detail1", "detail2"]\n'
+    '    }\n'
+    '  ],\n'
+    '  "accessories": ["accessory1", "accessory2"],\n'
+    '  "overall": {\n'
+    '    "dominant_colors": ["color1", "color2"],\n'
+    '    "style": "overall_style",\n'
+    '    "seasons": ["season1", "season2"],\n'
+    '    "occasions": ["occasion1", "occasion2"]\n'
+    '  },\n'
+    '  "description": "Brief AI-readable description with keywords"\n'
+    "}\n"
+)
+
+ANALYSIS_INSTRUCTIONS = (
+    "Return ONLY the JSON object. No additional text, explanations, or formatting. Ensure all values are concise and keyword-focused for AI processing."
+)
+
+ANALYSIS_PROMPT = (
+    "You are a fashion AI analyst. Analyze the clothing items in this image and return ONLY a structured JSON response with the following format:\n"
+    + ANALYSIS_SCHEMA + ANALYSIS_INSTRUCTIONS
+)
+
+
+BATCH_ANALYSIS_PROMPT = (
+    'You are a fashion AI analyst. You are given several images, each preceded by its label "Image N:". '
+    "Analyze the clothing items in each image separately and return ONLY a JSON object "
+    '{"images": [...]} with exactly one entry per image, in the order given. '
+    'Each entry has an "image" field with the image number N and otherwise the following format:\n'
+    + ANALYSIS_SCHEMA + ANALYSIS_INSTRUCTIONS
+)
+
+
+def extract_json_block(text: str) -> Optional[str]:
+    """
+    Extract the first valid JSON block by counting braces.
+    Handles nested structures safely.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    depth = 0
+    for i, ch in enumerate(text[start:], start=start):
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def coerce_json(text: str) -> Optional[dict]:
+    """
+    Try to extract a JSON object from the given text.
+    - First, try to parse the entire text as JSON.
+    - If that fails, attempt to extract the first valid JSON block using brace matching.
+    """
+    if not text:
+        return None
+
+    # Try direct parse first
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    # Extract a block and try again
+    block = extract_json_block(text)
+    if block:
+        try:
+            return json.loads(block)
+        except json.JSONDecodeError:
+            return None
+    return None
+
+
+def split_batch_analysis(text: str, count: int) -> List[Optional[dict]]:
+    """
+    Map a batched analysis response back to its images. Entries are placed by their "image" number when
+    every entry has a distinct, valid one, otherwise by position. Images without a usable entry get None.
+    """
+    results: List[Optional[dict]] = [None] * count
+    parsed = coerce_json(text)
+    entries = parsed.get("images") if isinstance(parsed, dict) else parsed
+    if not isinstance(entries, list):
+        return results
+
+    numbers = [entry.get("image") if isinstance(entry, dict) else None for entry in entries]
+    by_number = (all(isinstance(n, int) and 1 <= n <= count for n in numbers)
+                 and len(set(numbers)) == len(numbers))
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not isinstance(entry.get("items"), list):
+            continue
+        target = entry["image"] - 1 if by_number else position
+        if target < count:
+            results[target] = {k: v for k, v in entry.items() if k != "image"}
+    return results
+
+
+def chunk_text(chunk) -> str:
+    try:
+        return chunk.text
+    except ValueError:
+        # Chunks without text parts (e.g. a final safety/usage chunk) raise on .text
+        return ""
+
 
 class FashionAnalyzer:
-    def __init__(self, model: str = "gemini-2.5-flash"):
+    def __init__(self, model: str = "gemini-2.5-flash", cache: Optional[AnalysisCache] = None,
+                 max_edge: int = IMAGE_MAX_EDGE, batch_size: int = ANALYSIS_BATCH_SIZE):
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
+        # Imported here: google.generativeai takes ~0.5 s to import and is only needed once a model is called
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         self.client = genai
         self.model = model
+        self.cache = cache
+        self.max_edge = max_edge
+        self.batch_size = max(1, batch_size)
+        self._models: Dict[Optional[str], Any] = {}
+        self._models_lock = threading.Lock()
 
     def _extract_json_block(self, text: str) -> Optional[str]:
+        return extract_json_block(text)
+
+    def _coerce_json(self, text: str) -> Optional[dict]:
+        return coerce_json(text)
+
+    def _model(self, system_instruction: Optional[str] = None):
         """
-        Extract the first valid JSON block by counting braces.
-        Handles nested structures safely.
+        The GenerativeModel handle for a (static) system instruction, created on first use and then
+        shared by every call, instead of building a model and converting its instruction per call.
         """
-        start = text.find("{")
-        if start == -1:
-            return None
+        model = self._models.get(system_instruction)
+        if model is None:
+            with self._models_lock:
+                model = self._models.get(system_instruction)
+                if model is None:
+                    kwargs = {"system_instruction": system_instruction} if system_instruction else {}
+                    model = self._models[system_instruction] = self.client.GenerativeModel(self.model, **kwargs)
+        return model
 
-        depth = 0
-        for i, ch in enumerate(text[start:], start=start):
-            if ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    return text[start:i + 1]
-        return None
+    def _generate(self, method: str, contents, system_instruction: Optional[str] = None, **kwargs):
+        """
+        model.generate_content with call/latency metrics (streamed calls are timed in _timed_stream).
+        """
+        model = self._model(system_instruction)
+        started = time.perf_counter()
+        try:
+            resp = model.generate_content(contents, **kwargs)
+        except Exception:
+            LLM_CALLS.inc(method=method, outcome="error")
+            raise
+        if not kwargs.get("stream"):
+            LLM_SECONDS.observe(time.perf_counter() - started, method=method)
+            LLM_CALLS.inc(method=method, outcome="ok")
+        return resp, started
 
-    def _coerce_json(self, text: str) -> Optional[dict]:
+    async def _generate_async(self, method: str, contents, system_instruction: Optional[str] = None, **kwargs):
         """
-        Try to extract a JSON object from the given text.
-        - First, try to parse the entire text as JSON.
-        - If that fails, attempt to extract the first valid JSON block using brace matching.
+        _generate on the event loop: generate_content_async awaits the API call without holding a thread.
         """
-        if not text:
-            return None
+        model = self._model(system_instruction)
+        started = time.perf_counter()
+        try:
+            resp = await model.generate_content_async(contents, **kwargs)
+        except Exception:
+            LLM_CALLS.inc(method=method, outcome="error")
+            raise
+        if not kwargs.get("stream"):
+            LLM_SECONDS.observe(time.perf_counter() - started, method=method)
+            LLM_CALLS.inc(method=method, outcome="ok")
+        return resp, started
 
-        # Try direct parse first
+    def _timed_stream(self, method: str, resp, started: float):
         try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            pass
+            yield from resp
+        except Exception:
+            LLM_CALLS.inc(method=method, outcome="error")
+            raise
+        LLM_SECONDS.observe(time.perf_counter() - started, method=method)
+        LLM_CALLS.inc(method=method, outcome="ok")
 
-        # Extract a block and try again
-        block = self._extract_json_block(text)
-        if block:
-            try:
-                return json.loads(block)
-            except json.JSONDecodeError:
-                return None
-        return None
+    async def _timed_stream_async(self, method: str, resp, started: float):
+        try:
+            async for chunk in resp:
+                yield chunk
+        except Exception:
+            LLM_CALLS.inc(method=method, outcome="error")
+            raise
+        LLM_SECONDS.observe(time.perf_counter() - started, method=method)
+        LLM_CALLS.inc(method=method, outcome="ok")
 
-    def analyze(self, image_path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    def _prepare_analysis(self, image: ImageSource):
         """
-        Analyze a fashion image and return:
-        - raw model response text
-        - parsed JSON (or None if not parseable)
+        Preprocess the image and look it up in the analysis cache.
+        Returns (prepared image, cache key, cached (raw, parsed) or None).
         """
-        img = Image.open(image_path).convert("RGB")
-
-        prompt = (
-            "You are a fashion AI analyst. Analyze the clothing items in this image and return ONLY a structured JSON response with the following format:\n"
-            "{\n"
-            '  "items": [\n'
-            '    {\n'
-            '      "type": "clothing_type",\n'
-            '      "style": "style_category",\n'
-            '      "colors": ["color1", "color2"],\n'
-            '      "patterns": ["pattern1", "pattern2"],\n'
-            '      "materials": ["material1", "material2"],\n'
-            '      "details": ["detail1", "detail2"]\n'
-            '    }\n'
-            '  ],\n'
-            '  "accessories": ["accessory1", "accessory2"],\n'
-            '  "overall": {\n'
-            '    "dominant_colors": ["color1", "color2"],\n'
-            '    "style": "overall_style",\n'
-            '    "seasons": ["season1", "season2"],\n'
-            '    "occasions": ["occasion1", "occasion2"]\n'
-            '  },\n'
-            '  "description": "Brief AI-readable description with keywords"\n'
-            "}\n"
-            "Return ONLY the JSON object. No additional text, explanations, or formatting. Ensure all values are concise and keyword-focused for AI processing."
-        )
-
-
-        model = self.client.GenerativeModel(self.model)
-        resp = model.generate_content([prompt, img])
-
-        raw = resp.text or ""
+        with span("analyze.preprocess"):
+            prepared = prepare_image(image, max_edge=self.max_edge)
+
+        cache_key = None
+        if self.cache is not None:
+            started = time.time()
+            cache_key = AnalysisCache.make_key(image_fingerprint(prepared.image), self.model, ANALYSIS_PROMPT_VERSION)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Analysis cache hit ({round((time.time() - started) * 1000, 2)} ms)")
+                return prepared, cache_key, cached
+        return prepared, cache_key, None
+
+    def _finish_analysis(self, cache_key: Optional[str], raw: str) -> AnalysisResult:
         parsed = self._coerce_json(raw)
+        if cache_key is not None and raw:
+            self.cache.set(cache_key, raw, parsed)
         return raw, parsed
 
-    def suggest(self, context_prompt: str) -> str:
+    def _analyze_prepared(self, prepared, cache_key: Optional[str]) -> AnalysisResult:
+        with span("analyze.model"):
+            resp, _ = self._generate("analyze", [{"mime_type": prepared.mime_type, "data": prepared.data}],
+                                     system_instruction=ANALYSIS_PROMPT)
+        return self._finish_analysis(cache_key, resp.text or "")
+
+    async def _analyze_prepared_async(self, prepared, cache_key: Optional[str]) -> AnalysisResult:
+        with span("analyze.model"):
+            resp, _ = await self._generate_async(
+                "analyze", [{"mime_type": prepared.mime_type, "data": prepared.data}], system_instruction=ANALYSIS_PROMPT)
+        return await asyncio.to_thread(self._finish_analysis, cache_key, resp.text or "")
+
+    def analyze(self, image: ImageSource) -> AnalysisResult:
+        """
+        Analyze a fashion image (a path, the raw bytes or a binary file-like object) and return:
+        - raw model response text
+        - parsed JSON (or None if not parseable)
+        """
+        prepared, cache_key, cached = self._prepare_analysis(image)
+        if cached is not None:
+            return cached
+        return self._analyze_prepared(prepared, cache_key)
+
+    async def analyze_async(self, image: ImageSource) -> AnalysisResult:
+        """
+        Async variant of analyze(). Image preprocessing and the SQLite cache run on a worker thread;
+        the model call itself is awaited on the event loop.
+        """
+        prepared, cache_key, cached = await asyncio.to_thread(self._prepare_analysis, image)
+        if cached is not None:
+            return cached
+        return await self._analyze_prepared_async(prepared, cache_key)
+
+    # --- Batched analysis
+
+    def _prepare_batch(self, images: Sequence[ImageSource]):
+        """
+        Preprocess every image and check the cache. Returns (results, batches): results holds cache hits and
+        preprocessing errors by position, batches the rest as lists of (position, prepared, cache key).
+        """
+        results: List[Any] = [None] * len(images)
+        pending = []
+        for position, image in enumerate(images):
+            try:
+                prepared, cache_key, cached = self._prepare_analysis(image)
+            except Exception as e:
+                results[position] = e
+                continue
+            if cached is not None:
+                results[position] = cached
+            else:
+                pending.append((position, prepared, cache_key))
+        return results, [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+
+    @staticmethod
+    def _batch_contents(batch) -> list:
+        contents = []
+        for number, (_, prepared, _) in enumerate(batch, start=1):
+            contents += [f"Image {number}:", {"mime_type": prepared.mime_type, "data": prepared.data}]
+        return contents
+
+    @staticmethod
+    def _split_batch(batch, raw: Optional[str], error: Optional[Exception]) -> List[Optional[dict]]:
+        """
+        The per-image entries of a batched response; None marks the images to analyze one call each.
+        """
+        if error is not None:
+            logger.warning(f"Batched analysis of {len(batch)} images failed ({error}); analyzing them one by one")
+            ANALYSIS_BATCH_FALLBACKS.inc(len(batch), reason="error")
+            return [None] * len(batch)
+        entries = split_batch_analysis(raw or "", len(batch))
+        missing = entries.count(None)
+        if missing:
+            logger.warning(f"Batched analysis covered {len(batch) - missing} of {len(batch)} images; "
+                           f"analyzing the rest one by one")
+            ANALYSIS_BATCH_FALLBACKS.inc(missing, reason="unparsed")
+        return entries
+
+    def analyze_batch(self, images: Sequence[ImageSource]) -> List[Union[AnalysisResult, Exception]]:
+        """
+        Analyze several images with one model call per batch_size images instead of one call each.
+        Returns, per image and in order, analyze()'s (raw, parsed) or the exception its analysis raised.
+        Images the batched response does not cover are retried with their own analyze() call.
+        """
+        results, batches = self._prepare_batch(images)
+        for batch in batches:
+            entries = [None]
+            if len(batch) > 1:
+                raw, error = None, None
+                try:
+                    with span("analyze.model"):
+                        resp, _ = self._generate("analyze_batch", self._batch_contents(batch),
+                                                 system_instruction=BATCH_ANALYSIS_PROMPT)
+                    raw = resp.text
+                except Exception as e:
+                    error = e
+                entries = self._split_batch(batch, raw, error)
+
+            for (position, prepared, cache_key), entry in zip(batch, entries):
+                try:
+                    if entry is None:
+                        results[position] = self._analyze_prepared(prepared, cache_key)
+                    else:
+                        results[position] = self._finish_analysis(cache_key, json.dumps(entry))
+                except Exception as e:
+                    results[position] = e
+        return results
+
+    async def analyze_batch_async(self, images: Sequence[ImageSource]) -> List[Union[AnalysisResult, Exception]]:
+        """
+        Async variant of analyze_batch(); the per-image retries of a batch run concurrently.
+        """
+        results, batches = await asyncio.to_thread(self._prepare_batch, images)
+        for batch in batches:
+            entries = [None]
+            if len(batch) > 1:
+                raw, error = None, None
+                try:
+                    with span("analyze.model"):
+                        resp, _ = await self._generate_async("analyze_batch", self._batch_contents(batch),
+                                                             system_instruction=BATCH_ANALYSIS_PROMPT)
+                    raw = resp.text
+                except Exception as e:
+                    error = e
+                entries = self._split_batch(batch, raw, error)
+
+            async def finish(prepared, cache_key, entry):
+                if entry is None:
+                    return await self._analyze_prepared_async(prepared, cache_key)
+                return await asyncio.to_thread(self._finish_analysis, cache_key, json.dumps(entry))
+
+            outcomes = await asyncio.gather(*(finish(prepared, cache_key, entry)
+                                              for (_, prepared, cache_key), entry in zip(batch, entries)),
+                                            return_exceptions=True)
+            for (position, _, _), outcome in zip(batch, outcomes):
+                results[position] = outcome
+        return results
+
+    def suggest(self, context_prompt: str, system_instruction: Optional[str] = None) -> str:
         """
         Generate outfit suggestion based on wardrobe and weather context.
+        Static instructions go in system_instruction, which reuses one model handle per distinct value.
         """
-        model = self.client.GenerativeModel(self.model)
-        resp = model.generate_content([context_prompt])
+        resp, _ = self._generate("suggest", [context_prompt], system_instruction)
+        return resp.text or ""
+
+    async def suggest_async(self, context_prompt: str, system_instruction: Optional[str] = None) -> str:
+        resp, _ = await self._generate_async("suggest", [context_prompt], system_instruction)
         return resp.text or ""
+
+    def suggest_stream(self, context_prompt: str, system_instruction: Optional[str] = None) -> Iterator[str]:
+        """
+        Streaming variant of suggest(): yields text chunks as the model generates them.
+        """
+        resp, started = self._generate("suggest_stream", [context_prompt], system_instruction, stream=True)
+        for chunk in self._timed_stream("suggest_stream", resp, started):
+            text = chunk_text(chunk)
+            if text:
+                yield text
+
+    async def suggest_stream_async(self, context_prompt: str, system_instruction: Optional[str] = None) -> AsyncIterator[str]:
+        resp, started = await self._generate_async("suggest_stream", [context_prompt], system_instruction, stream=True)
+        async for chunk in self._timed_stream_async("suggest_stream", resp, started):
+            text = chunk_text(chunk)
+            if text:
+                yield text
@@ -31,7 +31,7 @@ const WardrobeGallery = ({ items, onDeleteItem }: WardrobeGalleryProps) => {
         newLoading[item.id] = true;
         try {
           if (token) {
-            const res = await fetch(`/wardrobe/${item.id}/file`, {
+            const res = await fetch(`/wardrobe/${item.id}/file?size=md`, {
               method: "GET",
               headers: {
                 Authorization: `Bearer ${token}`,
@@ -10,10 +10,20 @@ interface BackendWardrobeItem {
   id: number;
   filename: string;
   file_url: string;
-  description: string;
+  description?: string;
+  digest?: string;
   created_at: number;
 }
 
+interface WardrobePage {
+  items: BackendWardrobeItem[];
+  next_cursor: string | null;
+}
+
+// Gallery only needs the short digest, not the full AI description
+const WARDROBE_LIST_FIELDS = "id,filename,file_url,digest,created_at";
+const WARDROBE_PAGE_SIZE = 100;
+
 interface FrontendWardrobeItem {
   id: string;
   name: string;
@@ -78,13 +88,16 @@ const extractItemCategory = (description: string): string => {
   return "Other";
 };
 
-const mapWardrobeItem = (item: BackendWardrobeItem): FrontendWardrobeItem => ({
-  id: item.id.toString(),
-  name: extractItemName(item.description || ""),
-  image_url: item.file_url,
-  fallback_text: item.description || `${item.filename} - Wardrobe item`,
-  category: extractItemCategory(item.description || ""),
-});
+const mapWardrobeItem = (item: BackendWardrobeItem): FrontendWardrobeItem => {
+  const text = item.description || item.digest || "";
+  return {
+    id: item.id.toString(),
+    name: extractItemName(text),
+    image_url: item.file_url,
+    fallback_text: text || `${item.filename} - Wardrobe item`,
+    category: extractItemCategory(text),
+  };
+};
 
 // === API Client ===
 
@@ -121,9 +134,12 @@ class ApiClient {
   return response.json();
 }
 
-  async listWardrobe(): Promise<FrontendWardrobeItem[]> {
-    const response = await this.request<BackendWardrobeItem[]>("/wardrobe");
-    return response.map(mapWardrobeItem);
+  // One page of the wardrobe, newest first; pass the returned nextCursor to fetch the following page
+  async listWardrobe(cursor: string | null = null): Promise<{ items: FrontendWardrobeItem[]; nextCursor: string | null }> {
+    const params = new URLSearchParams({ limit: String(WARDROBE_PAGE_SIZE), fields: WARDROBE_LIST_FIELDS });
+    if (cursor) params.set("cursor", cursor);
+    const page = await this.request<WardrobePage>(`/wardrobe?${params.toString()}`);
+    return { items: page.items.map(mapWardrobeItem), nextCursor: page.next_cursor };
   }
 
   async uploadWardrobe(files: File[]): Promise<FrontendWardrobeItem[]> {
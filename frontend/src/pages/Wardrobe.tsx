@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useSearchParams } from 'react-router-dom';
 import WardrobeUpload from '@/components/WardrobeUpload';
 import WardrobeGallery from '@/components/WardrobeGallery';
@@ -11,16 +11,20 @@ const Wardrobe = () => {
   const [uploadedFiles, setUploadedFiles] = useState<File[]>([]);
   const [showUpload, setShowUpload] = useState(false);
   const [loading, setLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const loadMoreRef = useRef<HTMLDivElement>(null);
   const [uploading, setUploading] = useState(false);
   const [searchParams] = useSearchParams();
   const { toast } = useToast();
 
-  // Load wardrobe items from backend
+  // Load the first page of wardrobe items from backend; later pages come from loadMoreItems
   const loadWardrobeItems = async () => {
     try {
       setLoading(true);
-      const items = await apiClient.listWardrobe();
-      setWardrobeItems(items);
+      const page = await apiClient.listWardrobe();
+      setWardrobeItems(page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Failed to load wardrobe items:', error);
       toast({
@@ -33,11 +37,41 @@ const Wardrobe = () => {
     }
   };
 
+  const loadMoreItems = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const page = await apiClient.listWardrobe(nextCursor);
+      setWardrobeItems(prev => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to load more wardrobe items:', error);
+      toast({
+        title: "Error loading wardrobe",
+        description: "Failed to load more items. Please try again.",
+        variant: "destructive",
+      });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Load items on component mount
   useEffect(() => {
     loadWardrobeItems();
   }, []);
 
+  // Fetch the next page when the "Load more" button scrolls into view
+  useEffect(() => {
+    const target = loadMoreRef.current;
+    if (!target || !nextCursor) return;
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0].isIntersecting) loadMoreItems();
+    }, { rootMargin: '200px' });
+    observer.observe(target);
+    return () => observer.disconnect();
+  }, [nextCursor, loadingMore]);
+
   // Auto-open upload if coming from link
   useEffect(() => {
     if (searchParams.get('upload') === 'true') {
@@ -197,6 +231,18 @@ const Wardrobe = () => {
             onDeleteItem={handleDeleteItem}
           />
 
+          {nextCursor && (
+            <div ref={loadMoreRef} className="text-center">
+              <button
+                onClick={loadMoreItems}
+                disabled={loadingMore}
+                className="fashion-button-primary inline-flex items-center gap-2 disabled:opacity-50 disabled:cursor-not-allowed"
+              >
+                {loadingMore ? '⏳ Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
+
           {/* Empty State */}
           {wardrobeItems.length === 0 && !showUpload && (
             <div className="text-center py-16">
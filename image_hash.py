@@ -0,0 +1,94 @@
+# image_hash.py
+import io
+from typing import Any, List, Optional, Tuple, Union, BinaryIO
+
+from image_preprocess import IMAGE_MAX_PIXELS
+
+DHASH_SIZE = 8          # 8x8 gradient bits -> a 64-bit hash, stored as 16 hex digits
+DHASH_MIN_CONTRAST = 8  # grey levels; flatter images hash to noise (or all zeros) and would all "match"
+
+
+def dhash(source: Union[str, bytes, BinaryIO], size: int = DHASH_SIZE) -> Optional[str]:
+    """
+    Difference hash of an image: shrink to (size+1) x size grayscale and record whether each pixel is
+    brighter than its right neighbour. Re-crops, re-encodes and lighting changes move only a few bits,
+    so near-duplicates are a small Hamming distance apart (see hash_distance).
+    Returns None for images too flat to fingerprint.
+    """
+    from PIL import Image, ImageOps  # deferred so importing the app does not load PIL
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with Image.open(source) as img:
+        if img.width * img.height > IMAGE_MAX_PIXELS:
+            raise ValueError(f"Image too large to process ({img.width}x{img.height})")
+        img.draft("L", (size * 8, size * 8))  # JPEGs decode at 1/8 scale; the hash only needs a few pixels
+        img = ImageOps.exif_transpose(img)
+        pixels = img.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS).tobytes()
+    if max(pixels) - min(pixels) < DHASH_MIN_CONTRAST:
+        return None
+
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            bits = (bits << 1) | (left > pixels[row * (size + 1) + col + 1])
+    return f"{bits:0{size * size // 4}x}"
+
+
+def hash_distance(a: str, b: str) -> int:
+    """
+    Hamming distance between two hex hashes.
+    """
+    return (int(a, 16) ^ int(b, 16)).bit_count()
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over hex image hashes under Hamming distance. A search for everything within
+    distance d only descends into children whose edge distance lies in [D - d, D + d] (D = distance to
+    the node), so lookups touch a small part of the tree instead of every hash.
+    Not locked: build it fully, then share it read-only.
+    """
+
+    def __init__(self):
+        self._root: Optional[list] = None  # [hash as int, value, {edge distance: child node}]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, image_hash: str, value: Any) -> None:
+        node_hash = int(image_hash, 16)
+        self._size += 1
+        if self._root is None:
+            self._root = [node_hash, value, {}]
+            return
+        node = self._root
+        while True:
+            distance = (node[0] ^ node_hash).bit_count()
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [node_hash, value, {}]
+                return
+            node = child
+
+    def search(self, image_hash: str, max_distance: int) -> List[Tuple[int, Any]]:
+        """
+        (distance, value) for every hash within max_distance, nearest first.
+        """
+        if self._root is None:
+            return []
+        query = int(image_hash, 16)
+        found = []
+        stack = [self._root]
+        while stack:
+            node_hash, value, children = stack.pop()
+            distance = (node_hash ^ query).bit_count()
+            if distance <= max_distance:
+                found.append((distance, value))
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda match: match[0])
+        return found
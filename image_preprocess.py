@@ -0,0 +1,85 @@
+# image_preprocess.py
+import io
+import os
+import time
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Union, BinaryIO
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1024"))            # longest edge sent to the model, in px
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG").upper()             # JPEG or WEBP
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(60_000_000)))  # refuse to decode anything larger
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+@dataclass
+class PreparedImage:
+    image: "Image.Image"    # downscaled, orientation-corrected RGB image
+    data: bytes             # re-encoded bytes to send to the model
+    mime_type: str
+    original_size: tuple    # (width, height) before preprocessing
+    original_bytes: int
+    elapsed_ms: float
+
+
+def prepare_image(source: Union[str, bytes, BinaryIO], max_edge: int = IMAGE_MAX_EDGE, fmt: str = IMAGE_FORMAT,
+                  quality: int = IMAGE_QUALITY) -> PreparedImage:
+    """
+    Load an image with bounded memory and shrink it for model upload:
+    - JPEG draft mode decodes directly at 1/2, 1/4 or 1/8 scale instead of full resolution
+    - Image.reduce() does a cheap integer box downscale for anything still far too large
+    - EXIF orientation is applied, then a LANCZOS thumbnail enforces the exact max edge
+    - the result is re-encoded as a compact JPEG/WebP
+    """
+    from PIL import Image, ImageOps  # deferred so importing the app does not load PIL
+
+    started = time.perf_counter()
+    fmt = fmt.upper() if fmt.upper() in MIME_TYPES else "JPEG"
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)  # a bytes object is shared by BytesIO, not copied
+    if isinstance(source, (str, os.PathLike)):
+        original_bytes = os.path.getsize(source)
+    else:
+        original_bytes = source.seek(0, io.SEEK_END)
+        source.seek(0)
+
+    with Image.open(source) as img:
+        original_size = img.size
+        if img.width * img.height > IMAGE_MAX_PIXELS:
+            raise ValueError(f"Image too large to process ({img.width}x{img.height})")
+
+        # Only affects JPEGs; a no-op for other formats. Square box because EXIF may rotate later.
+        img.draft("RGB", (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+
+        factor = max(img.size) // (max_edge * 2)
+        if factor >= 2:
+            img = img.reduce(factor)
+        img = img.convert("RGB")
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, quality=quality, optimize=fmt == "JPEG")
+    data = buf.getvalue()
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    logger.info(
+        f"Prepared image {original_size[0]}x{original_size[1]} -> {img.width}x{img.height}, "
+        f"{original_bytes} -> {len(data)} bytes ({original_bytes - len(data)} saved) in {elapsed_ms} ms"
+    )
+    return PreparedImage(
+        image=img,
+        data=data,
+        mime_type=MIME_TYPES[fmt],
+        original_size=original_size,
+        original_bytes=original_bytes,
+        elapsed_ms=elapsed_ms,
+    )
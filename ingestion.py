@@ -0,0 +1,88 @@
+# ingestion.py
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# WardrobeItem.status values
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+
+class IngestionWorker:
+    """
+    Background pool that fills in wardrobe item descriptions after the upload request has returned.
+
+    The job state itself lives on the WardrobeItem rows (status / attempts / claimed_at / retry_at),
+    so the worker only has to know how to process one item ID and how to find unfinished ones again,
+    both after a restart and periodically (claims left behind by a crashed worker become retakeable
+    once stale, which can be long after this process started).
+    """
+
+    def __init__(self, app, process: Callable[[int], None], find_unfinished: Callable[[], Iterable[int]],
+                 workers: int = 2, sweep_interval: float = 0):
+        self.app = app
+        self.process = process
+        self.find_unfinished = find_unfinished
+        self.sweep_interval = sweep_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sweeper = None
+
+    def submit(self, item_id: int, delay: float = 0) -> None:
+        if delay > 0:
+            timer = threading.Timer(delay, self.submit, args=(item_id,))
+            timer.daemon = True
+            timer.start()
+            return
+        with self._lock:
+            if item_id in self._queued:
+                return
+            self._queued.add(item_id)
+        self._executor.submit(self._run, item_id)
+
+    def resume(self) -> int:
+        """
+        Re-enqueue items left unfinished by a previous process. Returns how many were queued.
+        """
+        with self.app.app_context():
+            item_ids = list(self.find_unfinished())
+        for item_id in item_ids:
+            self.submit(item_id)
+        if item_ids:
+            logger.info(f"Resumed {len(item_ids)} unfinished wardrobe ingestion jobs")
+        return len(item_ids)
+
+    def start_sweeping(self) -> None:
+        """
+        Run resume() every sweep_interval seconds in a daemon thread (no-op if the interval is 0).
+        """
+        if self.sweep_interval <= 0 or self._sweeper is not None:
+            return
+        self._sweeper = threading.Thread(target=self._sweep, name="ingest-sweep", daemon=True)
+        self._sweeper.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _sweep(self) -> None:
+        while not self._stopped.wait(self.sweep_interval):
+            try:
+                self.resume()
+            except Exception as e:
+                logger.warning(f"Ingestion sweep failed: {e}")
+
+    def _run(self, item_id: int) -> None:
+        with self._lock:
+            self._queued.discard(item_id)
+        try:
+            with self.app.app_context():
+                self.process(item_id)
+        except Exception as e:
+            logger.error(f"Ingestion job for wardrobe item {item_id} crashed: {e}")
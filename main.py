@@ -1,4 +1,6 @@
-from API import app
+from API import create_app
+
+app = create_app()
 
 if __name__ == "__main__":
     app.run()
\ No newline at end of file
@@ -0,0 +1,180 @@
+# metrics.py
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import flask
+
+# Seconds; covers sub-millisecond DB work up to slow LLM completions
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Sample = Tuple[str, Dict[str, str], float]  # (metric name, labels, value)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[idx] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(dict(labels, le=_format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    In-process metrics, rendered in the Prometheus text exposition format. Each worker process
+    keeps its own values; scrape every worker (or run a single one) to get complete numbers.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors: List[Tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, name: str, metric_type: str, help_text: str,
+                           collect: Callable[[], Iterable[Sample]]) -> None:
+        """
+        Metric whose samples are read at scrape time, e.g. hit/miss totals a cache already keeps.
+        """
+        self._collectors.append((name, metric_type, help_text, collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, metric_type, help_text, collect in self._collectors:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample_name, labels, value in collect():
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram("request_stage_duration_seconds", "Time spent per request stage.", ["stage"])
+REQUEST_SECONDS = registry.histogram("http_request_duration_seconds", "HTTP request latency.",
+                                     ["method", "endpoint", "status"])
+LLM_CALLS = registry.counter("llm_calls_total", "Gemini generate_content calls.", ["method", "outcome"])
+LLM_SECONDS = registry.histogram("llm_call_duration_seconds", "Gemini call latency.", ["method"])
+PROMPT_CHARS = registry.histogram("llm_prompt_chars",
+                                  "Characters in per-request stylist prompts (excluding the system instruction).",
+                                  buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000, 64000))
+PROMPT_CHARS_TOTAL = registry.counter("llm_prompt_chars_total",
+                                      "Characters sent in per-request stylist prompts (excluding the system instruction).")
+STAGE_DEGRADED = registry.counter("request_stage_degraded_total",
+                                  "Stages that failed or timed out and were skipped.", ["stage", "reason"])
+ANALYSIS_BATCH_FALLBACKS = registry.counter("analysis_batch_fallback_total",
+                                            "Images of a batched analysis re-analyzed on their own.", ["reason"])
+WARDROBE_DUPLICATES = registry.counter("wardrobe_duplicate_uploads_total",
+                                       "Near-duplicate wardrobe uploads that reused an analysis.", ["source"])
+
+
+_spans_lock = threading.Lock()
+
+
+def record_span(name: str, seconds: float, spans: Optional[Dict[str, float]] = None) -> None:
+    """
+    Record a stage duration. spans is the request's span dict, for stages timed on another thread.
+    """
+    STAGE_SECONDS.observe(seconds, stage=name)
+    if spans is None and flask.has_request_context():
+        spans = flask.g.setdefault("spans", {})
+    if spans is not None:
+        with _spans_lock:  # stages of one request may finish on several threads at once
+            spans[name] = round(spans.get(name, 0.0) + seconds * 1000, 2)
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a stage. The duration goes into the stage histogram and, inside a request, onto
+    flask.g.spans ({stage: ms}, repeated stages are summed) for the request's log line.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+
+def request_spans(create: bool = False) -> Optional[Dict[str, float]]:
+    if not flask.has_request_context():
+        return None
+    return flask.g.setdefault("spans", {}) if create else flask.g.get("spans")
@@ -0,0 +1,108 @@
+# stream_json.py
+import json
+from typing import Any, Dict, List, Optional
+
+
+class SuggestionStreamParser:
+    """
+    Incremental, string-aware scanner for the stylist's JSON reply.
+
+    Text can be fed in arbitrary chunks (as it streams from the model). Each element of the
+    top-level "recommendations" array is returned by feed() as soon as its closing brace arrives;
+    result() gives the whole top-level object once it is complete. Braces and brackets inside
+    string literals are ignored, and anything before the first "{" (e.g. a ```json fence) is skipped.
+    """
+
+    def __init__(self, array_key: str = "recommendations"):
+        self.array_key = array_key
+        self._buf = ""
+        self._pos = 0                  # next character to scan
+        self._stack: List[str] = []    # open containers, "{" or "["
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None   # last string seen directly inside the top-level object
+        self._array_depth: Optional[int] = None  # stack depth inside the target array
+        self._item_start: Optional[int] = None
+        self._top_start: Optional[int] = None
+        self._top_end: Optional[int] = None
+        self.items: List[Dict[str, Any]] = []
+
+    @property
+    def complete(self) -> bool:
+        return self._top_end is not None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._buf += chunk
+        found = []
+        buf = self._buf
+        i = self._pos
+        n = len(buf)
+        while i < n and self._top_end is None:
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1 and self._stack[0] == "{":
+                        try:
+                            self._last_key = json.loads(buf[self._string_start:i + 1])
+                        except ValueError:
+                            self._last_key = None
+            elif ch == '"':
+                if self._stack:
+                    self._in_string = True
+                    self._string_start = i
+            elif ch == "{":
+                if not self._stack:
+                    self._top_start = i
+                elif self._array_depth is not None and len(self._stack) == self._array_depth:
+                    self._item_start = i
+                self._stack.append("{")
+            elif ch == "[":
+                if self._stack:
+                    self._stack.append("[")
+                    if len(self._stack) == 2 and self._last_key == self.array_key:
+                        self._array_depth = 2
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                    depth = len(self._stack)
+                    if ch == "}" and self._item_start is not None and depth == self._array_depth:
+                        item = self._load(buf[self._item_start:i + 1])
+                        self._item_start = None
+                        if isinstance(item, dict):
+                            self.items.append(item)
+                            found.append(item)
+                    elif ch == "]" and self._array_depth is not None and depth == self._array_depth - 1:
+                        self._array_depth = None
+                    elif depth == 0:
+                        self._top_end = i
+            i += 1
+        self._pos = i
+        return found
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        if self._top_start is None or self._top_end is None:
+            return None
+        parsed = self._load(self._buf[self._top_start:self._top_end + 1])
+        return parsed if isinstance(parsed, dict) else None
+
+    @staticmethod
+    def _load(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+
+def parse_suggestions(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a complete stylist reply. Returns the top-level object or None if it is not valid JSON.
+    """
+    parser = SuggestionStreamParser()
+    parser.feed(text or "")
+    return parser.result()
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Read by API and WeatherClient at import / construction time; no test talks to the real services
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("OPENWEATHER_API_KEY", "test")
+os.environ.setdefault("ANALYSIS_CACHE_ENABLED", "0")
+os.environ.setdefault("SUGGESTION_CACHE_ENABLED", "0")
+
+
+class StubWeatherServer:
+    """
+    Local OpenWeather stand-in. Each request takes the next scripted (status, delay) reply, or a 200
+    with a small payload once the script runs out; requests and client connections are recorded.
+    """
+
+    def __init__(self):
+        self.replies = deque()
+        self.requests = []
+        self.connections = set()
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests.append(self.path)
+                    stub.connections.add(self.client_address)
+                    status, delay = stub.replies.popleft() if stub.replies else (200, 0.0)
+                time.sleep(delay)
+                body = json.dumps({"weather": [{"main": "Clear", "description": "clear sky"}],
+                                   "main": {"temp": 18.0, "humidity": 40}}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:  # the client gave up (read timeout)
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def script(self, *replies):
+        self.replies.extend(replies)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def weather_server():
+    server = StubWeatherServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """
+    The API module with a fresh app on a throwaway SQLite database (uploads/ under tmp_path) and the
+    model and weather calls replaced by the in-process fakes from benchmarks/fakes.py.
+    """
+    monkeypatch.chdir(tmp_path)  # uploads/ is relative to the working directory
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+
+    import API
+    from benchmarks.fakes import FakeFashionAnalyzer, FakeWeatherClient
+
+    # Module-level caches are keyed by user id, which the new database hands out again
+    for cache in (API.token_cache, API.user_cache, API.suggestion_cache, API.suggested_outfits,
+                  API.duplicate_indexes, API.feature_indexes):
+        if cache is not None:
+            cache.clear()
+    monkeypatch.setattr(API, "analyzer", FakeFashionAnalyzer())
+    monkeypatch.setattr(API, "weather_client", FakeWeatherClient(cache_ttl=0))
+
+    app = API.create_app({"INGEST_RESUME": False, "TESTING": True})
+    yield API, app
+    with app.app_context():
+        API.db.session.remove()
+        API.db.engine.dispose()
+
+
+def register(client, email: str) -> dict:
+    """
+    Register a user with a complete profile; returns the Authorization header.
+    """
+    r = client.post("/auth/register", json={"email": email, "password": "pw", "name": "Test",
+                                            "gender": "female", "skin_tone": "medium"})
+    assert r.status_code == 201, r.json
+    return {"Authorization": f"Bearer {r.json['token']}"}
+
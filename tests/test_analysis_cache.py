@@ -0,0 +1,53 @@
+import time
+
+from analysis_cache import AnalysisCache
+
+
+def _statements(cache):
+    seen = []
+    cache._conn.set_trace_callback(seen.append)
+    return seen
+
+
+def test_hit_does_not_write_until_touch_interval(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache.db"), touch_interval=600)
+    cache.set("k", "raw", {"a": 1})
+    changes = cache._conn.total_changes
+    for _ in range(5):
+        assert cache.get("k") == ("raw", {"a": 1})
+    assert cache._conn.total_changes == changes
+    assert cache.stats()["hits"] == 5
+
+
+def test_stale_entry_is_touched_on_hit(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache.db"), touch_interval=0.05)
+    cache.set("k", "raw", None)
+    before = cache._conn.execute("SELECT accessed_at FROM analysis_cache").fetchone()[0]
+    time.sleep(0.06)
+    cache.get("k")
+    after = cache._conn.execute("SELECT accessed_at FROM analysis_cache").fetchone()[0]
+    assert after > before
+
+
+def test_eviction_runs_only_when_the_tracked_count_crosses_the_limit(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache.db"), max_entries=100)
+    statements = _statements(cache)
+    for i in range(400):
+        cache.set(f"k{i}", "raw", None)
+    counts = sum("COUNT(*)" in s for s in statements)
+    assert counts < 40  # trimmed to 90% of the limit per pass, not recounted per insert
+    entries = cache._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+    assert 90 <= entries <= 100
+    assert cache.get("k399") is not None
+    assert cache.get("k0") is None
+
+
+def test_periodic_pass_expires_old_entries(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache.db"), max_age=0.05, evict_every=5)
+    for i in range(3):
+        cache.set(f"old{i}", "raw", None)
+    time.sleep(0.06)
+    for i in range(2):
+        cache.set(f"new{i}", "raw", None)  # the 5th write runs the eviction pass
+    keys = {row[0] for row in cache._conn.execute("SELECT key FROM analysis_cache")}
+    assert keys == {"new0", "new1"}
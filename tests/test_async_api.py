@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+PREFLIGHT = {"Origin": "http://localhost:5173", "Access-Control-Request-Method": "POST",
+             "Access-Control-Request-Headers": "authorization"}
+
+
+def asgi_request(app, method: str, path: str, headers: dict, body: bytes = b""):
+    """
+    One request through an ASGI app; returns (status, headers dict, body).
+    """
+    from async_api import AsyncApp
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "http_version": "1.1",
+             "scheme": "http", "server": ("localhost", 80),
+             "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    response = {"body": b""}
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode("latin-1"): v.decode("latin-1") for k, v in message["headers"]}
+        else:
+            response["body"] += message.get("body", b"")
+
+    asyncio.run(AsyncApp(app)(scope, receive, send))
+    return response["status"], response["headers"], response["body"]
+
+
+@pytest.mark.parametrize("path", ["/outfit", "/wardrobe"])
+def test_cors_preflight_matches_wsgi(api, path):
+    API, app = api
+    wsgi = app.test_client().options(path, headers=PREFLIGHT)
+    status, headers, _ = asgi_request(app, "OPTIONS", path, PREFLIGHT)
+
+    assert wsgi.status_code == 200
+    assert status == 200
+    assert "POST" in headers["allow"]
+    assert headers["access-control-allow-origin"] == wsgi.headers["Access-Control-Allow-Origin"]
+
+
+def test_async_views_still_require_a_token(api):
+    API, app = api
+    status, _, body = asgi_request(app, "POST", "/outfit", {})
+    assert status == 401
+    assert b"Token missing" in body
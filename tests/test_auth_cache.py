@@ -0,0 +1,43 @@
+from cache_utils import MISSING
+from conftest import register
+
+
+def _cached(API, user_id) -> bool:
+    return API.user_cache.get(user_id) is not MISSING
+
+
+def test_user_row_is_dropped_only_after_the_version_bump_commits(api):
+    API, app = api
+    client = app.test_client()
+    headers = register(client, "cache@example.com")
+    assert client.get("/wardrobe", headers=headers).status_code == 200
+
+    with app.app_context():
+        user_id = API.User.query.filter_by(email="cache@example.com").one().id
+        assert _cached(API, user_id)
+
+        API.bump_wardrobe_version(user_id)
+        # Still cached until the commit: a reader refilling it now would see the old version anyway
+        assert _cached(API, user_id)
+        API.db.session.commit()
+        assert not _cached(API, user_id)
+
+    # The next request caches the committed row
+    assert client.get("/wardrobe", headers=headers).status_code == 200
+    with app.app_context():
+        assert API.user_cache.get(user_id).wardrobe_version == 1
+
+
+def test_rolled_back_bump_keeps_the_cached_row(api):
+    API, app = api
+    client = app.test_client()
+    headers = register(client, "rollback@example.com")
+    client.get("/wardrobe", headers=headers)
+
+    with app.app_context():
+        user_id = API.User.query.filter_by(email="rollback@example.com").one().id
+        API.bump_wardrobe_version(user_id)
+        API.db.session.rollback()
+        assert _cached(API, user_id)
+        API.db.session.commit()  # a later, unrelated commit must not act on the rolled-back bump
+        assert _cached(API, user_id)
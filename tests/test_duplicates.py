@@ -0,0 +1,44 @@
+import io
+
+from PIL import Image
+
+from benchmarks.fakes import photo
+from conftest import register
+
+
+def _reencoded(data: bytes, quality: int) -> bytes:
+    buf = io.BytesIO()
+    Image.open(io.BytesIO(data)).save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _upload(client, headers, data: bytes, name: str) -> dict:
+    r = client.post("/wardrobe", headers=headers, data={"files": [(io.BytesIO(data), name)]},
+                    content_type="multipart/form-data")
+    assert r.status_code == 201, r.json
+    return r.json["uploaded"][0]
+
+
+def test_deleting_an_original_promotes_its_oldest_copy(api):
+    API, app = api
+    client = app.test_client()
+    headers = register(client, "dupes@example.com")
+    original_bytes = photo(7, 256)
+
+    original = _upload(client, headers, original_bytes, "original.jpg")
+    first_copy = _upload(client, headers, _reencoded(original_bytes, 70), "copy1.jpg")
+    second_copy = _upload(client, headers, _reencoded(original_bytes, 50), "copy2.jpg")
+    other = _upload(client, headers, photo(8, 256), "other.jpg")
+    assert first_copy["duplicate_of"] == original["id"]
+    assert second_copy["duplicate_of"] == original["id"]
+    assert other["duplicate_of"] is None
+
+    assert client.delete(f"/wardrobe/{original['id']}", headers=headers).status_code == 200
+
+    with app.app_context():
+        items = {item.id: item for item in API.WardrobeItem.query.all()}
+        assert items[first_copy["id"]].duplicate_of is None
+        assert items[second_copy["id"]].duplicate_of == first_copy["id"]
+        rows, _ = API.load_wardrobe_candidates(items[other["id"]].user_id)
+    # The garment is in the prompt wardrobe once, not once per copy
+    assert sorted(r.id for r in rows) == sorted([first_copy["id"], other["id"]])
@@ -0,0 +1,104 @@
+import io
+import time
+
+from benchmarks.fakes import photo
+from conftest import register
+
+
+def _enqueue(client, headers, seed: int) -> int:
+    r = client.post("/wardrobe?async=1", headers=headers, data={"files": [(io.BytesIO(photo(seed, 256)), "item.jpg")]},
+                    content_type="multipart/form-data")
+    assert r.status_code == 202, r.json
+    return r.json["pending"][0]["id"]
+
+
+def _wait_for(app, API, item_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with app.app_context():
+            item = API.db.session.get(API.WardrobeItem, item_id)
+            if item.status in statuses:
+                return item
+        time.sleep(0.02)
+    raise AssertionError(f"item {item_id} never reached {statuses}")
+
+
+def test_sweep_retakes_a_claim_orphaned_after_startup(api):
+    API, app = api
+    client = app.test_client()
+    headers = register(client, "orphan@example.com")
+    item_id = _enqueue(client, headers, 1)
+    _wait_for(app, API, item_id, {API.STATUS_READY})
+
+    # A worker claimed the item and died; the process was restarted before the claim went stale
+    with app.app_context():
+        item = API.db.session.get(API.WardrobeItem, item_id)
+        item.status, item.description = API.STATUS_PROCESSING, ""
+        item.claimed_at, item.attempts = time.time() - API.INGEST_STALE_AFTER + 0.2, 1
+        API.db.session.commit()
+
+    worker = app.extensions["ingestion_worker"]
+    worker.sweep_interval = 0.05
+    worker.start_sweeping()
+    try:
+        item = _wait_for(app, API, item_id, {API.STATUS_READY, API.STATUS_FAILED})
+    finally:
+        worker.stop()
+    assert item.status == API.STATUS_READY
+    assert item.description and item.attempts == 2
+
+
+def test_failed_analyses_back_off_then_fail(api, monkeypatch):
+    API, app = api
+    calls = []
+
+    def failing_analyze(image):
+        calls.append(time.monotonic())
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(API, "analyze_image", failing_analyze)
+    monkeypatch.setattr(API, "INGEST_RETRY_BACKOFF", 0.1)
+    client = app.test_client()
+    headers = register(client, "retry@example.com")
+    item_id = _enqueue(client, headers, 2)
+
+    item = _wait_for(app, API, item_id, {API.STATUS_FAILED})
+    assert item.attempts == API.INGEST_MAX_ATTEMPTS == len(calls)
+    assert item.error == "model unavailable" and item.retry_at is None
+    gaps = [b - a for a, b in zip(calls, calls[1:])]
+    assert gaps[0] >= 0.1 and gaps[1] >= 0.2
+
+
+def test_pending_retry_is_not_claimed_before_its_backoff(api):
+    API, app = api
+    client = app.test_client()
+    headers = register(client, "early@example.com")
+    item_id = _enqueue(client, headers, 3)
+    _wait_for(app, API, item_id, {API.STATUS_READY})
+
+    with app.app_context():
+        item = API.db.session.get(API.WardrobeItem, item_id)
+        item.status, item.retry_at = API.STATUS_PENDING, time.time() + 60
+        API.db.session.commit()
+        assert item_id not in API.unfinished_wardrobe_item_ids()
+        API.ingest_wardrobe_item(item_id)
+        assert API.db.session.get(API.WardrobeItem, item_id).status == API.STATUS_PENDING
+
+
+def test_stale_claim_on_the_last_attempt_is_marked_failed(api):
+    API, app = api
+    client = app.test_client()
+    headers = register(client, "exhausted@example.com")
+    item_id = _enqueue(client, headers, 4)
+    _wait_for(app, API, item_id, {API.STATUS_READY})
+
+    with app.app_context():
+        item = API.db.session.get(API.WardrobeItem, item_id)
+        item.status, item.attempts = API.STATUS_PROCESSING, API.INGEST_MAX_ATTEMPTS
+        item.claimed_at = time.time() - API.INGEST_STALE_AFTER - 1
+        API.db.session.commit()
+        assert item_id in API.unfinished_wardrobe_item_ids()
+        API.ingest_wardrobe_item(item_id)
+        item = API.db.session.get(API.WardrobeItem, item_id)
+        assert item.status == API.STATUS_FAILED and item.attempts == API.INGEST_MAX_ATTEMPTS
+        assert item_id not in API.unfinished_wardrobe_item_ids()
@@ -0,0 +1,30 @@
+import io
+
+from flask import request
+
+from benchmarks.fakes import photo
+from conftest import register
+
+
+def test_in_memory_outfit_images_are_not_copied(api, monkeypatch):
+    API, app = api
+    client = app.test_client()
+    headers = register(client, "outfit@example.com")
+    read_outfit_request = API.read_outfit_request
+    seen = []
+
+    def spy(current_user):
+        outfit, error = read_outfit_request(current_user)
+        streams = [f.stream for f in request.files.getlist("files")]
+        # the stream's own buffer, not a copy of it
+        seen.extend(isinstance(stream, io.BytesIO) and type(data) is bytes and data is stream.getvalue()
+                    for (_, _, data), stream in zip(outfit.images, streams))
+        return outfit, error
+
+    monkeypatch.setattr(API, "read_outfit_request", spy)
+    files = [(io.BytesIO(photo(i, 256)), f"look{i}.jpg") for i in range(2)]
+    r = client.post("/outfit", headers=headers, data={"files": files, "city": "Pune"},
+                    content_type="multipart/form-data")
+
+    assert r.status_code == 200, r.json
+    assert seen == [True, True]
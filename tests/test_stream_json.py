@@ -0,0 +1,80 @@
+import json
+import random
+
+import pytest
+
+from stream_json import SuggestionStreamParser, parse_suggestions
+
+REPLIES = {
+    "escaped_quotes": json.dumps({"recommendations": [
+        {"item": 'the "boyfriend" jeans', "reason": "ends with a backslash \\"},
+        {"item": "scarf", "reason": 'quote \\" then } and ] after it'},
+    ]}),
+    "braces_in_strings": json.dumps({"summary": "{not: [an object}", "recommendations": [
+        {"item": "{[}]", "reason": "}}}"},
+        {"item": "belt", "reason": "[[["},
+    ]}),
+    "nested_recommendations": json.dumps({
+        "meta": {"recommendations": [{"item": "not top level"}]},
+        "recommendations": [
+            {"item": "coat", "recommendations": [{"item": "inner"}], "alternatives": {"recommendations": []}},
+            {"item": "boots"},
+        ],
+    }),
+    "non_dict_entries": json.dumps({"recommendations": [
+        1, "text", None, {"item": "hat"}, [{"item": "in a nested list"}], {"item": "gloves"}, True,
+    ]}),
+    "fenced": "```json\n" + json.dumps({"recommendations": [{"item": "dress", "reason": "warm \\u00e9t\\u00e9"}],
+                                         "notes": "done"}, indent=2) + "\n```",
+}
+
+
+def _chunks(text: str, rng: random.Random):
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, 8)
+        yield text[i:i + size]
+        i += size
+
+
+@pytest.mark.parametrize("name", sorted(REPLIES))
+@pytest.mark.parametrize("seed", range(20))
+def test_random_chunk_splits_match_parse_suggestions(name, seed):
+    text = REPLIES[name]
+    expected = parse_suggestions(text)
+    assert expected is not None
+
+    parser = SuggestionStreamParser()
+    streamed = []
+    for chunk in _chunks(text, random.Random(seed)):
+        streamed.extend(parser.feed(chunk))
+
+    assert parser.complete
+    assert parser.result() == expected
+    # Only the direct dict elements of the top-level array, each once and in order
+    assert streamed == [r for r in expected["recommendations"] if isinstance(r, dict)]
+    assert parser.items == streamed
+
+
+def test_one_character_at_a_time():
+    text = REPLIES["escaped_quotes"] + REPLIES["braces_in_strings"]
+    parser = SuggestionStreamParser()
+    streamed = [item for ch in text for item in parser.feed(ch)]
+    # Scanning stops at the end of the first top-level object
+    assert parser.result() == json.loads(REPLIES["escaped_quotes"])
+    assert streamed == json.loads(REPLIES["escaped_quotes"])["recommendations"]
+
+
+def test_items_arrive_before_the_reply_is_complete():
+    text = REPLIES["nested_recommendations"]
+    cut = text.index('{"item": "boots"}')
+    parser = SuggestionStreamParser()
+    assert [item["item"] for item in parser.feed(text[:cut])] == ["coat"]
+    assert not parser.complete and parser.result() is None
+    assert [item["item"] for item in parser.feed(text[cut:])] == ["boots"]
+
+
+def test_invalid_reply():
+    assert parse_suggestions("no json here") is None
+    assert parse_suggestions('{"recommendations": [{"item": "x"},]}') is None
+    assert parse_suggestions("") is None and parse_suggestions(None) is None
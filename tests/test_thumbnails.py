@@ -0,0 +1,52 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import thumbnails
+from benchmarks.fakes import photo
+from image_preprocess import prepare_image
+
+
+def _sources(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"item{i}.jpg"
+        path.write_bytes(photo(i, 256))
+        paths.append(str(path))
+    return paths
+
+
+def test_different_thumbnails_render_in_parallel(tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnails, "THUMBNAIL_FOLDER", str(tmp_path / "thumbs"))
+    barrier = threading.Barrier(2, timeout=5)
+
+    def slow_prepare(*args, **kwargs):
+        barrier.wait()  # breaks (raises) if the second render cannot start until the first is done
+        return prepare_image(*args, **kwargs)
+
+    monkeypatch.setattr(thumbnails, "prepare_image", slow_prepare)
+    sources = _sources(tmp_path, 4)
+    first = sources[0]
+    lock = thumbnails._generate_lock(thumbnails.thumbnail_path(first, "sm"))
+    # two items whose thumbnails land on different lock stripes
+    second = next(s for s in sources[1:] if thumbnails._generate_lock(thumbnails.thumbnail_path(s, "sm")) is not lock)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        paths = list(pool.map(thumbnails.get_thumbnail, [first, second], ["sm", "sm"]))
+    assert all(os.path.exists(p) for p in paths)
+
+
+def test_concurrent_requests_for_one_thumbnail_render_it_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnails, "THUMBNAIL_FOLDER", str(tmp_path / "thumbs"))
+    calls = []
+
+    def counting_prepare(*args, **kwargs):
+        calls.append(args[0])
+        return prepare_image(*args, **kwargs)
+
+    monkeypatch.setattr(thumbnails, "prepare_image", counting_prepare)
+    (source,) = _sources(tmp_path, 1)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        paths = set(pool.map(lambda _: thumbnails.get_thumbnail(source, "md"), range(8)))
+    assert len(paths) == 1 and os.path.exists(paths.pop())
+    assert len(calls) == 1
+    assert not [name for name in os.listdir(tmp_path / "thumbs") if name.endswith(".tmp")]
@@ -0,0 +1,58 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from benchmarks.fakes import photo
+from conftest import register
+
+USERS = 6
+REQUESTS_PER_USER = 4
+FILES_PER_REQUEST = 3
+
+
+def test_concurrent_uploads_keep_every_row_and_file(api):
+    API, app = api
+    client = app.test_client()
+    headers = [register(client, f"user{u}@example.com") for u in range(USERS)]
+
+    def upload(job):
+        user, request = job
+        seed = (user * REQUESTS_PER_USER + request) * FILES_PER_REQUEST
+        files = [(io.BytesIO(photo(seed + i, 128)), f"item{i}.jpg") for i in range(FILES_PER_REQUEST)]
+        r = app.test_client().post("/wardrobe", headers=headers[user], data={"files": files},
+                                   content_type="multipart/form-data")
+        return r.status_code, r.json
+
+    jobs = [(u, r) for u in range(USERS) for r in range(REQUESTS_PER_USER)]
+    with ThreadPoolExecutor(max_workers=USERS) as pool:
+        results = list(pool.map(upload, jobs))
+
+    assert [status for status, _ in results] == [201] * len(jobs), [body for status, body in results if status != 201]
+    assert all(not body["failed"] for _, body in results)
+
+    with app.app_context():
+        items = API.WardrobeItem.query.all()
+        journal_mode = API.db.session.execute(text("PRAGMA journal_mode")).scalar()
+    assert len(items) == USERS * REQUESTS_PER_USER * FILES_PER_REQUEST
+    filenames = [item.filename for item in items]
+    assert len(set(filenames)) == len(filenames)
+    assert all(os.path.exists(os.path.join(API.WARDROBE_FOLDER, name)) for name in filenames)
+    for u in range(USERS):
+        owned = [item for item in items if item.user_id == u + 1]
+        assert len(owned) == REQUESTS_PER_USER * FILES_PER_REQUEST
+    assert journal_mode == "wal"
+
+
+def test_upload_names_files_before_insert(api):
+    API, app = api
+    client = app.test_client()
+    headers = register(client, "solo@example.com")
+    r = client.post("/wardrobe", headers=headers, data={"files": [(io.BytesIO(photo(1, 128)), "a.JPG")]},
+                    content_type="multipart/form-data")
+    assert r.status_code == 201
+    item = r.json["uploaded"][0]
+    # "<uuid hex>.<ext>", not "<row id>.<ext>"
+    name, ext = item["filename"].rsplit(".", 1)
+    assert ext == "jpg" and len(name) == 32 and name != str(item["id"])
@@ -0,0 +1,37 @@
+from conftest import register
+
+
+def _seed(API, app, email: str, count: int) -> None:
+    with app.app_context():
+        user = API.User.query.filter_by(email=email).one()
+        API.db.session.add_all([API.WardrobeItem(user_id=user.id, filename=f"{i}.jpg", description="",
+                                                 created_at=1000.0 + i) for i in range(count)])
+        API.db.session.commit()
+
+
+def test_unpaginated_list_is_capped_with_a_cursor_for_the_rest(api, monkeypatch):
+    API, app = api
+    monkeypatch.setattr(API, "WARDROBE_MAX_PAGE_SIZE", 3)
+    client = app.test_client()
+    headers = register(client, "legacy@example.com")
+    _seed(API, app, "legacy@example.com", 5)
+
+    r = client.get("/wardrobe", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["Deprecation"] == "true"
+    assert [i["filename"] for i in r.json] == ["4.jpg", "3.jpg", "2.jpg"]
+
+    rest = client.get(f"/wardrobe?cursor={r.headers['X-Next-Cursor']}", headers=headers).json
+    assert [i["filename"] for i in rest["items"]] == ["1.jpg", "0.jpg"]
+    assert rest["next_cursor"] is None
+
+
+def test_small_unpaginated_list_has_no_cursor(api):
+    API, app = api
+    client = app.test_client()
+    headers = register(client, "small@example.com")
+    _seed(API, app, "small@example.com", 2)
+
+    r = client.get("/wardrobe", headers=headers)
+    assert len(r.json) == 2
+    assert "X-Next-Cursor" not in r.headers
@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN
+from weather_client import WeatherClient
+
+
+@pytest.fixture
+def make_client(weather_server, monkeypatch):
+    monkeypatch.setenv("WEATHER_READ_TIMEOUT", "0.3")
+    monkeypatch.setenv("WEATHER_BACKOFF", "0.01")
+
+    def make(**kwargs):
+        kwargs.setdefault("cache_ttl", 0)
+        return WeatherClient(base_url=weather_server.base_url, **kwargs)
+    return make
+
+
+def test_lookups_reuse_one_pooled_connection(weather_server, make_client):
+    client = make_client()
+    for city in ("london", "paris", "berlin"):
+        assert client.current_by_city(city)["main"]["temp"] == 18.0
+    assert len(weather_server.requests) == 3
+    assert len(weather_server.connections) == 1
+
+
+def test_retries_server_errors_then_succeeds(weather_server, make_client):
+    weather_server.script((503, 0.0), (502, 0.0))
+    client = make_client()
+    assert client.current_by_city("london") is not None
+    assert len(weather_server.requests) == 3
+    assert client.breaker.state == CLOSED
+
+
+def test_client_error_is_not_retried(weather_server, make_client):
+    weather_server.script((404, 0.0))
+    client = make_client()
+    assert client.current_by_city("atlantis") is None
+    assert len(weather_server.requests) == 1
+    assert client.breaker.failures == 0
+
+
+def test_gives_up_after_max_retries(weather_server, make_client, monkeypatch):
+    monkeypatch.setenv("WEATHER_MAX_RETRIES", "2")
+    weather_server.script(*[(503, 0.0)] * 5)
+    client = make_client()
+    assert client.current_by_city("london") is None
+    assert len(weather_server.requests) == 3
+
+
+def test_read_timeout_is_bounded(weather_server, make_client, monkeypatch):
+    monkeypatch.setenv("WEATHER_MAX_RETRIES", "1")
+    weather_server.script((200, 1.0), (200, 1.0))
+    client = make_client()
+    started = time.monotonic()
+    assert client.current_by_city("london") is None
+    # two attempts of ~0.3 s read timeout each, not the server's 1 s delay
+    assert time.monotonic() - started < 1.5
+    assert len(weather_server.requests) == 2
+
+
+def test_retry_budget_stops_retries(weather_server, make_client, monkeypatch):
+    monkeypatch.setenv("WEATHER_MAX_RETRIES", "5")
+    monkeypatch.setenv("WEATHER_RETRY_BUDGET", "0.5")
+    weather_server.script(*[(200, 1.0)] * 6)
+    client = make_client()
+    started = time.monotonic()
+    assert client.current_by_city("london") is None
+    assert time.monotonic() - started < 1.5
+    assert len(weather_server.requests) < 6
+
+
+def test_breaker_fails_fast_then_recovers_through_a_probe(weather_server, make_client, monkeypatch):
+    monkeypatch.setenv("WEATHER_MAX_RETRIES", "0")
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0.2)
+    client = make_client(breaker=breaker)
+    weather_server.script((503, 0.0), (503, 0.0))
+
+    assert client.current_by_city("london") is None
+    assert client.current_by_city("london") is None
+    assert breaker.state == OPEN
+
+    # Open: answered "unknown" without reaching the server
+    assert client.current_by_city("london") is None
+    assert len(weather_server.requests) == 2
+    assert breaker.rejected == 1
+
+    # After the recovery timeout one probe goes through; its success closes the circuit
+    time.sleep(0.25)
+    assert client.current_by_city("london") is not None
+    assert len(weather_server.requests) == 3
+    assert breaker.state == CLOSED
+
+
+def test_slow_success_counts_as_failure(weather_server, make_client, monkeypatch):
+    monkeypatch.setenv("WEATHER_MAX_RETRIES", "0")
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=60, slow_call_threshold=0.1)
+    client = make_client(breaker=breaker)
+    weather_server.script((200, 0.2))
+    assert client.current_by_city("london") is not None
+    assert breaker.state == OPEN
+    assert client.current_by_city("paris") is None
+    assert len(weather_server.requests) == 1
+
+
+def test_cache_and_single_flight_share_one_upstream_call(weather_server, make_client):
+    from concurrent.futures import ThreadPoolExecutor
+
+    weather_server.script((200, 0.2))
+    client = make_client(cache_ttl=60)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: client.current_by_city("London "), range(8)))
+    assert all(r is not None for r in results)
+    assert client.current_by_city("london") is not None
+    assert len(weather_server.requests) == 1
@@ -0,0 +1,90 @@
+# thumbnails.py
+import os
+import glob
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Optional
+
+from image_preprocess import prepare_image
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_FOLDER = os.getenv("THUMBNAIL_FOLDER", os.path.join("uploads", "thumbnails"))
+THUMBNAIL_SIZES = {"sm": 160, "md": 320, "lg": 640}  # size name -> longest edge in px
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+
+# Striped by thumbnail path: concurrent requests for one rendition generate it once, while
+# different items and sizes render in parallel
+_generate_locks = [threading.Lock() for _ in range(64)]
+
+
+def _generate_lock(thumb_path: str) -> threading.Lock:
+    return _generate_locks[hash(thumb_path) % len(_generate_locks)]
+
+
+def thumbnail_path(src_path: str, size: str) -> str:
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    return os.path.join(THUMBNAIL_FOLDER, f"{stem}_{THUMBNAIL_SIZES[size]}.webp")
+
+
+def get_thumbnail(src_path: str, size: str) -> str:
+    """
+    Return the path of the cached WebP rendition of src_path for the named size,
+    generating it on first request (or when the original is newer than the cached copy).
+    """
+    edge = THUMBNAIL_SIZES[size]
+    thumb_path = thumbnail_path(src_path, size)
+
+    if _is_fresh(thumb_path, src_path):
+        return thumb_path
+
+    with _generate_lock(thumb_path):
+        if _is_fresh(thumb_path, src_path):  # another request generated it while we waited
+            return thumb_path
+        os.makedirs(THUMBNAIL_FOLDER, exist_ok=True)
+        prepared = prepare_image(src_path, max_edge=edge, fmt="WEBP", quality=THUMBNAIL_QUALITY)
+        tmp_path = f"{thumb_path}.{os.getpid()}.{threading.get_ident()}.tmp"  # unique across processes
+        with open(tmp_path, "wb") as f:
+            f.write(prepared.data)
+        os.replace(tmp_path, thumb_path)  # atomic, readers never see a half-written file
+        logger.info(f"Generated {size} thumbnail for {os.path.basename(src_path)}")
+    return thumb_path
+
+
+def delete_thumbnails(filename: str) -> None:
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    for path in glob.glob(os.path.join(THUMBNAIL_FOLDER, f"{glob.escape(stem)}_*.webp")):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove thumbnail {path}: {e}")
+
+
+def file_etag(path: str) -> Optional[str]:
+    """
+    Strong ETag for a file: a content hash, memoized per (path, mtime, size) so the file
+    is only read once per version.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return _content_hash(path, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=4096)
+def _content_hash(path: str, mtime_ns: int, size: int) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()[:32]
+
+
+def _is_fresh(thumb_path: str, src_path: str) -> bool:
+    try:
+        return os.path.getmtime(thumb_path) >= os.path.getmtime(src_path)
+    except OSError:
+        return False
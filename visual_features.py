@@ -0,0 +1,183 @@
+# visual_features.py
+import io
+from typing import BinaryIO, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from image_preprocess import IMAGE_MAX_PIXELS
+
+HUE_BINS, SAT_BINS, VAL_BINS = 8, 3, 3
+HIST_BINS = HUE_BINS * SAT_BINS * VAL_BINS
+FEATURE_DIM = 2 * HIST_BINS   # colour histogram + dominant-colour block
+DOMINANT_COLORS = 3           # k for k-means
+SAMPLE_EDGE = 64              # features are computed on a thumbnail this big
+CENTER_CROP = 0.8             # keep the middle of the photo, where the garment usually is
+GREY_SATURATION = 0.15        # below this a pixel's hue is noise; it goes to hue bin 0
+
+
+def load_pixels(source: Union[str, bytes, BinaryIO]) -> np.ndarray:
+    """
+    Centre crop of the image as an (N, 3) float array of RGB values in [0, 1], from a small thumbnail.
+    """
+    from PIL import Image, ImageOps  # deferred so importing the app does not load PIL
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with Image.open(source) as img:
+        if img.width * img.height > IMAGE_MAX_PIXELS:
+            raise ValueError(f"Image too large to process ({img.width}x{img.height})")
+        img.draft("RGB", (SAMPLE_EDGE * 2, SAMPLE_EDGE * 2))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        margin_x, margin_y = img.width * (1 - CENTER_CROP) / 2, img.height * (1 - CENTER_CROP) / 2
+        img = img.crop((int(margin_x), int(margin_y), int(img.width - margin_x), int(img.height - margin_y)))
+        img.thumbnail((SAMPLE_EDGE, SAMPLE_EDGE))
+        return np.asarray(img, dtype=np.float32).reshape(-1, 3) / 255.0
+
+
+def rgb_to_hsv(rgb: np.ndarray) -> np.ndarray:
+    """
+    Vectorized RGB -> HSV for an (N, 3) array in [0, 1]; hue is in [0, 1).
+    """
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    maxc = rgb.max(axis=1)
+    delta = maxc - rgb.min(axis=1)
+    safe = np.where(delta > 0, delta, 1.0)
+    hue = np.select(
+        [delta == 0, maxc == r, maxc == g],
+        [0.0, ((g - b) / safe) % 6.0, (b - r) / safe + 2.0],
+        (r - g) / safe + 4.0,
+    ) / 6.0
+    saturation = np.where(maxc > 0, delta / np.where(maxc > 0, maxc, 1.0), 0.0)
+    return np.stack([hue % 1.0, saturation, maxc], axis=1)
+
+
+def color_bins(hsv: np.ndarray) -> np.ndarray:
+    """
+    Histogram bin (0..HIST_BINS-1) of each HSV pixel; unsaturated pixels all share hue bin 0.
+    """
+    hue = np.minimum((hsv[:, 0] * HUE_BINS).astype(np.int64), HUE_BINS - 1)
+    hue[hsv[:, 1] < GREY_SATURATION] = 0
+    sat = np.minimum((hsv[:, 1] * SAT_BINS).astype(np.int64), SAT_BINS - 1)
+    val = np.minimum((hsv[:, 2] * VAL_BINS).astype(np.int64), VAL_BINS - 1)
+    return (hue * SAT_BINS + sat) * VAL_BINS + val
+
+
+def kmeans(pixels: np.ndarray, k: int = DOMINANT_COLORS, iterations: int = 10,
+           seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Plain NumPy k-means (k-means++ start, fixed seed so features are reproducible).
+    Returns (centres (k, 3), share of pixels per centre), largest share first.
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(pixels))
+    centres = [pixels[rng.integers(len(pixels))]]
+    for _ in range(1, k):
+        d2 = ((pixels[:, None, :] - np.array(centres)[None]) ** 2).sum(axis=2).min(axis=1)
+        if d2.sum() == 0:
+            break
+        centres.append(pixels[rng.choice(len(pixels), p=d2 / d2.sum())])
+    centres = np.array(centres)
+
+    for _ in range(iterations):
+        labels = ((pixels[:, None, :] - centres[None]) ** 2).sum(axis=2).argmin(axis=1)
+        updated = np.array([pixels[labels == c].mean(axis=0) if np.any(labels == c) else centres[c]
+                            for c in range(len(centres))])
+        if np.allclose(updated, centres, atol=1e-4):
+            break
+        centres = updated
+
+    shares = np.bincount(labels, minlength=len(centres)) / len(pixels)
+    order = np.argsort(-shares)
+    return centres[order], shares[order]
+
+
+def smooth_histogram(histogram: np.ndarray) -> np.ndarray:
+    """
+    Spread each bin a little into its neighbours (hue wraps around), so that close shades such as
+    blue and navy, which land in adjacent bins, still overlap.
+    """
+    cube = histogram.reshape(HUE_BINS, SAT_BINS, VAL_BINS)
+    cube = 0.5 * cube + 0.25 * (np.roll(cube, 1, axis=0) + np.roll(cube, -1, axis=0))
+    for axis in (1, 2):
+        padded = np.concatenate([cube.take([0], axis=axis), cube, cube.take([-1], axis=axis)], axis=axis)
+        size = cube.shape[axis]
+        cube = (0.5 * padded.take(range(1, size + 1), axis=axis)
+                + 0.25 * (padded.take(range(0, size), axis=axis) + padded.take(range(2, size + 2), axis=axis)))
+    return cube.reshape(-1)
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def extract_features(source: Union[str, bytes, BinaryIO]) -> np.ndarray:
+    """
+    Unit-length float32 colour descriptor of an image: a smoothed HSV histogram of the centre crop,
+    followed by the k-means dominant colours binned the same way and weighted by their share.
+    Cosine similarity (a dot product) between two descriptors says how alike the garments' colours are.
+    """
+    pixels = load_pixels(source)
+    histogram = np.bincount(color_bins(rgb_to_hsv(pixels)), minlength=HIST_BINS).astype(np.float64)
+    centres, shares = kmeans(pixels)
+    dominant = np.bincount(color_bins(rgb_to_hsv(centres)), weights=shares, minlength=HIST_BINS)
+    blocks = [_unit(smooth_histogram(histogram)), _unit(smooth_histogram(dominant))]
+    return _unit(np.concatenate(blocks)).astype(np.float32)
+
+
+def to_bytes(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def from_bytes(data: bytes) -> Optional[np.ndarray]:
+    """
+    The stored vector, or None if it was written with a different layout.
+    """
+    vector = np.frombuffer(data, dtype="<f4")
+    return vector if vector.shape == (FEATURE_DIM,) else None
+
+
+def mean_features(vectors: Iterable[np.ndarray]) -> Optional[np.ndarray]:
+    vectors = [v for v in vectors if v is not None]
+    return _unit(np.mean(vectors, axis=0)).astype(np.float32) if vectors else None
+
+
+class FeatureIndex:
+    """
+    Array-backed cosine index over one user's wardrobe: a contiguous (n, FEATURE_DIM) float32 matrix of
+    unit vectors plus their item ids, so a query is one matrix-vector product over every item.
+    Read-only once built.
+    """
+
+    def __init__(self, ids: Sequence[int], vectors: Sequence[np.ndarray]):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.matrix = np.vstack(vectors).astype(np.float32) if len(vectors) else np.zeros((0, FEATURE_DIM), np.float32)
+        self._positions = {int(item_id): i for i, item_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def vector(self, item_id: int) -> Optional[np.ndarray]:
+        position = self._positions.get(item_id)
+        return None if position is None else self.matrix[position]
+
+    def similarities(self, query: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity of every indexed item to query, in self.ids order.
+        """
+        return self.matrix @ np.asarray(query, dtype=np.float32)
+
+    def nearest(self, query: np.ndarray, k: int, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """
+        The k most similar items as (item id, cosine similarity), best first.
+        """
+        scores = self.similarities(query)
+        for item_id in exclude:
+            if item_id in self._positions:
+                scores[self._positions[item_id]] = -np.inf
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(self.ids[i]), float(scores[i])) for i in top]
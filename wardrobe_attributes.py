@@ -0,0 +1,132 @@
+# wardrobe_attributes.py
+import re
+from typing import Optional, Dict, Any, List, Tuple
+
+# Bump when extraction rules change so the backfill re-processes existing rows
+ATTRIBUTES_VERSION = 2
+
+# Legend for build_digest lines, to be stated once in prompts that use them
+DIGEST_FORMAT = "type [category] style | colors | patterns | materials | seasons | occasions"
+DIGEST_MAX_VALUES = 3       # per attribute kind
+DIGEST_FALLBACK_CHARS = 160  # when the analysis could not be parsed
+
+ATTRIBUTE_KINDS = ("color", "pattern", "material", "season", "occasion")
+
+SEASONS = ("spring", "summer", "autumn", "winter")
+SEASON_ALIASES = {"fall": "autumn", "early spring": "spring", "late summer": "summer", "early autumn": "autumn"}
+ALL_SEASON_VALUES = {"all seasons", "all season", "all-season", "all-seasons", "all_seasons", "year round", "year-round"}
+
+# Coarse categories, checked in order for each word
+CATEGORY_KEYWORDS = [
+    ("outerwear", ["jacket", "coat", "blazer", "parka", "trench", "shrug", "cardigan", "vest", "nehru", "poncho", "cape", "windbreaker", "puffer"]),
+    ("one-piece", ["dress", "saree", "sari", "lehenga", "anarkali", "jumpsuit", "romper", "gown", "overall"]),
+    ("footwear", ["shoe", "sneaker", "boot", "sandal", "heel", "pump", "flat", "loafer", "jutti", "kolhapuri", "mojari", "slipper", "espadrille", "mule", "oxford", "trainer"]),
+    ("bottom", ["jean", "pant", "trouser", "short", "skirt", "palazzo", "churidar", "dhoti", "salwar", "lungi", "legging", "jogger", "pajama", "chino"]),
+    ("top", ["shirt", "t-shirt", "tee", "blouse", "kurta", "kurti", "sherwani", "top", "tank", "sweater", "hoodie", "polo", "camisole", "sweatshirt", "tunic", "pullover", "jumper"]),
+    ("accessory", ["bag", "handbag", "clutch", "purse", "scarf", "stole", "dupatta", "shawl", "belt", "hat", "cap", "beanie", "watch", "wristwatch", "sunglass", "jewel", "necklace", "earring", "bangle", "bracelet", "ring", "tie", "wallet", "backpack"]),
+]
+
+
+def normalize_value(value: Any) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    value = re.sub(r"[_\s]+", " ", value).strip().lower()
+    return value[:80] or None
+
+
+def categorize_type(item_type: Optional[str]) -> str:
+    if not item_type:
+        return "other"
+    # The garment noun usually comes last ("long sleeve shirt", "wedge ankle boot"), so scan right to left
+    words = re.findall(r"[a-z-]+", item_type.lower())
+    for word in reversed(words):
+        for category, keywords in CATEGORY_KEYWORDS:
+            if any(word.startswith(k) for k in keywords):
+                return category
+    return "other"
+
+
+def _normalize_seasons(values: List[Any]) -> List[str]:
+    seasons = []
+    for v in values:
+        v = normalize_value(v)
+        if not v:
+            continue
+        if v in ALL_SEASON_VALUES:
+            seasons.extend(SEASONS)
+            continue
+        v = SEASON_ALIASES.get(v, v)
+        if v in SEASONS:
+            seasons.append(v)
+    return seasons
+
+
+def _as_list(value: Any) -> List[Any]:
+    if isinstance(value, list):
+        return value
+    return [value] if value else []
+
+
+def extract_attributes(parsed: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Flatten the analyzer's JSON (see FashionAnalyzer.analyze) into normalized, queryable attributes:
+    {"item_type", "category", "style", "attributes": [(kind, value), ...]}.
+    The first item in the image is treated as the wardrobe piece; list attributes are merged across items.
+    """
+    result = {"item_type": None, "category": "other", "style": None, "attributes": []}
+    if not isinstance(parsed, dict):
+        return result
+
+    items = [i for i in _as_list(parsed.get("items")) if isinstance(i, dict)]
+    overall = parsed.get("overall") if isinstance(parsed.get("overall"), dict) else {}
+
+    if items:
+        result["item_type"] = normalize_value(items[0].get("type"))
+        result["style"] = normalize_value(items[0].get("style"))
+    elif _as_list(parsed.get("accessories")):
+        # Photos of a single accessory (watch, bag) come back with an empty items list
+        result["item_type"] = normalize_value(_as_list(parsed.get("accessories"))[0])
+    if not result["style"]:
+        result["style"] = normalize_value(overall.get("style"))
+    result["category"] = categorize_type(result["item_type"])
+
+    raw: List[Tuple[str, Any]] = []
+    for item in items:
+        raw += [("color", v) for v in _as_list(item.get("colors"))]
+        raw += [("pattern", v) for v in _as_list(item.get("patterns"))]
+        raw += [("material", v) for v in _as_list(item.get("materials"))]
+    raw += [("color", v) for v in _as_list(overall.get("dominant_colors"))]
+    raw += [("occasion", v) for v in _as_list(overall.get("occasions"))]
+    raw += [("season", v) for v in _normalize_seasons(_as_list(overall.get("seasons")))]
+
+    seen = set()
+    for kind, value in raw:
+        value = normalize_value(value)
+        if value and (kind, value) not in seen:
+            seen.add((kind, value))
+            result["attributes"].append((kind, value))
+    return result
+
+
+def build_digest(extracted: Dict[str, Any], raw_description: str = "") -> str:
+    """
+    Compact one-line keyword summary of an item (see DIGEST_FORMAT), e.g.
+    "denim jacket [outerwear] casual | blue, white | solid | denim | spring, autumn | casual".
+    Falls back to the start of the raw description when nothing could be extracted.
+    """
+    if not extracted.get("item_type") and not extracted.get("attributes"):
+        return " ".join((raw_description or "").split())[:DIGEST_FALLBACK_CHARS]
+
+    values = {kind: [] for kind in ATTRIBUTE_KINDS}
+    for kind, value in extracted["attributes"]:
+        if len(values[kind]) < DIGEST_MAX_VALUES:
+            values[kind].append(value)
+    if set(SEASONS) <= {v for k, v in extracted["attributes"] if k == "season"}:
+        values["season"] = ["all"]
+    head = " ".join(p for p in (
+        extracted.get("item_type") or "item",
+        f"[{extracted.get('category') or 'other'}]",
+        extracted.get("style") or "",
+    ) if p)
+    fields = [", ".join(values[kind]) or "-" for kind in ("color", "pattern", "material", "season", "occasion")]
+    return " | ".join([head] + fields)
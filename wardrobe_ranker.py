@@ -0,0 +1,134 @@
+# wardrobe_ranker.py
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Rough insulation of common materials: >0 warm, <0 cool/breathable
+MATERIAL_WARMTH = {
+    "wool": 1.0, "merino": 1.0, "cashmere": 1.0, "fleece": 1.0, "down": 1.0, "shearling": 1.0, "fur": 1.0,
+    "faux fur": 1.0, "velvet": 0.6, "corduroy": 0.6, "tweed": 0.8, "knit": 0.5, "suede": 0.5, "leather": 0.5,
+    "denim": 0.3, "polyester": 0.1, "cotton": 0.0, "cotton blend": 0.0, "jersey": 0.0, "rayon": -0.4,
+    "silk": -0.3, "chiffon": -0.8, "georgette": -0.6, "linen": -1.0, "mesh": -0.8, "voile": -0.8,
+}
+WET_WEATHER_MATERIALS = {"waterproof": 1.0, "rubber": 0.8, "nylon": 0.5, "leather": 0.3, "gore-tex": 1.0}
+NEUTRAL_COLORS = {"black", "white", "grey", "gray", "beige", "navy", "cream", "off-white", "ivory", "tan", "brown"}
+WET_CONDITIONS = {"rain", "drizzle", "thunderstorm", "snow"}
+
+SEASON_MATCH = 2.0
+SEASON_UNKNOWN = 1.0      # items without season info are neither favoured nor excluded
+OUTFIT_MATCH = 1.0        # shared style / occasion with the outfit being styled
+COLOR_MATCH = 0.3
+NEUTRAL_COLOR = 0.2
+DUPLICATE_CATEGORY = -1.0  # the outfit already has a piece of this category
+RECENCY = 0.1
+VISUAL_MATCH = 0.5        # times the cosine similarity of the item's colours to the outfit's (visual_features.py)
+
+
+@dataclass
+class RankingContext:
+    season: str
+    temperature_c: Optional[float] = None
+    condition: Optional[str] = None                      # OpenWeather "main", e.g. "Rain"
+    outfit_tokens: Set[Tuple[str, str]] = field(default_factory=set)  # (kind, value) from the analyzed outfit
+    outfit_categories: Set[str] = field(default_factory=set)
+    outfit_features: Optional[np.ndarray] = None        # mean colour descriptor of the outfit images
+
+
+def warmth_need(temperature_c: Optional[float]) -> float:
+    """
+    +1.5 for freezing, 0 around 18 °C, -1.5 for hot weather; 0 when unknown.
+    """
+    if temperature_c is None:
+        return 0.0
+    return float(np.clip((18.0 - temperature_c) / 10.0, -1.5, 1.5))
+
+
+def token_weights(vocab: Sequence[Tuple[str, str]], context: RankingContext) -> np.ndarray:
+    """
+    Weight of each distinct (kind, value) token for this context; most tokens get 0.
+    """
+    need = warmth_need(context.temperature_c)
+    wet = (context.condition or "").lower() in WET_CONDITIONS
+    weights = np.zeros(len(vocab), dtype=np.float64)
+    for i, (kind, value) in enumerate(vocab):
+        if kind == "season":
+            weights[i] = SEASON_MATCH if value == context.season else 0.0
+        elif kind == "material":
+            weights[i] = MATERIAL_WARMTH.get(value, 0.0) * need
+            if wet:
+                weights[i] += WET_WEATHER_MATERIALS.get(value, 0.0)
+        elif kind == "color":
+            if (kind, value) in context.outfit_tokens:
+                weights[i] = COLOR_MATCH
+            elif value in NEUTRAL_COLORS:
+                weights[i] = NEUTRAL_COLOR
+        elif (kind, value) in context.outfit_tokens:
+            weights[i] = OUTFIT_MATCH
+    return weights
+
+
+def score_items(categories: Sequence[str], created_at: np.ndarray, attr_rows: np.ndarray,
+                attr_token_ids: np.ndarray, vocab: Sequence[Tuple[str, str]], context: RankingContext,
+                visual_similarity: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Score every wardrobe item against the context in one vectorized pass.
+
+    categories / created_at are per item (length n). The attribute table is given as parallel
+    arrays: attr_rows[i] is the item row and attr_token_ids[i] the vocab index of one (kind, value)
+    pair, so it is scored with a gather + scatter-add instead of a per-item loop.
+    visual_similarity, if given, is each item's colour similarity to the outfit (NaN when unknown).
+    """
+    n = len(categories)
+    scores = np.zeros(n, dtype=np.float64)
+    if n == 0:
+        return scores
+
+    need = warmth_need(context.temperature_c)
+    wet = (context.condition or "").lower() in WET_CONDITIONS
+
+    if len(attr_rows):
+        np.add.at(scores, attr_rows, token_weights(vocab, context)[attr_token_ids])
+        season_ids = np.array([i for i, (kind, _) in enumerate(vocab) if kind == "season"], dtype=np.int64)
+        has_season = np.zeros(n, dtype=bool)
+        has_season[attr_rows[np.isin(attr_token_ids, season_ids)]] = True
+        scores[~has_season] += SEASON_UNKNOWN
+    else:
+        scores += SEASON_UNKNOWN
+
+    cats = np.asarray(categories, dtype=object)
+    if need > 0 or wet:
+        scores[cats == "outerwear"] += max(need, 0.0) + (0.5 if wet else 0.0)
+    for category in context.outfit_categories - {"accessory", "other"}:
+        scores[cats == category] += DUPLICATE_CATEGORY
+
+    if visual_similarity is not None:
+        scores += VISUAL_MATCH * np.nan_to_num(visual_similarity, nan=0.0)
+
+    # Newer items break ties
+    if n > 1:
+        order = created_at.argsort().argsort()
+        scores += RECENCY * order / (n - 1)
+    return scores
+
+
+def select_top_k(categories: Sequence[str], scores: np.ndarray, k: int, per_category_min: int = 2) -> List[int]:
+    """
+    Indices of the k best items, highest score first, guaranteeing each category its best
+    per_category_min items so the stylist can still complete a head-to-toe outfit.
+    """
+    n = len(scores)
+    if n <= k:
+        return np.argsort(-scores, kind="stable").tolist()
+
+    ranked = np.argsort(-scores, kind="stable")
+    cats = np.asarray(categories, dtype=object)[ranked]
+    chosen = []
+    for category in dict.fromkeys(cats):
+        chosen.extend(ranked[cats == category][:per_category_min].tolist())
+    chosen = set(chosen[:k])
+    for idx in ranked:
+        if len(chosen) >= k:
+            break
+        chosen.add(int(idx))
+    return sorted(chosen, key=lambda i: -scores[i])
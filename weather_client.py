@@ -1,33 +1,157 @@
 # weather_client.py
 import os
-import requests
+import time
+import asyncio
+import random
+import logging
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any
 from dotenv import load_dotenv
 
+from cache_utils import TTLCache, SingleFlight, MISSING
+from circuit_breaker import CircuitBreaker, OPEN
+
+if TYPE_CHECKING:
+    import requests
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.openweathermap.org/data/2.5"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Coordinates are rounded to this many decimals (~1 km) before lookup so nearby requests share a cache entry
+COORD_PRECISION = 2
+
 class WeatherClient:
-    def __init__(self):
+    def __init__(self, cache_ttl: Optional[float] = None, cache_size: int = 1024,
+                 base_url: Optional[str] = None, session: Optional["requests.Session"] = None,
+                 breaker: Optional[CircuitBreaker] = None):
         self.api_key = os.getenv("OPENWEATHER_API_KEY")
         if not self.api_key:
             raise ValueError("OPENWEATHER_API_KEY not found in environment variables")
+        if cache_ttl is None:
+            cache_ttl = float(os.getenv("WEATHER_CACHE_TTL", "600"))  # seconds; weather changes slowly
+        self.cache = TTLCache(max_size=cache_size, ttl=cache_ttl)
+        self._flight = SingleFlight()
 
-    def current_by_city(self, city: str, units: str = "metric") -> Optional[Dict[str, Any]]:
-        url = "https://api.openweathermap.org/data/2.5/weather"
-        params = {"q": city, "appid": self.api_key, "units": units}
-        r = requests.get(url, params=params, timeout=15)
-        if not r.ok:
+        self.base_url = (base_url or os.getenv("OPENWEATHER_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        # (connect, read) timeouts in seconds
+        self.timeout = (float(os.getenv("WEATHER_CONNECT_TIMEOUT", "3")), float(os.getenv("WEATHER_READ_TIMEOUT", "5")))
+        self.max_retries = int(os.getenv("WEATHER_MAX_RETRIES", "2"))
+        self.backoff = float(os.getenv("WEATHER_BACKOFF", "0.2"))             # base delay, doubled per retry
+        self.retry_budget = float(os.getenv("WEATHER_RETRY_BUDGET", "8"))     # total seconds across all attempts
+
+        # One keep-alive connection pool per client instead of a new TCP+TLS handshake per lookup
+        if session is None:
+            # requests (and certifi) are imported on first client construction, not at app import
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=int(os.getenv("WEATHER_POOL_SIZE", "20")))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+        self.breaker = breaker or CircuitBreaker(
+            "openweather",
+            failure_threshold=int(os.getenv("WEATHER_BREAKER_FAILURES", "5")),
+            recovery_timeout=float(os.getenv("WEATHER_BREAKER_RECOVERY", "30")),
+            slow_call_threshold=float(os.getenv("WEATHER_BREAKER_SLOW_CALL", "4")),
+        )
+
+    def _fetch(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Call the current-weather endpoint with bounded, jittered retries.
+        Returns None ("weather unknown") on client errors, exhausted retries or an open circuit.
+        """
+        if not self.breaker.allow():
+            logger.warning("Weather circuit open; skipping upstream call")
             return None
-        return r.json()
+
+        import requests
+
+        url = f"{self.base_url}/weather"
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            call_started = time.monotonic()
+            try:
+                r = self.session.get(url, params={**params, "appid": self.api_key}, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if r.ok:
+                    try:
+                        data = r.json()
+                    except ValueError:
+                        data = None
+                    if data is not None:
+                        self.breaker.record_success(time.monotonic() - call_started)
+                        return data
+                    error = "Invalid JSON body"
+                elif r.status_code not in RETRY_STATUS_CODES:
+                    # e.g. 404 unknown city: upstream is healthy, the answer is just "no weather"
+                    self.breaker.record_success(time.monotonic() - call_started)
+                    return None
+                else:
+                    error = f"HTTP {r.status_code}"
+
+            self.breaker.record_failure()
+            # Full jitter: sleep a random amount up to the exponential backoff ceiling
+            delay = random.uniform(0, self.backoff * (2 ** attempt))
+            elapsed = time.monotonic() - started
+            if attempt == self.max_retries or elapsed + delay > self.retry_budget or self.breaker.state == OPEN:
+                logger.warning(f"Weather lookup failed after {attempt + 1} attempt(s): {error}")
+                return None
+            time.sleep(delay)
+        return None
+
+    def _load(self, key: tuple, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        result = self._fetch(params)
+        if result is not None:
+            self.cache.set(key, result)
+        return result
+
+    def _cached_fetch(self, key: tuple, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Serve from the TTL cache; on a miss, make sure only one upstream call per key is in flight.
+        Failed lookups (None) are not cached.
+        """
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return cached
+        return self._flight.do(key, lambda: self._load(key, params))
+
+    async def _cached_fetch_async(self, key: tuple, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        _cached_fetch for async callers. Cache hits are answered on the event loop; only a miss (the
+        blocking requests call with its retries) is handed to a worker thread.
+        """
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return cached
+        return await asyncio.to_thread(self._flight.do, key, lambda: self._load(key, params))
+
+    def _city_query(self, city: str, units: str):
+        city = " ".join(city.split()).lower()
+        return ("city", city, units), {"q": city, "units": units}
+
+    def _coords_query(self, lat: float, lon: float, units: str):
+        lat, lon = round(lat, COORD_PRECISION), round(lon, COORD_PRECISION)
+        return ("coords", lat, lon, units), {"lat": lat, "lon": lon, "units": units}
+
+    def current_by_city(self, city: str, units: str = "metric") -> Optional[Dict[str, Any]]:
+        return self._cached_fetch(*self._city_query(city, units))
 
     def current_by_coords(self, lat: float, lon: float, units: str = "metric") -> Optional[Dict[str, Any]]:
-        url = "https://api.openweathermap.org/data/2.5/weather"
-        params = {"lat": lat, "lon": lon, "appid": self.api_key, "units": units}
-        r = requests.get(url, params=params, timeout=15)
-        if not r.ok:
-            return None
-        return r.json()
+        return self._cached_fetch(*self._coords_query(lat, lon, units))
+
+    async def current_by_city_async(self, city: str, units: str = "metric") -> Optional[Dict[str, Any]]:
+        return await self._cached_fetch_async(*self._city_query(city, units))
+
+    async def current_by_coords_async(self, lat: float, lon: float, units: str = "metric") -> Optional[Dict[str, Any]]:
+        return await self._cached_fetch_async(*self._coords_query(lat, lon, units))
 
 def infer_season(date: datetime, hemisphere: str = "north") -> str:
     """